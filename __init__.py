@@ -1,6 +1,7 @@
 print("[Mobile Frontend] Loading custom node...")
 import asyncio
 from collections import OrderedDict
+import functools
 import mimetypes
 import os
 import shutil
@@ -31,9 +32,11 @@ _mobile_file_state = _import_module('mobile_file_state')
 _mobile_image_dimensions = _import_module('mobile_image_dimensions')
 _mobile_input_aliases = _import_module('mobile_input_aliases')
 _mobile_file_prefix_aliases = _import_module('mobile_file_prefix_aliases')
+_binary_cache_io = _import_module('binary_cache_io')
 _mobile_video_thumbs = _import_module('mobile_video_thumbs')
 _mobile_video_playback = _import_module('mobile_video_playback')
 _mobile_image_preview = _import_module('mobile_image_preview')
+_mobile_image_thumbs = _import_module('mobile_image_thumbs')
 _mobile_push = _import_module('mobile_push')
 _mobile_web_push = _import_module('mobile_web_push')
 _mobile_app_push = _import_module('mobile_app_push')
@@ -211,6 +214,9 @@ def _safe_int(value, default):
 
 
 _ASSET_SOURCES = ('output', 'input', 'temp')
+# POST /api/thumbnails: items per request, and renders in flight per request.
+_THUMBNAIL_BATCH_MAX = 200
+_THUMBNAIL_BATCH_CONCURRENCY = 4
 
 
 def _source_base_dir(source):
@@ -226,6 +232,19 @@ def _source_base_dir(source):
     return folder_paths.get_output_directory()
 
 
+def _thumbnail_batch_item(item):
+    """(source, subfolder, filename) of one POST /api/thumbnails item, or None
+    when it is malformed (not an object, no filename, or a non-string field)."""
+    if not isinstance(item, dict) or not item.get('filename'):
+        return None
+    filename = item['filename']
+    subfolder = item.get('subfolder') or ''
+    source = item.get('source', 'output')
+    if not all(isinstance(value, str) for value in (source, subfolder, filename)):
+        return None
+    return source, subfolder, filename
+
+
 def _read_pnginfo_metadata(path):
     """Open an image and return its merged info/text metadata dict, closing the
     file handle. Synchronous (PIL parse + file I/O) — call via run_in_executor
@@ -240,23 +259,210 @@ def _read_pnginfo_metadata(path):
     return metadata
 
 
-def _render_image_thumbnail(path):
-    """Open + downscale/encode an image thumbnail, closing the file handle.
-    Synchronous (decode + resize + re-encode) — call via run_in_executor.
-    Returns (body_bytes, content_type).
+_SIDECAR_IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.webp', '.gif')
+
+
+def _thumbnail_source(file_path, base_dir, subfolder, filename):
+    """What a grid thumbnail is rendered from: (path, is_video_frame).
+
+    Videos use a same-named sidecar image when there is one, else a frame
+    extracted from the video itself.
     """
-    with Image.open(path) as img:
-        return _mobile_video_thumbs.encode_thumbnail(img)
+    if not _mobile_video_thumbs.is_video(filename):
+        return file_path, False
+    base_name = os.path.splitext(filename)[0]
+    folder_path = os.path.join(base_dir, subfolder) if subfolder else base_dir
+    for img_ext in _SIDECAR_IMAGE_EXTENSIONS:
+        candidate = os.path.join(folder_path, base_name + img_ext)
+        if os.path.exists(candidate):
+            return candidate, False
+    return file_path, True
 
 
-def _render_preview_thumbnail(path, width):
-    """Downscale a still-image model preview to fit ~`width` px, for the model
-    dropdown rows (which show a tiny thumbnail — serving the full-res file there
-    wastes bandwidth/decode). Synchronous — call via run_in_executor.
-    Returns (body_bytes, content_type).
+def _thumbnail_format(request, is_video_frame):
+    """Negotiated image-thumbnail format for this request (None = JPEG/PNG).
+
+    Video frames are always cached as JPEG.
     """
-    with Image.open(path) as img:
-        return _mobile_video_thumbs.encode_thumbnail(img, size=(width, width))
+    if is_video_frame:
+        return None
+    image_format = _mobile_image_thumbs.negotiate_format(request.headers.get('Accept'))
+    _mobile_image_thumbs.note_requested_format(image_format)
+    return image_format
+
+
+# Effective connection types (the ECT client hint) too slow for source video.
+_SLOW_CONNECTION_TYPES = frozenset(('slow-2g', '2g', '3g'))
+
+
+def _video_rendition(request):
+    """Rendition for a playable-video request (None = source resolution).
+
+    An explicit ``?rendition=`` (480p/720p/1080p/source) wins; without one,
+    a Save-Data or slow-ECT client hint picks the smallest rendition.
+    """
+    requested = request.query.get('rendition')
+    if requested is not None:
+        return _mobile_video_playback.normalize_rendition(requested)
+    if (
+        request.headers.get('Save-Data', '').strip().lower() == 'on'
+        or request.headers.get('ECT', '').strip().lower() in _SLOW_CONNECTION_TYPES
+    ):
+        return min(_mobile_video_playback.RENDITIONS, key=_mobile_video_playback.RENDITIONS.get)
+    return None
+
+
+def _thumbnail_etag(source_path, is_video_frame, image_format=None):
+    if is_video_frame:
+        return _mobile_video_thumbs.etag(source_path)
+    return _mobile_image_thumbs.etag(
+        source_path, _mobile_image_thumbs.THUMBNAIL_EDGE, image_format
+    )
+
+
+class _KeyedFileResponse(web.FileResponse):
+    """FileResponse that keeps the ETag it was given.
+
+    aiohttp replaces any ETag with one of its own (the file's mtime and size)
+    when it prepares a FileResponse; a disk-cache hit must carry the same
+    key-derived ETag as the rendered miss, so revalidation after expiry still
+    answers from a stat whichever of the two the client saw.
+    """
+
+    @property
+    def etag(self):
+        return web.FileResponse.etag.fget(self)
+
+    @etag.setter
+    def etag(self, value):
+        if 'ETag' not in self.headers:
+            web.FileResponse.etag.fset(self, value)
+
+
+def _cached_file_response(cached_path, content_type, cache_headers):
+    """Sendfile response for a disk-cache hit, with the miss's cache headers."""
+    return _KeyedFileResponse(
+        cached_path, headers={**cache_headers, 'Content-Type': content_type}
+    )
+
+
+def _cached_thumbnail_file(source_path, is_video_frame, image_format=None):
+    """(cache path, content_type) when the thumbnail is already on disk."""
+    if not is_video_frame:
+        return _mobile_image_thumbs.cached_file(
+            source_path, _mobile_image_thumbs.THUMBNAIL_EDGE, image_format
+        )
+    path = _mobile_video_thumbs.cached_thumbnail_file(source_path)
+    return (path, 'image/jpeg') if path is not None else None
+
+
+def _render_thumbnail_source(source_path, is_video_frame, image_format=None):
+    """Cached-or-render thumbnail for a `_thumbnail_source` result.
+
+    Synchronous (decode) — call via run_in_executor. Returns (body_bytes,
+    content_type), or None when no frame could be extracted from a video.
+    Concurrent renders of the same thumbnail are deduped.
+    """
+    if not is_video_frame:
+        return _mobile_image_thumbs.get_or_render(
+            source_path, _mobile_image_thumbs.THUMBNAIL_EDGE, image_format
+        )
+    rendered = _mobile_video_thumbs.get_or_render_thumbnail(source_path)
+    if rendered is None:
+        return None
+    return rendered, 'image/jpeg'
+
+
+def _get_or_render_thumbnail(file_path, base_dir, subfolder, filename, image_format=None):
+    """`_thumbnail_source` + `_render_thumbnail_source` in one executor hop."""
+    source_path, is_video_frame = _thumbnail_source(file_path, base_dir, subfolder, filename)
+    return _render_thumbnail_source(
+        source_path, is_video_frame, None if is_video_frame else image_format
+    )
+
+
+async def _delete_files(paths, source):
+    """Bulk form of api_delete_file for {"paths": [...]}.
+
+    Removals are planned from one state snapshot, the files are deleted
+    concurrently on the executor, and state cleanup for everything that
+    was actually deleted lands in a single save.
+    """
+    if not paths or not all(isinstance(p, str) and p for p in paths):
+        return web.json_response({"error": "paths must be a non-empty list of paths"}, status=400)
+    if source not in _ASSET_SOURCES:
+        return web.json_response({"error": "source must be output/input/temp"}, status=400)
+
+    base_dir = _source_base_dir(source)
+    base_real = os.path.realpath(base_dir)
+    targets = {}
+    for filepath in dict.fromkeys(paths):
+        target_path = _safe_join(base_dir, filepath)
+        if target_path is None or os.path.realpath(target_path) == base_real:
+            return web.json_response({"error": "Access denied", "path": filepath}, status=403)
+        targets[filepath] = target_path
+
+    def _plan():
+        existing = {
+            filepath: target_path
+            for filepath, target_path in targets.items()
+            if os.path.exists(target_path)
+        }
+        return existing, _mobile_file_state.plan_remove_paths(
+            FILE_STATE_CACHE_PATH, source, base_dir, list(existing),
+        )
+
+    loop = asyncio.get_event_loop()
+    existing, removal_plans = await loop.run_in_executor(None, _plan)
+    missing = [filepath for filepath in targets if filepath not in existing]
+
+    # A path inside another requested folder goes with that folder's
+    # rmtree; deleting it separately would race the parent.
+    real_targets = {fp: os.path.realpath(tp) for fp, tp in existing.items()}
+    roots = [
+        fp for fp, real in real_targets.items()
+        if not any(
+            other != fp and real.startswith(other_real + os.sep)
+            for other, other_real in real_targets.items()
+        )
+    ]
+
+    def _delete_one(target_path):
+        if os.path.isdir(target_path):
+            shutil.rmtree(target_path)
+        else:
+            os.remove(target_path)
+
+    outcomes = await asyncio.gather(
+        *(loop.run_in_executor(None, _delete_one, existing[fp]) for fp in roots),
+        return_exceptions=True,
+    )
+    failed = {
+        fp: str(outcome)
+        for fp, outcome in zip(roots, outcomes)
+        if isinstance(outcome, Exception)
+    }
+    deleted = [
+        fp for fp, real in real_targets.items()
+        if fp not in failed and not any(
+            real.startswith(real_targets[bad] + os.sep) for bad in failed
+        )
+    ]
+    if deleted:
+        await loop.run_in_executor(
+            None,
+            _mobile_file_state.remove_paths,
+            FILE_STATE_CACHE_PATH,
+            source,
+            deleted,
+            {fp: removal_plans.get(fp, {}) for fp in deleted},
+        )
+    return web.json_response({
+        "success": not failed,
+        "deleted": deleted,
+        "missing": missing,
+        "failed": [{"path": fp, "error": err} for fp, err in failed.items()],
+    })
 
 
 def setup_mobile_route():
@@ -293,6 +499,16 @@ def setup_mobile_route():
             'temp': folder_paths.get_temp_directory(),
         },
     )
+    # Then split it into per-source shards (each with its own lock) so output,
+    # input and temp never serialize on each other. file_state.json is kept.
+    _mobile_file_state.migrate_to_shards(FILE_STATE_CACHE_PATH)
+    # Entries migrated with only a full-file sha256 are re-keyed to partial
+    # content ids on a low-priority background thread, instead of each one
+    # costing a full hash whenever a listing happens to reach its file.
+    for source in ('output', 'input', 'temp'):
+        _mobile_file_state.start_legacy_upgrade(
+            FILE_STATE_CACHE_PATH, source, _source_base_dir(source),
+        )
 
     # Compress sizable JSON API responses on the fly. Model listings in
     # particular can be multiple MB of metadata (checkpoints/loras), and shipping
@@ -494,6 +710,8 @@ def setup_mobile_route():
             data = await request.json()
             filepath = data.get('path')
             source = data.get('source', 'output')
+            if isinstance(data.get('paths'), list):
+                return await _delete_files(data['paths'], source)
             if not filepath:
                 return web.json_response({"error": "No path provided"}, status=400)
             if source not in _ASSET_SOURCES:
@@ -739,46 +957,118 @@ def setup_mobile_route():
             # Output/input filenames are write-once, so a rendered thumbnail is
             # safe to cache hard — scroll-backs and panel reopens then hit the
             # browser cache instead of re-downloading + re-decoding server-side.
-            cache_headers = {'Cache-Control': 'public, max-age=86400'}
-
-            # For videos, look for an image with the same name
-            ext = os.path.splitext(filename)[1].lower()
-            if _mobile_video_thumbs.is_video(filename):
-                base_name = os.path.splitext(filename)[0]
-                folder_path = os.path.join(base_dir, subfolder) if subfolder else base_dir
-                image_extensions = ['.png', '.jpg', '.jpeg', '.webp', '.gif']
-
-                # Look for matching image file
-                matching_image = None
-                for img_ext in image_extensions:
-                    candidate = os.path.join(folder_path, base_name + img_ext)
-                    if os.path.exists(candidate):
-                        matching_image = candidate
-                        break
-
-                if not matching_image:
-                    # No sidecar image: extract a frame from the video itself and
-                    # serve it (cached) so the grid shows a real thumbnail. The
-                    # decode is CPU-heavy, so run it off the event loop; the
-                    # helper dedupes concurrent decodes of the same video.
-                    loop = asyncio.get_event_loop()
-                    rendered = await loop.run_in_executor(
-                        None, _mobile_video_thumbs.get_or_render_thumbnail, file_path
-                    )
-                    if rendered is None:
-                        return web.Response(status=400, text="No thumbnail image found for video", headers=no_store)
-                    return web.Response(body=rendered, content_type='image/jpeg', headers=cache_headers)
-
-                file_path = matching_image
-
+            # The ETag is the cache key itself (source identity + size), so
+            # revalidation after expiry is answered from a stat, never a read.
+            source_path, is_video_frame = _thumbnail_source(
+                file_path, base_dir, subfolder, filename
+            )
+            # WebP/AVIF when the client accepts them (each cached as its own
+            # variant), so every cache between here and the client must key on
+            # Accept too.
+            image_format = _thumbnail_format(request, is_video_frame)
+            cache_headers = {
+                'Cache-Control': 'public, max-age=86400',
+                'ETag': _thumbnail_etag(source_path, is_video_frame, image_format),
+                'Vary': 'Accept',
+            }
+            if _binary_cache_io.etag_matches(
+                request.headers.get('If-None-Match'), cache_headers['ETag']
+            ):
+                return web.Response(status=304, headers=cache_headers)
+
+            # Cache hits go out via sendfile, under the same key-derived ETag
+            # a rendered miss sends. Only misses render.
+            cached = _cached_thumbnail_file(source_path, is_video_frame, image_format)
+            if cached is not None:
+                cached_path, content_type = cached
+                return _cached_file_response(cached_path, content_type, cache_headers)
+
+            # Images and video frames are both disk-cached, so a fresh device
+            # scrolling a big grid reads encoded thumbnails instead of
+            # re-decoding originals.
             loop = asyncio.get_event_loop()
-            body, content_type = await loop.run_in_executor(
-                None, _render_image_thumbnail, file_path
+            rendered = await loop.run_in_executor(
+                None, _render_thumbnail_source, source_path, is_video_frame, image_format
             )
+            if rendered is None:
+                return web.Response(status=400, text="No thumbnail image found for video", headers=no_store)
+            body, content_type = rendered
             return web.Response(body=body, content_type=content_type, headers=cache_headers)
         except Exception as e:
             return web.Response(status=500, headers=no_store)
 
+    async def api_get_thumbnails(request):
+        """Many grid thumbnails in one request, streamed as each completes.
+
+        Body: {"items": [{filename, subfolder?, source?}, ...]}. The response
+        is a stream of length-prefixed frames (see mobile_image_thumbs.
+        batch_frame) in completion order; each frame carries its item's index
+        and the status the single-item endpoint would have returned.
+        """
+        try:
+            data = await request.json()
+        except Exception:
+            return web.json_response({"error": "Invalid JSON"}, status=400)
+        items = data.get('items') if isinstance(data, dict) else None
+        if not isinstance(items, list) or not items:
+            return web.json_response({"error": "items must be a non-empty list"}, status=400)
+        if len(items) > _THUMBNAIL_BATCH_MAX:
+            return web.json_response(
+                {"error": f"at most {_THUMBNAIL_BATCH_MAX} items per request"}, status=400
+            )
+
+        # Negotiated (and recorded for pre-rendering) once for the whole batch;
+        # video frames ignore it, as on the single-item path.
+        image_format = _thumbnail_format(request, False)
+        loop = asyncio.get_event_loop()
+        # Bound how much of the shared executor one grid screen can occupy.
+        semaphore = asyncio.Semaphore(_THUMBNAIL_BATCH_CONCURRENCY)
+
+        async def _one(index, item):
+            parsed = _thumbnail_batch_item(item)
+            if parsed is None:
+                return index, 400, None, b''
+            source, subfolder, filename = parsed
+            base_dir = _source_base_dir(source)
+            file_path = _safe_join(base_dir, subfolder, filename)
+            if file_path is None:
+                return index, 403, None, b''
+            async with semaphore:
+                try:
+                    if not os.path.exists(file_path):
+                        return index, 404, None, b''
+                    rendered = await loop.run_in_executor(
+                        None, _get_or_render_thumbnail,
+                        file_path, base_dir, subfolder, filename, image_format,
+                    )
+                except Exception:
+                    return index, 500, None, b''
+            if rendered is None:
+                return index, 400, None, b''
+            body, content_type = rendered
+            return index, 200, content_type, body
+
+        tasks = [asyncio.ensure_future(_one(i, item)) for i, item in enumerate(items)]
+        response = web.StreamResponse(headers={
+            'Content-Type': 'application/octet-stream',
+            # Per-item results are cached by the single-item URL; the batch
+            # envelope itself is request-specific.
+            'Cache-Control': 'no-store',
+        })
+        try:
+            await response.prepare(request)
+            for next_done in asyncio.as_completed(tasks):
+                index, status, content_type, body = await next_done
+                await response.write(
+                    _mobile_image_thumbs.batch_frame(index, status, content_type, body)
+                )
+            await response.write_eof()
+        finally:
+            # Client went away mid-stream: don't keep rendering for nobody.
+            for task in tasks:
+                task.cancel()
+        return response
+
     async def api_get_preview(request):
         """Screen-sized WebP preview of a full-resolution output/input image.
 
@@ -808,22 +1098,45 @@ def setup_mobile_route():
             if not os.path.exists(file_path):
                 return web.Response(status=404, headers=no_store)
 
+            _mobile_image_preview.note_requested_edge(max_edge)
+            # Output filenames are write-once, so the rendered preview is safe
+            # to cache hard — repeat views / swipe-backs hit the browser cache.
+            # The ETag is the cache key, so a revalidation never reads or renders.
+            cache_headers = {
+                'Cache-Control': 'public, max-age=86400',
+                'ETag': _mobile_image_preview.etag(file_path, max_edge),
+            }
+            if _binary_cache_io.etag_matches(
+                request.headers.get('If-None-Match'), cache_headers['ETag']
+            ):
+                return web.Response(status=304, headers=cache_headers)
+            # Hits are served via sendfile (see api_get_thumbnail).
+            cached_path = _mobile_image_preview.cached_file(file_path, max_edge)
+            if cached_path is not None:
+                return _cached_file_response(cached_path, 'image/webp', cache_headers)
             loop = asyncio.get_event_loop()
             body = await loop.run_in_executor(
                 None, _mobile_image_preview.get_or_render, file_path, max_edge
             )
-            return web.Response(
-                body=body,
-                content_type='image/webp',
-                # Output filenames are write-once, so the rendered preview is safe
-                # to cache hard — repeat views / swipe-backs hit the browser cache.
-                headers={'Cache-Control': 'public, max-age=86400'},
-            )
+            return web.Response(body=body, content_type='image/webp', headers=cache_headers)
         except Exception:
             return web.Response(status=500, headers=no_store)
 
     async def api_get_playable_video(request):
-        """Serve an original or cached browser-safe MP4 with byte-range support."""
+        """Serve an original or cached browser-safe MP4 with byte-range support.
+
+        A video that still needs preparing is queued as a background job. With
+        ``?async=1`` (or ``Prefer: respond-async``) the answer is then 202 and
+        the job's status, so the client can play the original /view URL
+        meanwhile and switch once /api/video/jobs/{id}, or a ``video_job``
+        message on /ws/progress, reports done. Otherwise the request waits on
+        the shared job — not on an executor thread. Async stays opt-in: a
+        <video src> pointed here cannot follow a 202. An HLS-capable client
+        can instead play a transcode while it encodes, see
+        api_request_live_video.
+        ``?rendition=`` (or a Save-Data / slow ECT hint, see
+        `_video_rendition`) serves a downscaled transcode instead of the source.
+        """
         no_store = {'Cache-Control': 'no-store'}
         try:
             filename = request.query.get('filename')
@@ -845,9 +1158,22 @@ def setup_mobile_route():
                 return web.Response(status=404, headers=no_store)
 
             loop = asyncio.get_event_loop()
-            playable = await loop.run_in_executor(
-                None, _mobile_video_playback.get_or_prepare, file_path
+            playable, job = await loop.run_in_executor(
+                None, _mobile_video_playback.request_playable, file_path,
+                _video_rendition(request),
             )
+            if job is not None:
+                if (
+                    request.query.get('async') == '1'
+                    or 'respond-async' in request.headers.get('Prefer', '')
+                ):
+                    return web.json_response(job.status(), status=202, headers={
+                        **no_store,
+                        'Location': '/mobile/api/video/jobs/' + job.id,
+                    })
+                # Shielded: one range request hanging up must not cancel a
+                # still-queued job every other request is waiting on too.
+                playable = await asyncio.shield(asyncio.wrap_future(job.future))
             # This URL is keyed only by filename/subfolder/type, and ComfyUI
             # reuses output filenames after a delete — so a far-future max-age is
             # only safe when the caller supplied a cache-bust token that makes the
@@ -883,6 +1209,9 @@ def setup_mobile_route():
                     # a remuxed cache copy, so name it after the original.
                     'Content-Disposition': _file_utils.content_disposition(filename),
                     'X-Mobile-Video-Mode': playable.mode,
+                    'X-Mobile-Video-Rendition': playable.rendition or 'source',
+                    # Without ?rendition=, these hints pick the bytes served.
+                    'Vary': 'Save-Data, ECT',
                 },
             )
         except _mobile_video_playback.PlaybackPreparationError as exc:
@@ -915,6 +1244,158 @@ def setup_mobile_route():
             print('[Mobile Frontend] Playable video error: {}'.format(exc))
             return web.Response(status=500, headers=no_store)
 
+    async def api_get_video_sprite(request):
+        """Scrub sprite sheet for a video: one JPEG row of evenly spaced frames.
+
+        ``?frames=`` tiles (default SPRITE_FRAMES, 2..SPRITE_MAX_FRAMES); the
+        count is echoed in X-Mobile-Sprite-Frames, and each tile is
+        ``width / frames`` wide. Cached and revalidated like thumbnails.
+        """
+        no_store = {'Cache-Control': 'no-store'}
+        try:
+            filename = request.query.get('filename')
+            subfolder = request.query.get('subfolder', '')
+            source = request.query.get('source', 'output')
+            try:
+                frames = int(request.query.get('frames', _mobile_video_thumbs.SPRITE_FRAMES))
+            except ValueError:
+                return web.Response(status=400, text='frames must be an integer', headers=no_store)
+            if not 2 <= frames <= _mobile_video_thumbs.SPRITE_MAX_FRAMES:
+                return web.Response(status=400, text='frames out of range', headers=no_store)
+            if not filename:
+                return web.Response(status=400, headers=no_store)
+            if source not in _ASSET_SOURCES:
+                return web.Response(status=400, text='invalid asset source', headers=no_store)
+            if not _mobile_video_thumbs.is_video(filename):
+                return web.Response(status=415, text='unsupported video type', headers=no_store)
+
+            file_path = _safe_join(_source_base_dir(source), subfolder, filename)
+            if file_path is None:
+                return web.Response(status=403, headers=no_store)
+            if not os.path.isfile(file_path):
+                return web.Response(status=404, headers=no_store)
+
+            cache_headers = {
+                'Cache-Control': 'public, max-age=86400',
+                'ETag': _mobile_video_thumbs.sprite_etag(file_path, frames),
+                'X-Mobile-Sprite-Frames': str(frames),
+            }
+            if _binary_cache_io.etag_matches(
+                request.headers.get('If-None-Match'), cache_headers['ETag']
+            ):
+                return web.Response(status=304, headers=cache_headers)
+
+            cached_path = _mobile_video_thumbs.cached_sprite_file(file_path, frames)
+            if cached_path is not None:
+                return _cached_file_response(cached_path, 'image/jpeg', cache_headers)
+
+            loop = asyncio.get_event_loop()
+            body = await loop.run_in_executor(
+                None, _mobile_video_thumbs.get_or_render_sprite, file_path, frames
+            )
+            if body is None:
+                return web.Response(status=422, text='Could not extract frames from video', headers=no_store)
+            return web.Response(body=body, content_type='image/jpeg', headers=cache_headers)
+        except Exception as exc:
+            print('[Mobile Frontend] Video sprite error: {}'.format(exc))
+            return web.Response(status=500, headers=no_store)
+
+    async def api_get_video_job(request):
+        """Status of a background video preparation (see api_get_playable_video)."""
+        job = _mobile_video_playback.get_job(request.match_info.get('job_id', ''))
+        if job is None:
+            return web.json_response({"error": "Unknown job"}, status=404)
+        return web.json_response(job.status(), headers={'Cache-Control': 'no-store'})
+
+    async def api_request_live_video(request):
+        """Ask for live HLS output of a video that still needs transcoding.
+
+        Same query as api_get_playable_video. A transcode this queues, or finds
+        still queued, also writes an HLS playlist of fMP4 segments as it
+        encodes, so an HLS-capable player starts after the first segment
+        instead of after the whole file. ``{"live": false}`` means there is
+        nothing live to play (the video is ready, is a quick remux, or its
+        preparation already started) and the playable URL is the one to use.
+        A POST, unlike that URL: only a client about to play the result sends
+        it, and only then is the live output worth producing.
+        """
+        no_store = {'Cache-Control': 'no-store'}
+        try:
+            filename = request.query.get('filename')
+            subfolder = request.query.get('subfolder', '')
+            source = request.query.get('type', request.query.get('source', 'output'))
+            if not filename:
+                return web.json_response({"error": "filename is required"}, status=400)
+            if source not in _ASSET_SOURCES:
+                return web.json_response({"error": "invalid asset source"}, status=400)
+            if not _mobile_video_playback.is_video(filename):
+                return web.json_response({"error": "unsupported video type"}, status=415)
+            file_path = _safe_join(_source_base_dir(source), subfolder, filename)
+            if file_path is None:
+                return web.json_response({"error": "Access denied"}, status=403)
+            if not os.path.isfile(file_path):
+                return web.json_response({"error": "File not found"}, status=404)
+
+            loop = asyncio.get_event_loop()
+            _playable, job = await loop.run_in_executor(
+                None,
+                functools.partial(
+                    _mobile_video_playback.request_playable,
+                    file_path,
+                    _video_rendition(request),
+                    live=True,
+                ),
+            )
+            if job is None or job.live_dir is None:
+                return web.json_response({"live": False}, headers=no_store)
+            return web.json_response({
+                **job.status(),
+                "playlist": '/mobile/api/video/live/{}/{}'.format(
+                    job.id, _mobile_video_playback.LIVE_PLAYLIST
+                ),
+            }, headers=no_store)
+        except _mobile_video_playback.PlaybackPreparationError:
+            return web.json_response({"live": False}, headers=no_store)
+        except Exception as exc:
+            print('[Mobile Frontend] Live video error: {}'.format(exc))
+            return web.json_response({"error": str(exc)}, status=500)
+
+    async def api_get_live_video_file(request):
+        """The playlist, init section or a segment of a job's live output."""
+        no_store = {'Cache-Control': 'no-store'}
+        job = _mobile_video_playback.get_job(request.match_info.get('job_id', ''))
+        name = request.match_info.get('name', '')
+        if job is None:
+            return web.Response(status=404, headers=no_store)
+        loop = asyncio.get_event_loop()
+        if name == _mobile_video_playback.LIVE_PLAYLIST:
+            # The muxer writes the playlist once the first segment is done
+            # (and the job may still be queued): hold the player's request
+            # until then rather than fail it.
+            while True:
+                finished = job.future.done()
+                playlist = await loop.run_in_executor(
+                    None, _mobile_video_playback.live_playlist, job
+                )
+                if playlist is not None or finished:
+                    break
+                await asyncio.sleep(0.25)
+            if playlist is None:
+                return web.Response(status=404, headers=no_store)
+            return web.Response(
+                text=playlist,
+                content_type='application/vnd.apple.mpegurl',
+                headers=no_store,
+            )
+        path = await loop.run_in_executor(None, _mobile_video_playback.live_file, job, name)
+        if path is None:
+            return web.Response(status=404, headers=no_store)
+        return web.FileResponse(path, headers={
+            # Same URLs for a re-run of the same source: revalidate.
+            'Cache-Control': 'private, no-cache',
+            'Content-Type': 'video/mp4' if name.endswith('.mp4') else 'video/iso.segment',
+        })
+
     async def api_get_file_state(request):
         try:
             source = request.rel_url.query.get('source', 'output')
@@ -922,17 +1403,31 @@ def setup_mobile_route():
                 return web.json_response({"error": "source must be output/input/temp"}, status=400)
             base_dir = _source_base_dir(source)
             loop = asyncio.get_event_loop()
+            # Hydration trusts entries verified within the module's window and
+            # refreshes older ones in the background, so a panel open is a
+            # state-file read rather than a stat (or hash) per tracked entry.
             state = await loop.run_in_executor(
                 None,
-                _mobile_file_state.get_all,
-                FILE_STATE_CACHE_PATH,
-                source,
-                base_dir,
+                functools.partial(
+                    _mobile_file_state.get_all,
+                    FILE_STATE_CACHE_PATH,
+                    source,
+                    base_dir,
+                    include_verified_at=True,
+                ),
             )
             return web.json_response(state)
         except Exception as e:
             return web.json_response({"error": str(e)}, status=500)
 
+    async def api_get_file_state_legacy_upgrade(request):
+        source = request.rel_url.query.get('source', 'output')
+        if source not in _ASSET_SOURCES:
+            return web.json_response({"error": "source must be output/input/temp"}, status=400)
+        return web.json_response(
+            _mobile_file_state.get_legacy_upgrade_status(FILE_STATE_CACHE_PATH, source)
+        )
+
     async def api_set_file_state(request):
         try:
             data = await request.json()
@@ -1497,6 +1992,31 @@ def setup_mobile_route():
             # original. The day-long client cache avoids repeat rendering.
             width = _safe_int(request.query.get('w'), 0)
             is_video = path.lower().endswith(('.mp4', '.webm', '.mov', '.mkv'))
+            if width > 0:
+                edge = _mobile_image_thumbs.size_class(width)
+                image_format = _thumbnail_format(request, is_video)
+                etag = (
+                    _mobile_video_thumbs.etag(path) if is_video
+                    else _mobile_image_thumbs.etag(path, edge, image_format)
+                )
+                if _binary_cache_io.etag_matches(request.headers.get('If-None-Match'), etag):
+                    return web.Response(status=304, headers={
+                        'Cache-Control': 'public, max-age=86400',
+                        'ETag': etag,
+                        'Vary': 'Accept',
+                    })
+                # Hits are served via sendfile (see api_get_thumbnail).
+                cached = (
+                    _cached_thumbnail_file(path, True) if is_video
+                    else _mobile_image_thumbs.cached_file(path, edge, image_format)
+                )
+                if cached is not None:
+                    cached_path, content_type = cached
+                    return _cached_file_response(cached_path, content_type, {
+                        'Cache-Control': 'public, max-age=86400',
+                        'ETag': etag,
+                        'Vary': 'Accept',
+                    })
             if width > 0 and is_video:
                 loop = asyncio.get_event_loop()
                 rendered = await loop.run_in_executor(
@@ -1505,6 +2025,7 @@ def setup_mobile_route():
                 if rendered is not None:
                     thumb = web.Response(body=rendered, content_type='image/jpeg')
                     thumb.headers['Cache-Control'] = 'public, max-age=86400'
+                    thumb.headers['ETag'] = etag
                     return thumb
                 # Never fall through and return the original video to an <img>
                 # thumbnail request. Besides failing to decode as an image, a
@@ -1517,11 +2038,15 @@ def setup_mobile_route():
             elif width > 0:
                 try:
                     loop = asyncio.get_event_loop()
+                    # Served from the shared thumbnail size classes (cached,
+                    # one decode for all of them) rather than an exact width.
                     body, content_type = await loop.run_in_executor(
-                        None, _render_preview_thumbnail, path, min(width, 512)
+                        None, _mobile_image_thumbs.get_or_render, path, edge, image_format
                     )
                     thumb = web.Response(body=body, content_type=content_type)
                     thumb.headers['Cache-Control'] = 'public, max-age=86400'
+                    thumb.headers['ETag'] = etag
+                    thumb.headers['Vary'] = 'Accept'
                     return thumb
                 except Exception:
                     pass
@@ -1755,6 +2280,7 @@ def setup_mobile_route():
     mobile_app.router.add_get('/api/files', api_list_files)
     mobile_app.router.add_delete('/api/files', api_delete_file)
     mobile_app.router.add_get('/api/files/state', api_get_file_state)
+    mobile_app.router.add_get('/api/files/state/legacy-upgrade', api_get_file_state_legacy_upgrade)
     mobile_app.router.add_post('/api/files/state', api_set_file_state)
     # Back-compat shims — see api_set_hidden/api_get_file_favorites/
     # api_set_file_favorite above. No client on THIS branch calls them (the
@@ -1769,8 +2295,13 @@ def setup_mobile_route():
     mobile_app.router.add_post('/api/file-prefix-aliases/resolve', api_resolve_file_prefix_aliases)
     mobile_app.router.add_get('/ws/progress', _mobile_progress_ws.api_progress_ws)
     mobile_app.router.add_get('/api/thumbnail', api_get_thumbnail)
+    mobile_app.router.add_post('/api/thumbnails', api_get_thumbnails)
     mobile_app.router.add_get('/api/preview', api_get_preview)
     mobile_app.router.add_get('/api/video/playable', api_get_playable_video)
+    mobile_app.router.add_get('/api/video/jobs/{job_id}', api_get_video_job)
+    mobile_app.router.add_post('/api/video/live', api_request_live_video)
+    mobile_app.router.add_get('/api/video/live/{job_id}/{name}', api_get_live_video_file)
+    mobile_app.router.add_get('/api/video/sprite', api_get_video_sprite)
     mobile_app.router.add_get('/api/file-metadata', api_file_metadata)
     mobile_app.router.add_post('/api/file-dimensions', api_file_dimensions)
     mobile_app.router.add_get('/api/workflow-availability', api_workflow_availability)
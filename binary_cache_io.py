@@ -11,16 +11,41 @@ Two hazards with naive ``open(path, 'wb')`` caches under concurrent requests:
 cache after acquiring). Locks are tiny; the registry is soft-capped as a
 leak backstop rather than pruned per-release, so waiters never see their lock
 swapped out from under them.
+
+The caches are also bounded. ``sharded_path`` fans entries out over 256
+subdirectories so no single directory grows huge, ``read_cached`` records the
+last serve, and ``store_cached`` periodically runs ``prune`` to evict the least
+recently served entries until the cache fits its byte and file budgets.
 """
 
 import os
 import threading
+import time
 
 _LOCKS_SOFT_CAP = 4096
 
 _locks_guard = threading.Lock()
 _locks = {}
 
+# Grace window protecting a just-written or just-served entry from eviction
+# while its bytes are still on their way to the client.
+EVICTION_GRACE_SECONDS = 60
+# Scanning a full cache costs a listdir per fan-out dir, so stores only prune
+# every so often (and on the first store after startup).
+_PRUNE_EVERY_WRITES = 32
+# Interrupted atomic writes leave `.tmp` files behind; old ones are discarded.
+_STALE_TMP_SECONDS = 24 * 60 * 60
+
+_served_lock = threading.Lock()
+# cache path -> last-served time. In memory because rewriting the file's mtime
+# would invalidate HTTP validators built from it.
+_served = {}
+_SERVED_MAX = 16384
+
+_prune_guard = threading.Lock()
+_prune_locks = {}
+_writes_since_prune = {}
+
 
 def atomic_write_bytes(path, data):
     """Write bytes so concurrent readers only ever see complete files."""
@@ -49,3 +74,166 @@ def render_lock(path):
             lock = threading.Lock()
             _locks[path] = lock
         return lock
+
+
+def sharded_path(cache_dir, digest, suffix):
+    """``cache_dir/ab/abcd….suffix`` — fan out by the first digest byte."""
+    return os.path.join(cache_dir, digest[:2], digest + suffix)
+
+
+def mark_served(path):
+    with _served_lock:
+        if len(_served) >= _SERVED_MAX and path not in _served:
+            # Drop the oldest quarter, not the whole map: a wipe would fall
+            # every entry back to its write time at once.
+            for stale in sorted(_served, key=_served.get)[: max(1, _SERVED_MAX // 4)]:
+                del _served[stale]
+        _served[path] = time.time()
+
+
+def _last_served(path, fallback_mtime):
+    with _served_lock:
+        served = _served.get(path)
+    if served is not None:
+        return served
+    # Clamp to now: a future-dated mtime would otherwise sit inside the grace
+    # window forever and never be evicted.
+    return min(fallback_mtime, time.time())
+
+
+def read_cached(path):
+    """Return the cached bytes at ``path`` (recording the serve), or None."""
+    try:
+        with open(path, 'rb') as handle:
+            data = handle.read()
+    except OSError:
+        return None
+    mark_served(path)
+    return data
+
+
+def cached_file(path):
+    """``path`` if it holds a complete entry (recording the serve), else None.
+
+    For responses that stream the file themselves (sendfile). Recording the
+    serve here is what keeps the entry out of ``prune`` until it's opened.
+    """
+    try:
+        if os.path.getsize(path) <= 0:
+            return None
+    except OSError:
+        return None
+    mark_served(path)
+    return path
+
+
+def store_cached(path, data, max_bytes, max_files):
+    """Atomically store a `sharded_path` entry, pruning its cache now and then."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    except OSError:
+        return
+    atomic_write_bytes(path, data)
+    cache_dir = os.path.dirname(os.path.dirname(path))
+    with _prune_guard:
+        writes = _writes_since_prune.get(cache_dir)
+        due = writes is None or writes + 1 >= _PRUNE_EVERY_WRITES
+        _writes_since_prune[cache_dir] = 0 if due else writes + 1
+    if due:
+        prune(cache_dir, max_bytes, max_files)
+
+
+def _cache_entries(cache_dir):
+    """(path, stat) for every cache entry, removing stale temp files on the way.
+
+    Entries in fan-out dirs and any flat files left from before fan-out are
+    both counted, so old-layout files age out under the same budget.
+    """
+    entries = []
+    now = time.time()
+    try:
+        top = list(os.scandir(cache_dir))
+    except OSError:
+        return entries
+    for item in top:
+        try:
+            children = list(os.scandir(item.path)) if item.is_dir() else [item]
+        except OSError:
+            continue
+        for child in children:
+            try:
+                if not child.is_file():
+                    continue
+                stat = child.stat()
+            except OSError:
+                continue
+            if child.name.endswith('.tmp'):
+                if now - stat.st_mtime > _STALE_TMP_SECONDS:
+                    try:
+                        os.remove(child.path)
+                    except OSError:
+                        pass
+                continue
+            entries.append((child.path, stat))
+    return entries
+
+
+def prune(cache_dir, max_bytes, max_files):
+    """Evict least-recently-served entries until the cache fits both budgets.
+
+    Anything served or written within the grace window is kept even if that
+    leaves the cache over budget; the next prune catches up. Concurrent calls
+    for the same cache skip rather than queue.
+    """
+    with _prune_guard:
+        lock = _prune_locks.setdefault(cache_dir, threading.Lock())
+    if not lock.acquire(blocking=False):
+        return
+    try:
+        entries = [
+            (_last_served(path, stat.st_mtime), stat.st_size, path)
+            for path, stat in _cache_entries(cache_dir)
+        ]
+        entries.sort()
+        total_bytes = sum(size for _, size, _ in entries)
+        total_files = len(entries)
+        cutoff = time.time() - EVICTION_GRACE_SECONDS
+        for last_used, size, path in entries:
+            if total_files <= max_files and total_bytes <= max_bytes:
+                break
+            if last_used > cutoff:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_files -= 1
+            total_bytes -= size
+            with _served_lock:
+                _served.pop(path, None)
+    finally:
+        lock.release()
+
+
+def etag_for(digest):
+    """Strong ETag for a cache entry, from its (identity-derived) key digest."""
+    return '"{}"'.format(digest)
+
+
+def etag_matches(if_none_match, etag):
+    """True when an ``If-None-Match`` header value already covers ``etag``.
+
+    Weak comparison, as RFC 9110 requires for If-None-Match: ``W/"x"`` matches
+    ``"x"``, and ``*`` matches anything.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
@@ -22,6 +22,28 @@ _DEFAULTS = {
     # custom node) in the mobile prompt editors. Off by default; the frontend
     # also gates this on the node actually being installed.
     "autocompleteEnabled": False,
+    # Opt-in: render grid thumbnails and viewer previews for new outputs as soon
+    # as a generation completes (mobile_pregenerate), so opening the panel after
+    # a batch doesn't wait on on-demand decodes. Costs background CPU + disk.
+    "pregenerateThumbnails": False,
+    # Opt-in: decode/resize/encode thumbnails and previews in a small pool of
+    # worker processes (mobile_render_pool) instead of ComfyUI's own threads,
+    # so renders scale across cores and a corrupt image can't crash the server.
+    "renderInSubprocess": False,
+    # Opt-in: probe new video outputs on completion and remux/transcode the ones
+    # browsers can't play as-is into the playable-video cache, whenever ComfyUI
+    # is idle, so opening them doesn't wait on a full transcode.
+    "pretranscodeVideos": False,
+    # Speed/quality profile for video transcodes (mobile_video_playback's
+    # ENCODER_PROFILES). "balanced" keeps libx264's default preset/CRF, as
+    # before the pref existed; "fast" favors encode speed on CPU-only servers;
+    # "background" caps encoder threads so it competes less with generation.
+    "videoEncoderProfile": "balanced",
+}
+
+# Non-boolean prefs, with the values they may take.
+_CHOICES = {
+    "videoEncoderProfile": ("fast", "balanced", "quality", "background"),
 }
 
 _lock = threading.Lock()
@@ -61,15 +83,19 @@ def get_prefs() -> dict:
 
 
 def set_prefs(updates) -> dict:
-    """Merge updates (only known boolean keys) and persist."""
+    """Merge updates (only known keys, with valid values) and persist."""
     global _prefs
     if not isinstance(updates, dict):
         return get_prefs()
     with _lock:
         current = dict(_load_prefs_locked())
         for key in _DEFAULTS:
-            if key in updates and isinstance(updates[key], bool):
-                current[key] = updates[key]
+            if key not in updates:
+                continue
+            value = updates[key]
+            valid = value in _CHOICES[key] if key in _CHOICES else isinstance(value, bool)
+            if valid:
+                current[key] = value
         _prefs = current
         # Atomic: a crash or full disk mid-write would otherwise leave truncated
         # JSON that every later load rejects, bricking server-side prefs.
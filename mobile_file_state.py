@@ -12,6 +12,12 @@ before this module existed), a migrated entry whose file was absent at
 migration time keeps a `legacySha256` fallback identity until it is next
 seen, at which point it is upgraded in place to a partial `contentId` and the
 fallback is dropped. See `migrate_legacy`.
+
+Each source (output/input/temp) is stored in its own shard next to the
+unified path — ``file_state.json`` becomes ``file_state.output.json`` and so
+on — with its own lock, so a slow write-back on one source never serializes
+a toggle on another. A shard that doesn't exist yet reads its source's slice
+of the unified v3 document; see `migrate_to_shards`.
 """
 
 import hashlib
@@ -19,19 +25,40 @@ import json
 import os
 import struct
 import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
 from json_cache_io import atomic_write_json, now_ms as _now_ms
 
 STATES = ("favorite", "reject", "hidden")
 
+# Guards one-time migrations and the shard-lock registry; per-source reads
+# and writes take `_source_lock` instead.
 _LOCK = threading.RLock()
+_SHARD_LOCKS: dict[str, threading.RLock] = {}
 _FULL_HASH_CHUNK = 1024 * 1024
 _PARTIAL_CHUNK = 1024 * 1024
 _PARTIAL_THRESHOLD = 2 * _PARTIAL_CHUNK
+# Rediscovery candidates are hashed concurrently; file reads and sha256 both
+# release the GIL, so a few threads overlap the IO of a large move batch.
+_HASH_WORKERS = max(1, min(8, os.cpu_count() or 1))
 
 _STATE_FLAG = {"favorite": "favorite", "reject": "rejected", "hidden": "hiddenSelf"}
 
+# Client hydration trusts a verification result this recent instead of
+# stat'ing (and possibly hashing) every tracked entry again. Results are kept
+# in memory, keyed by the entry's full stored signature, so any write that
+# touches an entry (rename, refresh, upgrade) invalidates its record by
+# construction; only an external change inside the window goes unseen, and a
+# background pass re-verifies entries before they go stale.
+VERIFY_WINDOW_MS = 30_000
+_VERIFY_FIELDS = ("path", "kind", "contentId", "legacySha256", "size", "mtimeNs")
+_VERIFY_RECORDS_SOFT_CAP = 65536
+_verify_lock = threading.Lock()
+_verify_records: dict[tuple[str, str], dict[tuple[str, tuple], tuple[int, bool]]] = {}
+_background_verifies: set[tuple[str, str]] = set()
+
 
 def _empty_cache() -> dict[str, Any]:
     return {"version": 3, "updatedAt": _now_ms(), "states": {}, "activity": {}}
@@ -315,6 +342,87 @@ def _save(cache_path: str, cache: dict[str, Any]) -> None:
     atomic_write_json(cache_path, cache, prefix=".file_state.")
 
 
+def _shard_path(cache_path: str, source: str) -> str:
+    """Path of one source's shard, e.g. ``file_state.output.json``."""
+    stem, ext = os.path.splitext(cache_path)
+    safe_source = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in source)
+    return f"{stem}.{safe_source}{ext or '.json'}"
+
+
+def _source_lock(cache_path: str, source: str) -> threading.RLock:
+    shard = _shard_path(cache_path, source)
+    with _LOCK:
+        lock = _SHARD_LOCKS.get(shard)
+        if lock is None:
+            lock = threading.RLock()
+            _SHARD_LOCKS[shard] = lock
+        return lock
+
+
+def _source_slice(cache: dict[str, Any], source: str) -> dict[str, Any]:
+    """Reduce a unified document to the one source a shard holds."""
+    sliced = _empty_cache()
+    sliced["updatedAt"] = cache["updatedAt"]
+    if source in cache["states"]:
+        sliced["states"][source] = cache["states"][source]
+    if source in cache["activity"]:
+        sliced["activity"][source] = cache["activity"][source]
+    return sliced
+
+
+def _load_source(cache_path: str, source: str) -> dict[str, Any]:
+    """Load one source's shard, falling back to the unified document.
+
+    The fallback is the lazy half of `migrate_to_shards`: until a source's
+    shard is first written, its state still lives in ``cache_path``.
+    """
+    shard = _shard_path(cache_path, source)
+    if os.path.exists(shard):
+        return _load(shard)
+    return _source_slice(_load(cache_path), source)
+
+
+def _save_source(cache_path: str, source: str, cache: dict[str, Any]) -> None:
+    _save(_shard_path(cache_path, source), _source_slice(cache, source))
+
+
+def _existing_shards(cache_path: str) -> list[str]:
+    """Shard files already on disk for ``cache_path`` (temp files excluded)."""
+    directory = os.path.dirname(cache_path) or "."
+    unified = os.path.basename(cache_path)
+    stem, ext = os.path.splitext(unified)
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return []
+    return [
+        os.path.join(directory, name)
+        for name in names
+        if name != unified
+        and name.startswith(stem + ".")
+        and name.endswith(ext or ".json")
+    ]
+
+
+def migrate_to_shards(cache_path: str) -> bool:
+    """Split the unified v3 document into per-source shards, once.
+
+    Runs only while no shard exists yet, so a later restart can never
+    resurrect state the user has since changed in a shard. The unified file is
+    left in place for rollback, the same way `migrate_legacy` keeps the files
+    it migrated from; readers ignore it for any source that has a shard.
+    """
+    with _LOCK:
+        if _existing_shards(cache_path) or not os.path.exists(cache_path):
+            return False
+        cache = _load(cache_path)
+        sources = set(cache["states"]) | set(cache["activity"])
+        for source in sorted(sources):
+            with _source_lock(cache_path, source):
+                _save_source(cache_path, source, cache)
+        return bool(sources)
+
+
 def _prune_empty(source_states: dict[str, list]) -> None:
     for state in list(source_states.keys()):
         if not source_states[state]:
@@ -412,12 +520,17 @@ def _verify_entry(entry: dict[str, Any], base_dir: str) -> str | None:
     return path
 
 
+def _verify_signature(entry: dict[str, Any]) -> tuple:
+    return tuple(entry.get(field) for field in _VERIFY_FIELDS)
+
+
 def _get_verified_states(
     cache_path: str,
     source: str,
     states: tuple[str, ...],
     base_dir: str,
-) -> dict[str, list[str]]:
+    max_age_ms: int = 0,
+) -> tuple[dict[str, list[str]], dict[str, dict[str, int]]]:
     """Verify state snapshots without holding the module lock while hashing.
 
     Upgrades are reapplied to a freshly loaded cache only when the entry's
@@ -425,14 +538,14 @@ def _get_verified_states(
     concurrent rename (path is never copied back from the snapshot) while
     avoiding clobbering a writer that refreshed or replaced the entry.
     """
-    with _LOCK:
-        cache = _load(cache_path)
+    with _source_lock(cache_path, source):
+        cache = _load_source(cache_path, source)
         snapshots = {
             state: [dict(entry) for entry in cache["states"].get(source, {}).get(state, [])]
             for state in states
         }
 
-    return _verify_snapshots(cache_path, source, snapshots, base_dir)
+    return _verify_snapshots_timed(cache_path, source, snapshots, base_dir, max_age_ms)
 
 
 def _verify_snapshots(
@@ -440,32 +553,82 @@ def _verify_snapshots(
     source: str,
     snapshots: dict[str, list[dict[str, Any]]],
     base_dir: str,
+    max_age_ms: int = 0,
 ) -> dict[str, list[str]]:
     """Verify already-loaded snapshots and write back any identity upgrades.
 
     Split out so a caller that has just loaded the cache for another reason can
     verify from that same read instead of parsing the state file again.
     """
+    result, _ = _verify_snapshots_timed(cache_path, source, snapshots, base_dir, max_age_ms)
+    return result
+
+
+def _verify_snapshots_timed(
+    cache_path: str,
+    source: str,
+    snapshots: dict[str, list[dict[str, Any]]],
+    base_dir: str,
+    max_age_ms: int = 0,
+) -> tuple[dict[str, list[str]], dict[str, dict[str, int]]]:
+    """`_verify_snapshots`, plus when each returned path was last verified.
+
+    With ``max_age_ms`` > 0 an entry whose unchanged signature was verified
+    within that window reuses the recorded outcome (present or not) without
+    touching disk. Records older than half the window are refreshed by a
+    background pass so steady-state reads stay disk-free.
+    """
     states = tuple(snapshots)
+    now = _now_ms()
+    with _verify_lock:
+        records = dict(_verify_records.get((cache_path, source), {}))
+
     result: dict[str, list[str]] = {}
+    verified_at: dict[str, dict[str, int]] = {}
+    fresh: dict[tuple[str, tuple], tuple[int, bool]] = {}
+    refresh_due = False
     updates: dict[str, list[dict[str, Any]]] = {state: [] for state in states}
     for state, entries in snapshots.items():
         paths: list[str] = []
+        stamps: dict[str, int] = {}
         for entry in entries:
+            if max_age_ms > 0:
+                record = records.get((state, _verify_signature(entry)))
+                if record is not None and now - record[0] <= max_age_ms:
+                    if now - record[0] > max_age_ms // 2:
+                        refresh_due = True
+                    if record[1]:
+                        paths.append(entry["path"])
+                        stamps[entry["path"]] = record[0]
+                    continue
             before = dict(entry)
             identity = _entry_identity(before)
             verified = _verify_entry(entry, base_dir)
+            fresh[(state, _verify_signature(entry))] = (now, verified is not None)
             if verified:
                 paths.append(verified)
+                stamps[verified] = now
             if entry != before:
                 updates[state].append({"identity": identity, "before": before, "after": entry})
         result[state] = paths
+        verified_at[state] = stamps
+
+    if fresh:
+        with _verify_lock:
+            source_records = _verify_records.setdefault((cache_path, source), {})
+            if len(source_records) + len(fresh) > _VERIFY_RECORDS_SOFT_CAP:
+                # Backstop against records for entries that no longer exist;
+                # the cost of dropping them is one inline verification each.
+                source_records.clear()
+            source_records.update(fresh)
+    if refresh_due:
+        _schedule_background_verify(cache_path, source, base_dir)
 
     if not any(updates.values()):
-        return result
+        return result, verified_at
 
-    with _LOCK:
-        cache = _load(cache_path)
+    with _source_lock(cache_path, source):
+        cache = _load_source(cache_path, source)
         source_states = cache["states"].get(source, {})
         changed = False
         for state, state_updates in updates.items():
@@ -498,9 +661,29 @@ def _verify_snapshots(
                     entry.pop("legacySha256", None)
                     changed = True
         if changed:
-            _save(cache_path, cache)
+            _save_source(cache_path, source, cache)
+
+    return result, verified_at
 
-    return result
+
+def _schedule_background_verify(cache_path: str, source: str, base_dir: str) -> None:
+    """Re-verify every state of one source off the request path, once at a time."""
+    key = (cache_path, source)
+    with _verify_lock:
+        if key in _background_verifies:
+            return
+        _background_verifies.add(key)
+
+    def _run() -> None:
+        try:
+            _get_verified_states(cache_path, source, STATES, base_dir)
+        except Exception as exc:
+            print(f"[Mobile Frontend] Background file-state verification failed: {exc}")
+        finally:
+            with _verify_lock:
+                _background_verifies.discard(key)
+
+    threading.Thread(target=_run, name="mobile-file-state-verify", daemon=True).start()
 
 
 def get_paths(cache_path: str, source: str, state: str, base_dir: str) -> list[str]:
@@ -511,13 +694,14 @@ def get_paths(cache_path: str, source: str, state: str, base_dir: str) -> list[s
     """
     if state not in STATES:
         return []
-    return _get_verified_states(cache_path, source, (state,), base_dir)[state]
+    return _get_verified_states(cache_path, source, (state,), base_dir)[0][state]
 
 
 def get_hidden_listing_view(
     cache_path: str,
     source: str,
     base_dir: str,
+    max_age_ms: int = 0,
 ) -> tuple[list[str], set[str]]:
     """Everything a file listing needs about hidden state, from ONE load.
 
@@ -529,9 +713,13 @@ def get_hidden_listing_view(
     Directory paths are intersected with the verified set here, which is what
     the caller did by hand — a directory entry is only inheritance-worthy while
     it still resolves.
+
+    Strict by default (``max_age_ms=0``): the verified paths drop files from
+    the listing outright, so trusting a stale result could hide a new output
+    that reused a hidden file's name until the next verification.
     """
-    with _LOCK:
-        cache = _load(cache_path)
+    with _source_lock(cache_path, source):
+        cache = _load_source(cache_path, source)
         source_states = cache["states"].get(source, {})
         entries = [dict(entry) for entry in source_states.get("hidden", [])]
 
@@ -540,7 +728,9 @@ def get_hidden_listing_view(
     # kind="unknown" and only becomes kind="dir" when _verify_entry sees it
     # return. Reading them from the pre-verification snapshot silently dropped
     # that folder's inheritance for one listing.
-    verified = _verify_snapshots(cache_path, source, {"hidden": entries}, base_dir)["hidden"]
+    verified = _verify_snapshots(
+        cache_path, source, {"hidden": entries}, base_dir, max_age_ms,
+    )["hidden"]
     dir_paths = {
         entry.get("path")
         for entry in entries
@@ -550,9 +740,26 @@ def get_hidden_listing_view(
     return verified, dir_paths
 
 
-def get_all(cache_path: str, source: str, base_dir: str) -> dict[str, list[str]]:
-    """Read all three states at once, for client hydration."""
-    return _get_verified_states(cache_path, source, STATES, base_dir)
+def get_all(
+    cache_path: str,
+    source: str,
+    base_dir: str,
+    max_age_ms: int = VERIFY_WINDOW_MS,
+    include_verified_at: bool = False,
+) -> dict[str, Any]:
+    """Read all three states at once, for client hydration.
+
+    Entries verified within ``max_age_ms`` are served from their recorded
+    result without touching disk; pass 0 to force a full verification. With
+    ``include_verified_at`` the result also carries a ``verifiedAt`` map of
+    state -> path -> epoch ms for every returned path.
+    """
+    result, verified_at = _get_verified_states(
+        cache_path, source, STATES, base_dir, max_age_ms,
+    )
+    if include_verified_at:
+        return {**result, "verifiedAt": verified_at}
+    return result
 
 
 def get_hidden_paths(cache_path: str, source: str) -> set[str]:
@@ -567,8 +774,8 @@ def get_hidden_paths(cache_path: str, source: str) -> set[str]:
     unknown kind. This raw read is kept for callers that only need the
     already-known directories, and for tests that assert on them directly.
     """
-    with _LOCK:
-        cache = _load(cache_path)
+    with _source_lock(cache_path, source):
+        cache = _load_source(cache_path, source)
     return {
         entry.get("path")
         for entry in cache["states"].get(source, {}).get("hidden", [])
@@ -706,8 +913,8 @@ def set_state(cache_path: str, source: str, state: str, base_dir: str, path: str
         # Transitional legacy favorites still use a full SHA identity. Only pay
         # that cost when a same-path or same-size candidate could match this
         # file; hashing remains outside the lock.
-        with _LOCK:
-            snapshot = _load(cache_path)
+        with _source_lock(cache_path, source):
+            snapshot = _load_source(cache_path, source)
             source_snapshot = snapshot["states"].get(source, {})
             needs_legacy_hash = any(
                 isinstance(entry.get("legacySha256"), str)
@@ -750,8 +957,8 @@ def set_state(cache_path: str, source: str, state: str, base_dir: str, path: str
             return False
     activity_now = _now_ms()
 
-    with _LOCK:
-        cache = _load(cache_path)
+    with _source_lock(cache_path, source):
+        cache = _load_source(cache_path, source)
         source_states = cache["states"].setdefault(source, {})
 
         if value:
@@ -795,7 +1002,7 @@ def set_state(cache_path: str, source: str, state: str, base_dir: str, path: str
             activity_now,
             activity_stat,
         )
-        _save(cache_path, cache)
+        _save_source(cache_path, source, cache)
     return True
 
 
@@ -818,79 +1025,94 @@ def plan_remove_path(
     If a tracked file moved externally and a replacement reused its old path,
     the replacement is deleted without erasing the moved original's state.
     """
-    normalized = _normalize_path(path)
-    if not normalized:
+    return plan_remove_paths(cache_path, source, base_dir, [path]).get(path, {})
+
+
+def _covering_paths(entry_path: str, targets: set[str]) -> list[str]:
+    """Every path in ``targets`` equal to ``entry_path`` or one of its ancestors."""
+    parts = entry_path.split("/")
+    return [
+        candidate
+        for candidate in ("/".join(parts[:i]) for i in range(1, len(parts) + 1))
+        if candidate in targets
+    ]
+
+
+def _plan_entry(entry: dict[str, Any], base_dir: str) -> dict[str, Any] | None:
+    """Removal record for ``entry`` if it still resolves to the item on disk."""
+    expected_fields = ("path", "kind", "contentId", "legacySha256", "size", "mtimeNs")
+    planned = {
+        "identity": _removal_identity(entry),
+        "expected": {field: entry.get(field) for field in expected_fields},
+    }
+    target = _full_path(base_dir, entry["path"])
+    kind = entry.get("kind")
+    if kind == "dir":
+        return planned if target and os.path.isdir(target) else None
+    if kind == "unknown":
+        return planned if target and os.path.exists(target) else None
+    if not target or not os.path.isfile(target):
+        return None
+    try:
+        stat = os.stat(target)
+        cid = entry.get("contentId")
+        legacy = entry.get("legacySha256")
+        if isinstance(cid, str) and cid:
+            if int(stat.st_size) != entry.get("size"):
+                return None
+            if int(stat.st_mtime_ns) == entry.get("mtimeNs") or content_id(target) == cid:
+                return planned
+            return None
+        if isinstance(legacy, str) and legacy:
+            return planned if _full_sha256(target) == legacy else None
+        return planned
+    except OSError:
+        return None
+
+
+def plan_remove_paths(
+    cache_path: str,
+    source: str,
+    base_dir: str,
+    paths: list[str],
+) -> dict[str, dict[str, list[dict[str, Any]]]]:
+    """`plan_remove_path` for many items from a single state snapshot.
+
+    Returns one plan per requested path (keyed as given). An entry under two
+    requested paths (a folder and a file inside it) appears in both plans and
+    is only verified once.
+    """
+    by_normalized: dict[str, list[str]] = {}
+    for path in paths:
+        normalized = _normalize_path(path)
+        if normalized:
+            by_normalized.setdefault(normalized, []).append(path)
+    if not by_normalized:
         return {}
-    prefix = normalized + "/"
-    with _LOCK:
-        cache = _load(cache_path)
+    targets = set(by_normalized)
+    with _source_lock(cache_path, source):
+        cache = _load_source(cache_path, source)
         snapshots = {
             state: [
-                dict(entry)
+                (dict(entry), covering)
                 for entry in cache["states"].get(source, {}).get(state, [])
-                if entry.get("path") == normalized
-                or str(entry.get("path", "")).startswith(prefix)
+                if isinstance(entry.get("path"), str)
+                for covering in [_covering_paths(entry["path"], targets)]
+                if covering
             ]
             for state in STATES
         }
 
-    expected_fields = ("path", "kind", "contentId", "legacySha256", "size", "mtimeNs")
-    plan: dict[str, list[dict[str, Any]]] = {}
+    plans: dict[str, dict[str, list[dict[str, Any]]]] = {}
     for state, entries in snapshots.items():
-        planned_entries: list[dict[str, Any]] = []
-        for entry in entries:
-            entry_path = entry.get("path")
-            if not isinstance(entry_path, str):
-                continue
-            target = _full_path(base_dir, entry_path)
-            kind = entry.get("kind")
-            if kind == "dir":
-                if target and os.path.isdir(target):
-                    planned_entries.append({
-                        "identity": _removal_identity(entry),
-                        "expected": {field: entry.get(field) for field in expected_fields},
-                    })
-                continue
-            if kind == "unknown":
-                if target and os.path.exists(target):
-                    planned_entries.append({
-                        "identity": _removal_identity(entry),
-                        "expected": {field: entry.get(field) for field in expected_fields},
-                    })
-                continue
-            if not target or not os.path.isfile(target):
-                continue
-            try:
-                stat = os.stat(target)
-                cid = entry.get("contentId")
-                legacy = entry.get("legacySha256")
-                if isinstance(cid, str) and cid:
-                    if int(stat.st_size) != entry.get("size"):
-                        continue
-                    if (
-                        int(stat.st_mtime_ns) == entry.get("mtimeNs")
-                        or content_id(target) == cid
-                    ):
-                        planned_entries.append({
-                            "identity": _removal_identity(entry),
-                            "expected": {field: entry.get(field) for field in expected_fields},
-                        })
-                elif isinstance(legacy, str) and legacy:
-                    if _full_sha256(target) == legacy:
-                        planned_entries.append({
-                            "identity": _removal_identity(entry),
-                            "expected": {field: entry.get(field) for field in expected_fields},
-                        })
-                else:
-                    planned_entries.append({
-                        "identity": _removal_identity(entry),
-                        "expected": {field: entry.get(field) for field in expected_fields},
-                    })
-            except OSError:
+        for entry, covering in entries:
+            planned = _plan_entry(entry, base_dir)
+            if planned is None:
                 continue
-        if planned_entries:
-            plan[state] = planned_entries
-    return plan
+            for normalized in covering:
+                for path in by_normalized[normalized]:
+                    plans.setdefault(path, {}).setdefault(state, []).append(planned)
+    return plans
 
 
 def remove_path(
@@ -904,29 +1126,53 @@ def remove_path(
     API deletes pass an identity-aware plan captured before filesystem removal.
     The path-only fallback remains for explicit administrative cleanup callers.
     """
-    normalized = _normalize_path(path)
-    if not normalized:
+    remove_paths(
+        cache_path,
+        source,
+        [path],
+        None if removal_plan is None else {path: removal_plan},
+    )
+
+
+def remove_paths(
+    cache_path: str,
+    source: str,
+    paths: list[str],
+    removal_plans: dict[str, dict[str, list[dict[str, Any]]]] | None = None,
+) -> None:
+    """`remove_path` for many deleted items in one load and one save.
+
+    ``removal_plans`` is `plan_remove_paths` output; a path without a plan
+    (nothing verified there) only has its activity dropped.
+    """
+    normalized_paths = {
+        normalized
+        for normalized in (_normalize_path(path) for path in paths)
+        if normalized
+    }
+    if not normalized_paths:
         return
-    prefix = normalized + "/"
-    with _LOCK:
-        cache = _load(cache_path)
+    planned: dict[str, dict[Any, dict[str, Any]]] = {state: {} for state in STATES}
+    if removal_plans is not None:
+        for plan in removal_plans.values():
+            for state, items in plan.items():
+                for item in items:
+                    planned[state][item["identity"]] = item["expected"]
+    with _source_lock(cache_path, source):
+        cache = _load_source(cache_path, source)
         source_states = cache["states"].get(source, {})
         changed = False
         for state in STATES:
             entries = source_states.get(state, [])
-            if removal_plan is None:
+            if removal_plans is None:
                 kept = [
                     e for e in entries
-                    if e.get("path") != normalized and not str(e.get("path", "")).startswith(prefix)
+                    if not _covering_paths(str(e.get("path", "")), normalized_paths)
                 ]
             else:
-                planned = {
-                    item["identity"]: item["expected"]
-                    for item in removal_plan.get(state, [])
-                }
                 kept = []
                 for entry in entries:
-                    expected = planned.get(_removal_identity(entry))
+                    expected = planned[state].get(_removal_identity(entry))
                     if expected is None or any(
                         entry.get(field) != value for field, value in expected.items()
                     ):
@@ -941,7 +1187,7 @@ def remove_path(
         removed_activity = [
             activity_path
             for activity_path in source_activity
-            if activity_path == normalized or activity_path.startswith(prefix)
+            if _covering_paths(activity_path, normalized_paths)
         ]
         for activity_path in removed_activity:
             source_activity.pop(activity_path, None)
@@ -952,7 +1198,7 @@ def remove_path(
         if changed:
             if not source_states:
                 cache["states"].pop(source, None)
-            _save(cache_path, cache)
+            _save_source(cache_path, source, cache)
 
 
 def rename_path(
@@ -970,8 +1216,8 @@ def rename_path(
         return
     prefix = old + "/"
     activity_now = _now_ms()
-    with _LOCK:
-        cache = _load(cache_path)
+    with _source_lock(cache_path, source):
+        cache = _load_source(cache_path, source)
         source_states = cache["states"].get(source, {})
         changed = False
         for state in STATES:
@@ -1032,7 +1278,7 @@ def rename_path(
             _touch_activity(cache, source, new, activity_now)
             changed = True
         if changed:
-            _save(cache_path, cache)
+            _save_source(cache_path, source, cache)
 
 
 def _is_hidden_by_prefix(rel_path: str, hidden_set: set) -> bool:
@@ -1108,6 +1354,69 @@ def _apply_activity_dates(
         item["modifiedDate"] = max(int(item.get("modifiedDate") or 0), modified_at)
 
 
+def _memo_hash(memo: dict[tuple[str, str], str], kind: str, full_path: str) -> str:
+    """Hash ``full_path`` at most once per listing; "" records a failed read.
+
+    One listed file can be probed by all three states (own path and size
+    bucket alike), so the memo keeps that to a single read of its bytes.
+    """
+    key = (kind, full_path)
+    cached = memo.get(key)
+    if cached is None:
+        try:
+            cached = content_id(full_path) if kind == "partial" else _full_sha256(full_path)
+        except OSError:
+            cached = ""
+        memo[key] = cached
+    return cached
+
+
+def _needs_partial_hash(
+    rel: str,
+    size: int,
+    mtime_ns: int,
+    by_path_state: dict[str, dict[str, Any]],
+    hashable_sizes: set[int],
+) -> bool:
+    """True when matching a listed file against one state will read its bytes.
+
+    Mirrors the decisions `_lookup_and_match` makes before hashing, so the
+    batched pre-hash stage only touches files that would be hashed anyway.
+    Legacy full-hash fallbacks stay lazy: they are rare and only needed after
+    every partial-hash candidate has missed.
+    """
+    own_entry = by_path_state.get(rel)
+    if own_entry is not None and own_entry.get("kind") in ("file", "unknown"):
+        cid = own_entry.get("contentId")
+        if isinstance(cid, str) and cid:
+            if own_entry.get("size") == size:
+                if own_entry.get("mtimeNs") == mtime_ns:
+                    return False
+                return True
+        elif not own_entry.get("legacySha256"):
+            return True
+    return size in hashable_sizes
+
+
+def _prehash_partials(full_paths: list[str], memo: dict[tuple[str, str], str]) -> None:
+    """Fill ``memo`` with partial hashes for every candidate, concurrently."""
+    pending = [path for path in dict.fromkeys(full_paths) if ("partial", path) not in memo]
+    if len(pending) < 2:
+        for path in pending:
+            _memo_hash(memo, "partial", path)
+        return
+
+    def _hash_one(path: str) -> str:
+        try:
+            return content_id(path)
+        except OSError:
+            return ""
+
+    with ThreadPoolExecutor(max_workers=min(_HASH_WORKERS, len(pending))) as pool:
+        for path, identity in zip(pending, pool.map(_hash_one, pending)):
+            memo[("partial", path)] = identity
+
+
 def _lookup_and_match(
     rel: str,
     full_path: str,
@@ -1115,13 +1424,18 @@ def _lookup_and_match(
     by_path_state: dict[str, dict[str, Any]],
     by_size_state: dict[int, list[dict[str, Any]]],
     base_dir: str,
+    memo: dict[tuple[str, str], str] | None = None,
 ) -> dict[str, Any] | None:
     """Try to match a listed file against one state's tracked entries.
 
     Returns None on no match, else `{"update": None|{...}}` — `update`
     describes a path/mtime move (and, for a legacy/path-only entry, the
-    contentId upgrade) to apply back to the cache under lock.
+    contentId upgrade) to apply back to the cache under lock. Hashes come
+    from ``memo`` (shared across states and pre-filled by the batched stage
+    in `annotate_listing`); anything missing is computed and memoized here.
     """
+    if memo is None:
+        memo = {}
     size = int(stat.st_size)
     mtime_ns = int(stat.st_mtime_ns)
 
@@ -1132,36 +1446,26 @@ def _lookup_and_match(
             if int(own_entry.get("size", -1)) == size:
                 if int(own_entry.get("mtimeNs", -1)) == mtime_ns:
                     return {"update": None}
-                try:
-                    if content_id(full_path) == cid:
-                        return {
-                            "update": _listing_update(
-                                own_entry, rel, "file", size, mtime_ns, None,
-                            )
-                        }
-                except OSError:
-                    pass
+                if _memo_hash(memo, "partial", full_path) == cid:
+                    return {
+                        "update": _listing_update(
+                            own_entry, rel, "file", size, mtime_ns, None,
+                        )
+                    }
         else:
             legacy = own_entry.get("legacySha256")
             if isinstance(legacy, str) and legacy:
-                try:
-                    if _full_sha256(full_path) == legacy:
+                if _memo_hash(memo, "full", full_path) == legacy:
+                    new_cid = _memo_hash(memo, "partial", full_path)
+                    if new_cid:
                         return {
                             "update": _listing_update(
-                                own_entry,
-                                rel,
-                                "file",
-                                size,
-                                mtime_ns,
-                                content_id(full_path),
+                                own_entry, rel, "file", size, mtime_ns, new_cid,
                             )
                         }
-                except OSError:
-                    pass
             else:
-                try:
-                    new_cid = content_id(full_path)
-                except OSError:
+                new_cid = _memo_hash(memo, "partial", full_path)
+                if not new_cid:
                     return None
                 return {
                     "update": _listing_update(
@@ -1183,10 +1487,7 @@ def _lookup_and_match(
         if not (isinstance(cid, str) and cid):
             continue
         if partial is None:
-            try:
-                partial = content_id(full_path)
-            except OSError:
-                partial = ""
+            partial = _memo_hash(memo, "partial", full_path)
         if partial and partial == cid:
             if candidate.get("path") == rel and candidate.get("mtimeNs") == mtime_ns:
                 return {"update": None}
@@ -1204,16 +1505,12 @@ def _lookup_and_match(
         if not (isinstance(legacy, str) and legacy):
             continue
         if full is None:
-            try:
-                full = _full_sha256(full_path)
-            except OSError:
-                full = ""
+            full = _memo_hash(memo, "full", full_path)
         if full and full == legacy:
             if not _entry_is_a_move(candidate, rel, base_dir):
                 continue
-            try:
-                new_cid = partial if partial else content_id(full_path)
-            except OSError:
+            new_cid = partial if partial else _memo_hash(memo, "partial", full_path)
+            if not new_cid:
                 return None
             return {
                 "update": _listing_update(
@@ -1237,8 +1534,8 @@ def annotate_listing(
     applying hidden's folder inheritance via `hidden_set` (dirs aren't
     hashed, so inheritance stays purely path-based).
     """
-    with _LOCK:
-        cache = _load(cache_path)
+    with _source_lock(cache_path, source):
+        cache = _load_source(cache_path, source)
         source_states = cache["states"].get(source, {})
         source_activity = {
             path: dict(entry)
@@ -1246,6 +1543,7 @@ def annotate_listing(
         }
         by_path: dict[str, dict[str, Any]] = {}
         by_size: dict[str, dict[int, list[dict[str, Any]]]] = {}
+        hashable_sizes: dict[str, set[int]] = {}
         for state in STATES:
             entries = source_states.get(state, [])
             by_path[state] = {entry.get("path"): dict(entry) for entry in entries}
@@ -1257,11 +1555,17 @@ def annotate_listing(
                 if isinstance(size, int):
                     sizes.setdefault(size, []).append(dict(entry))
             by_size[state] = sizes
+            hashable_sizes[state] = {
+                size
+                for size, bucket in sizes.items()
+                if any(isinstance(e.get("contentId"), str) and e.get("contentId") for e in bucket)
+            }
 
     # Hashing happens outside the lock (large media is slow); matches are
     # re-applied against a freshly reloaded cache below.
     updates: dict[str, list[dict[str, Any]]] = {state: [] for state in STATES}
     base = os.path.abspath(base_dir)
+    listed_files: list[tuple[dict[str, Any], str, str, os.stat_result]] = []
 
     for item in files:
         rel = _normalize_path(item.get("path"))
@@ -1297,10 +1601,36 @@ def annotate_listing(
             continue
 
         _apply_activity_dates(item, source_activity.get(rel), stat)
+        listed_files.append((item, rel, full_path, stat))
+
+    # Rediscovery is batched rather than hashed file by file: one cheap pass
+    # over the stats picks out the few files whose own entry changed or whose
+    # size collides with a tracked entry, and only those are read — each once,
+    # concurrently — before matching. On a large listing nearly every file is
+    # settled by a set lookup and never opened.
+    memo: dict[tuple[str, str], str] = {}
+    _prehash_partials(
+        [
+            full_path
+            for _, rel, full_path, stat in listed_files
+            if any(
+                _needs_partial_hash(
+                    rel,
+                    int(stat.st_size),
+                    int(stat.st_mtime_ns),
+                    by_path[state],
+                    hashable_sizes[state],
+                )
+                for state in STATES
+            )
+        ],
+        memo,
+    )
 
+    for item, rel, full_path, stat in listed_files:
         for state in STATES:
             result = _lookup_and_match(
-                rel, full_path, stat, by_path[state], by_size[state], base,
+                rel, full_path, stat, by_path[state], by_size[state], base, memo,
             )
             if result is None:
                 continue
@@ -1312,15 +1642,28 @@ def annotate_listing(
         if item.get("hiddenSelf") or _is_hidden_by_prefix(rel, hidden_set):
             item["hidden"] = True
 
+    _apply_listing_updates(cache_path, source, updates)
+
+
+def _apply_listing_updates(
+    cache_path: str,
+    source: str,
+    updates: dict[str, list[dict[str, Any]]],
+) -> int:
+    """Apply `_listing_update` records to a freshly loaded shard, under lock.
+
+    Each update only lands if its entry still matches the snapshot it was
+    derived from. Returns how many entries changed.
+    """
     if not any(updates.values()):
-        return
+        return 0
 
-    with _LOCK:
-        cache = _load(cache_path)
+    applied = 0
+    with _source_lock(cache_path, source):
+        cache = _load_source(cache_path, source)
         source_states = cache["states"].get(source, {})
-        changed = False
         for state in STATES:
-            state_updates = updates[state]
+            state_updates = updates.get(state, [])
             if not state_updates:
                 continue
             by_identity = {u["identity"]: u for u in state_updates}
@@ -1351,9 +1694,163 @@ def annotate_listing(
                         if update["contentId"]:
                             entry["contentId"] = update["contentId"]
                             entry.pop("legacySha256", None)
-                    changed = True
-        if changed:
-            _save(cache_path, cache)
+                    applied += 1
+        if applied:
+            _save_source(cache_path, source, cache)
+    return applied
+
+
+# Legacy upgrades run in the background, one file at a time, pausing between
+# full hashes so a multi-GB library never competes with interactive requests.
+_LEGACY_UPGRADE_PAUSE_S = 0.05
+_legacy_upgrade_status: dict[tuple[str, str], dict[str, Any]] = {}
+
+
+def get_legacy_upgrade_status(cache_path: str, source: str) -> dict[str, Any]:
+    """Progress of the legacy upgrade for one source, for status polling."""
+    with _LOCK:
+        status = dict(_legacy_upgrade_status.get((cache_path, source), {}))
+    return {
+        "running": bool(status.get("running")),
+        "total": int(status.get("total", 0)),
+        "processed": int(status.get("processed", 0)),
+        "upgraded": int(status.get("upgraded", 0)),
+    }
+
+
+def _iter_listable_files(base_dir: str):
+    """Yield (rel_path, full_path) for every non-dot file under ``base_dir``."""
+    base = os.path.abspath(base_dir)
+    for root, dirs, names in os.walk(base):
+        dirs[:] = [name for name in dirs if not name.startswith(".")]
+        for name in names:
+            if name.startswith("."):
+                continue
+            full_path = os.path.join(root, name)
+            yield os.path.relpath(full_path, base).replace(os.sep, "/"), full_path
+
+
+def upgrade_legacy_entries(cache_path: str, source: str, base_dir: str) -> dict[str, Any]:
+    """Retire `legacySha256` entries by finding their files and re-keying them.
+
+    Each legacy entry is checked at its recorded path first, then against
+    every same-size file under ``base_dir`` (one directory walk for the whole
+    batch). A full-hash match is upgraded to a partial `contentId` — re-pointed
+    at the file's current path when it moved — through the same guarded
+    write-back listings use, so a concurrent rename or toggle still wins.
+    Entries whose file is nowhere to be found are left for a later pass.
+
+    Synchronous and slow by design; `start_legacy_upgrade` runs it on a
+    background thread. Returns the final status.
+    """
+    key = (cache_path, source)
+    with _source_lock(cache_path, source):
+        cache = _load_source(cache_path, source)
+        pending = [
+            (state, dict(entry))
+            for state in STATES
+            for entry in cache["states"].get(source, {}).get(state, [])
+            if entry.get("kind") == "file" and entry.get("legacySha256")
+        ]
+    with _LOCK:
+        status = _legacy_upgrade_status.setdefault(key, {})
+        status.update({"running": True, "total": len(pending), "processed": 0, "upgraded": 0})
+
+    try:
+        full_hashes: dict[str, str] = {}
+        by_size: dict[int, list[tuple[str, str]]] | None = None
+        updates: dict[str, list[dict[str, Any]]] = {state: [] for state in STATES}
+
+        def _matches(full_path: str, legacy: str) -> bool:
+            if full_path not in full_hashes:
+                try:
+                    full_hashes[full_path] = _full_sha256(full_path)
+                except OSError:
+                    full_hashes[full_path] = ""
+                time.sleep(_LEGACY_UPGRADE_PAUSE_S)
+            return full_hashes[full_path] == legacy
+
+        for state, entry in pending:
+            legacy = entry["legacySha256"]
+            size = entry.get("size") or 0
+            found: tuple[str, str] | None = None
+            recorded = _full_path(base_dir, entry["path"])
+            if recorded and os.path.isfile(recorded) and _matches(recorded, legacy):
+                found = (entry["path"], recorded)
+            elif size > 0:
+                if by_size is None:
+                    wanted = {e.get("size") for _, e in pending if e.get("size")}
+                    by_size = {}
+                    for rel, full_path in _iter_listable_files(base_dir):
+                        try:
+                            file_size = os.path.getsize(full_path)
+                        except OSError:
+                            continue
+                        if file_size in wanted:
+                            by_size.setdefault(file_size, []).append((rel, full_path))
+                for rel, full_path in by_size.get(size, []):
+                    if _matches(full_path, legacy):
+                        found = (rel, full_path)
+                        break
+
+            if found is not None:
+                rel, full_path = found
+                try:
+                    new_cid, stat = _content_id_with_stat(full_path)
+                except OSError:
+                    new_cid = None
+                if new_cid:
+                    updates[state].append(_listing_update(
+                        entry, rel, "file", int(stat.st_size), int(stat.st_mtime_ns), new_cid,
+                    ))
+            with _LOCK:
+                status["processed"] += 1
+
+        upgraded = _apply_listing_updates(cache_path, source, updates)
+        with _LOCK:
+            status["upgraded"] = upgraded
+    finally:
+        with _LOCK:
+            status["running"] = False
+    return get_legacy_upgrade_status(cache_path, source)
+
+
+def start_legacy_upgrade(cache_path: str, source: str, base_dir: str) -> bool:
+    """Launch `upgrade_legacy_entries` on a daemon thread if there is work.
+
+    Returns False when the source has no legacy entries or a pass is already
+    running for it.
+    """
+    with _source_lock(cache_path, source):
+        cache = _load_source(cache_path, source)
+        has_legacy = any(
+            entry.get("legacySha256")
+            for entries in cache["states"].get(source, {}).values()
+            for entry in entries
+        )
+    if not has_legacy:
+        return False
+    key = (cache_path, source)
+    with _LOCK:
+        status = _legacy_upgrade_status.setdefault(key, {})
+        if status.get("running"):
+            return False
+        status.update({"running": True, "total": 0, "processed": 0, "upgraded": 0})
+
+    def _run() -> None:
+        try:
+            result = upgrade_legacy_entries(cache_path, source, base_dir)
+            print(
+                f"[Mobile Frontend] Legacy file-state upgrade for {source}: "
+                f"{result['upgraded']}/{result['total']} entries upgraded"
+            )
+        except Exception as exc:
+            with _LOCK:
+                status["running"] = False
+            print(f"[Mobile Frontend] Legacy file-state upgrade for {source} failed: {exc}")
+
+    threading.Thread(target=_run, name=f"mobile-file-state-legacy-{source}", daemon=True).start()
+    return True
 
 
 def _read_json(path: str) -> Any:
@@ -1374,7 +1871,10 @@ def migrate_legacy(
 ) -> bool:
     """One-time, lossless migration into the unified `file_state.json`.
 
-    Runs only while `cache_path` doesn't already exist yet — re-merging
+    The unified document is then split into per-source shards by
+    `migrate_to_shards` (or lazily, on each source's first write).
+
+    Runs only while neither `cache_path` nor any shard exists yet — re-merging
     legacy files on every startup would resurrect state the user already
     changed since. `base_dirs` maps source name ("output"/"input"/"temp") to
     its real directory, used to eagerly hash present files and stat legacy
@@ -1391,7 +1891,7 @@ def migrate_legacy(
     """
     base_dirs = base_dirs or {}
     with _LOCK:
-        if os.path.exists(cache_path):
+        if os.path.exists(cache_path) or _existing_shards(cache_path):
             return False
 
         merged = _empty_cache()
@@ -7,20 +7,34 @@ phone, which is what made opening/swiping lag.
 
 This renders a preview capped to the device's screen size (longest edge), and
 caches the result on disk keyed by file identity + max edge so the expensive
-source decode happens at most once per (image, size). Heavy deps (PIL) are
-imported lazily so importing this module stays cheap.
+source decode happens at most once per (image, size), within a bounded,
+least-recently-served cache. Heavy deps (PIL) are imported lazily so importing
+this module stays cheap.
 """
 
 import hashlib
 import io
 import os
+import threading
 
 import binary_cache_io as _binary_cache_io
+import mobile_image_thumbs as _mobile_image_thumbs
+import mobile_render_pool as _mobile_render_pool
+import mobile_video_thumbs as _mobile_video_thumbs
 
 DEFAULT_MAX_EDGE = 2048
 MIN_MAX_EDGE = 256
 MAX_MAX_EDGE = 4096
 PREVIEW_QUALITY = 85
+# Screen-sized WebPs run ~0.2-1 MB; keep a few thousand of the most recently
+# viewed.
+CACHE_MAX_BYTES = 2 * 1024 * 1024 * 1024
+CACHE_MAX_FILES = 5000
+# Distinct max edges clients asked for most recently (screen size differs per
+# device), so pre-rendering targets the sizes that will actually be requested.
+_RECENT_EDGES_MAX = 3
+_recent_edges_lock = threading.Lock()
+_recent_edges = []
 
 
 def clamp_max_edge(value, default=DEFAULT_MAX_EDGE):
@@ -32,6 +46,21 @@ def clamp_max_edge(value, default=DEFAULT_MAX_EDGE):
     return max(MIN_MAX_EDGE, min(MAX_MAX_EDGE, edge))
 
 
+def note_requested_edge(max_edge):
+    """Record a client-requested max edge (already clamped)."""
+    with _recent_edges_lock:
+        if max_edge in _recent_edges:
+            _recent_edges.remove(max_edge)
+        _recent_edges.insert(0, max_edge)
+        del _recent_edges[_RECENT_EDGES_MAX:]
+
+
+def recent_max_edges():
+    """Max edges worth pre-rendering: recent client sizes, else the default."""
+    with _recent_edges_lock:
+        return list(_recent_edges) or [DEFAULT_MAX_EDGE]
+
+
 def _cache_dir():
     import folder_paths
 
@@ -40,7 +69,7 @@ def _cache_dir():
     return path
 
 
-def _cache_path(file_path, max_edge):
+def _cache_digest(file_path, max_edge):
     try:
         stat = os.stat(file_path)
         key = '{}|{}|{}|{}'.format(
@@ -49,26 +78,44 @@ def _cache_path(file_path, max_edge):
     except OSError:
         key = '{}|{}'.format(os.path.abspath(file_path), max_edge)
     # Non-security cache key; usedforsecurity=False keeps security scanners quiet.
-    digest = hashlib.md5(key.encode('utf-8'), usedforsecurity=False).hexdigest()
-    return os.path.join(_cache_dir(), digest + '.webp')
+    return hashlib.md5(key.encode('utf-8'), usedforsecurity=False).hexdigest()
+
+
+def _cache_path(file_path, max_edge):
+    return _binary_cache_io.sharded_path(
+        _cache_dir(), _cache_digest(file_path, max_edge), '.webp'
+    )
+
+
+def etag(file_path, max_edge):
+    """Strong ETag for (file, max_edge): changes exactly when the cache key does."""
+    return _binary_cache_io.etag_for(_cache_digest(file_path, max_edge))
 
 
 def get_cached(file_path, max_edge):
     """Return cached WebP bytes for (file, max_edge), or None if not cached."""
-    try:
-        path = _cache_path(file_path, max_edge)
-        if os.path.exists(path):
-            with open(path, 'rb') as handle:
-                return handle.read()
-    except OSError:
-        pass
-    return None
+    return _binary_cache_io.read_cached(_cache_path(file_path, max_edge))
+
+
+def cached_file(file_path, max_edge):
+    """Path of the cached WebP for (file, max_edge), or None if not cached."""
+    return _binary_cache_io.cached_file(_cache_path(file_path, max_edge))
 
 
 def store_cached(file_path, max_edge, data):
     # Atomic: a concurrent reader must never see (and the 24h browser cache
     # never pin) a half-written preview.
-    _binary_cache_io.atomic_write_bytes(_cache_path(file_path, max_edge), data)
+    _binary_cache_io.store_cached(
+        _cache_path(file_path, max_edge), data, CACHE_MAX_BYTES, CACHE_MAX_FILES
+    )
+
+
+def _encode_webp(img):
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+    buffer = io.BytesIO()
+    img.save(buffer, format='WEBP', quality=PREVIEW_QUALITY, method=4)
+    return buffer.getvalue()
 
 
 def render(file_path, max_edge):
@@ -77,21 +124,77 @@ def render(file_path, max_edge):
     Synchronous (decode + resize + encode) — call via run_in_executor. Returns
     the encoded WebP bytes.
     """
-    from PIL import Image, ImageOps
+    return render_pyramid(file_path, [max_edge], thumbnails=False)[max_edge]
 
+
+def encode_pyramid(file_path, max_edges, thumb_edges=()):
+    """Decode once and encode a preview for every edge in ``max_edges``.
+
+    Levels are produced largest first, each resized from the one before; the
+    thumbnail classes in ``thumb_edges`` (all no larger than the smallest
+    preview) are encoded from the last level. Pure, so it can run in a render
+    worker. Returns ({max_edge: webp_bytes}, {thumb_edge: (bytes, type)}).
+    """
+    from PIL import Image
+
+    edges = sorted(set(max_edges), reverse=True)
+    previews = {}
     with Image.open(file_path) as img:
-        img = ImageOps.exif_transpose(img)
-        if max(img.width, img.height) > max_edge:
-            img.thumbnail((max_edge, max_edge), Image.LANCZOS)
-        if img.mode not in ('RGB', 'RGBA'):
-            img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
-        buffer = io.BytesIO()
-        img.save(buffer, format='WEBP', quality=PREVIEW_QUALITY, method=4)
-        return buffer.getvalue()
+        # Shrink before orienting so JPEGs decode at reduced scale (draft) and
+        # other formats integer-reduce before the LANCZOS pass.
+        level = _mobile_video_thumbs.downscale_oriented(
+            img, (edges[0], edges[0]), Image.LANCZOS
+        )
+        for max_edge in edges:
+            level.thumbnail((max_edge, max_edge), Image.LANCZOS)
+            previews[max_edge] = _encode_webp(level)
+        thumbnails = _mobile_image_thumbs.encode_levels(level, thumb_edges) if thumb_edges else {}
+    return previews, thumbnails
+
+
+def render_pyramid(file_path, max_edges, thumbnails=True):
+    """Decode once and emit a preview for every edge in ``max_edges``.
+
+    With ``thumbnails``, the grid thumbnail classes no larger than the smallest
+    preview are cached from the same decode too, so opening a file in the viewer
+    also fills its thumbnails (and vice versa for pre-rendering). The decode
+    runs in a render worker when the pool is enabled. Returns
+    {max_edge: webp_bytes}; callers store what they asked for.
+    """
+    smallest = min(max_edges)
+    thumb_edges = [
+        edge for edge in _mobile_image_thumbs.THUMBNAIL_EDGES if edge <= smallest
+    ] if thumbnails else []
+    previews, levels = _mobile_render_pool.run(
+        'mobile_image_preview', 'encode_pyramid', file_path, sorted(set(max_edges)), thumb_edges
+    )
+    _mobile_image_thumbs.store_levels(file_path, levels)
+    return previews
+
+
+def encode_width_capped(raw, max_width, quality):
+    """Encode image bytes as WebP no wider than ``max_width``. Pure; see encode_pyramid."""
+    from PIL import Image, ImageOps
+
+    image = Image.open(io.BytesIO(raw))
+    image = ImageOps.exif_transpose(image)
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    if image.width > max_width:
+        height = int(image.height * max_width / image.width)
+        image = image.resize((max_width, height), Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format='WEBP', quality=quality)
+    return buffer.getvalue()
 
 
 def get_or_render(file_path, max_edge):
-    """Cached-or-render WebP bytes for the given file at the given max edge."""
+    """Cached-or-render WebP bytes for the given file at the given max edge.
+
+    A miss also renders the recently requested edges (see `recent_max_edges`)
+    not yet cached from the same decode, so another device's screen size is
+    a hit next time.
+    """
     cached = get_cached(file_path, max_edge)
     if cached is not None:
         return cached
@@ -100,6 +203,24 @@ def get_or_render(file_path, max_edge):
         cached = get_cached(file_path, max_edge)
         if cached is not None:
             return cached
-        data = render(file_path, max_edge)
+        edges = {max_edge} | {
+            other for other in recent_max_edges()
+            if not os.path.exists(_cache_path(file_path, other))
+        }
+        previews = render_pyramid(file_path, edges)
+        for edge, data in previews.items():
+            store_cached(file_path, edge, data)
+        return previews[max_edge]
+
+
+def get_or_render_all(file_path, max_edges):
+    """Cache every preview in ``max_edges`` (plus thumbnails) from one decode.
+
+    Used for pre-rendering; edges already cached are skipped, and nothing is
+    decoded when all of them are.
+    """
+    missing = [edge for edge in max_edges if get_cached(file_path, edge) is None]
+    if not missing:
+        return
+    for max_edge, data in render_pyramid(file_path, missing).items():
         store_cached(file_path, max_edge, data)
-        return data
@@ -0,0 +1,235 @@
+"""Disk-cached grid thumbnails for still images (/mobile/api/thumbnail).
+
+Video frames have always been cached by ``mobile_video_thumbs``; images were
+re-decoded on every request, so scrolling a large grid on a fresh device paid a
+full PNG decode + resize + encode per tile. This caches the encoded thumbnail
+under ComfyUI's temp directory, keyed by the source path + mtime + size + edge
+(the size class), using the same single-flight lock, atomic writes and bounded
+eviction as the other binary caches. Heavy deps (PIL) are imported lazily.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import threading
+
+import binary_cache_io as _binary_cache_io
+import mobile_render_pool as _mobile_render_pool
+import mobile_video_thumbs as _mobile_video_thumbs
+
+THUMBNAIL_EDGE = 300
+# Size classes rendered together from one decode: a half-size tile for dense
+# layouts and model-picker rows, the grid tile, and a large tile. Requests for
+# other widths are served from the smallest class that covers them.
+THUMBNAIL_EDGES = (150, THUMBNAIL_EDGE, 512)
+# Grid thumbnails run 10-40 KB; this holds a very large library.
+CACHE_MAX_BYTES = 1024 * 1024 * 1024
+CACHE_MAX_FILES = 50000
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+# Enough leading bytes to tell PNG / WebP (RIFF....WEBP) / AVIF (....ftypavif).
+_SNIFF_BYTES = 12
+# Thumbnail formats clients asked for most recently, for pre-rendering.
+_RECENT_FORMATS_MAX = 2
+_recent_formats_lock = threading.Lock()
+_recent_formats = []
+
+
+def _cache_dir():
+    import folder_paths
+
+    path = os.path.join(folder_paths.get_temp_directory(), 'mobile_image_thumbs')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _cache_digest(file_path, edge, image_format=None):
+    try:
+        stat = os.stat(file_path)
+        key = '{}|{}|{}|{}'.format(
+            os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, edge
+        )
+    except OSError:
+        key = '{}|{}'.format(os.path.abspath(file_path), edge)
+    if image_format is not None:
+        # Suffixed so the default JPEG/PNG variant keeps its original key.
+        key += '|' + image_format
+    # Non-security cache key; usedforsecurity=False keeps security scanners quiet.
+    return hashlib.md5(key.encode('utf-8'), usedforsecurity=False).hexdigest()
+
+
+def _cache_path(file_path, edge, image_format=None):
+    return _binary_cache_io.sharded_path(
+        _cache_dir(), _cache_digest(file_path, edge, image_format), '.thumb'
+    )
+
+
+def etag(file_path, edge=THUMBNAIL_EDGE, image_format=None):
+    """Strong ETag for (file, edge, format): changes exactly when the cache key does."""
+    return _binary_cache_io.etag_for(_cache_digest(file_path, edge, image_format))
+
+
+def _supported_formats():
+    from PIL import features
+
+    return tuple(
+        name for name in ('avif', 'webp')
+        if features.check(name)
+    )
+
+
+def negotiate_format(accept):
+    """Best thumbnail format the client accepts: 'avif', 'webp', or None.
+
+    None means the default JPEG (PNG for alpha), which every client takes.
+    AVIF is only offered when this Pillow build can encode it.
+    """
+    if not accept:
+        return None
+    accepted = {part.split(';', 1)[0].strip().lower() for part in accept.split(',')}
+    for name in _supported_formats():
+        if 'image/' + name in accepted:
+            return name
+    return None
+
+
+def note_requested_format(image_format):
+    """Record a negotiated format, so pre-rendering targets what clients ask for."""
+    with _recent_formats_lock:
+        if image_format in _recent_formats:
+            _recent_formats.remove(image_format)
+        _recent_formats.insert(0, image_format)
+        del _recent_formats[_RECENT_FORMATS_MAX:]
+
+
+def recent_formats():
+    with _recent_formats_lock:
+        return list(_recent_formats) or [None]
+
+
+def size_class(width):
+    """Smallest thumbnail class covering ``width`` (the largest beyond that)."""
+    for edge in THUMBNAIL_EDGES:
+        if width <= edge:
+            return edge
+    return THUMBNAIL_EDGES[-1]
+
+
+def content_type_of(data):
+    """Content type of cached thumbnail bytes, from their signature."""
+    if data.startswith(_PNG_SIGNATURE):
+        return 'image/png'
+    if data[:4] == b'RIFF' and data[8:12] == b'WEBP':
+        return 'image/webp'
+    if data[4:12] == b'ftypavif':
+        return 'image/avif'
+    return 'image/jpeg'
+
+
+def get_cached(file_path, edge=THUMBNAIL_EDGE, image_format=None):
+    """Return cached thumbnail bytes for (file, edge, format), or None if not cached."""
+    return _binary_cache_io.read_cached(_cache_path(file_path, edge, image_format))
+
+
+def cached_file(file_path, edge=THUMBNAIL_EDGE, image_format=None):
+    """(cache path, content_type) for a cached thumbnail, or None on a miss."""
+    path = _binary_cache_io.cached_file(_cache_path(file_path, edge, image_format))
+    if path is None:
+        return None
+    try:
+        with open(path, 'rb') as handle:
+            return path, content_type_of(handle.read(_SNIFF_BYTES))
+    except OSError:
+        return None
+
+
+def store_cached(file_path, edge, data, image_format=None):
+    # Atomic: a concurrent reader must never see (and the 24h browser cache
+    # never pin) a half-written thumbnail.
+    _binary_cache_io.store_cached(
+        _cache_path(file_path, edge, image_format), data, CACHE_MAX_BYTES, CACHE_MAX_FILES
+    )
+
+
+def encode_levels(img, edges=THUMBNAIL_EDGES, image_format=None):
+    """Encode thumbnail classes from one decoded, oriented image.
+
+    Levels are produced largest first, each resized from the one before, so
+    the source is decoded once for every size. ``img`` is left untouched.
+    Returns {edge: (bytes, content_type)}; nothing is cached.
+    """
+    levels = {}
+    level = img.copy()
+    for edge in sorted(edges, reverse=True):
+        level.thumbnail((edge, edge))
+        levels[edge] = _mobile_video_thumbs.encode_downscaled(level, image_format=image_format)
+    return levels
+
+
+def store_levels(file_path, levels, image_format=None):
+    """Cache the output of `encode_levels` / `render_levels` for ``file_path``."""
+    for edge, (data, _content_type) in levels.items():
+        store_cached(file_path, edge, data, image_format)
+
+
+def render_levels(file_path, edges=THUMBNAIL_EDGES, image_format=None):
+    """Decode once and encode every edge in ``edges``, without caching.
+
+    Pure (picklable in, picklable out), so it can run in a render worker.
+    """
+    from PIL import Image
+
+    with Image.open(file_path) as img:
+        largest = max(edges)
+        img = _mobile_video_thumbs.downscale_oriented(img, (largest, largest))
+        return encode_levels(img, edges, image_format)
+
+
+def render(file_path, edges=THUMBNAIL_EDGES, image_format=None):
+    """Decode once and cache every edge in ``edges``. Returns {edge: (bytes, type)}.
+
+    The decode runs in a render worker when the pool is enabled.
+    """
+    levels = _mobile_render_pool.run(
+        'mobile_image_thumbs', 'render_levels', file_path, sorted(edges), image_format
+    )
+    store_levels(file_path, levels, image_format)
+    return levels
+
+
+def get_or_render(file_path, edge=THUMBNAIL_EDGE, image_format=None):
+    """Cached-or-render thumbnail for an image. Returns (bytes, content_type).
+
+    Synchronous (decode + resize + encode) — call via run_in_executor. A miss
+    renders every size class not yet cached from the same decode, so the next
+    size asked for is a hit. Each ``image_format`` (see `negotiate_format`) is
+    a separate cache variant. Concurrent misses for the same thumbnail collapse
+    to a single render.
+    """
+    cached = get_cached(file_path, edge, image_format)
+    if cached is not None:
+        return cached, content_type_of(cached)
+    with _binary_cache_io.render_lock(_cache_path(file_path, edge, image_format)):
+        cached = get_cached(file_path, edge, image_format)
+        if cached is not None:
+            return cached, content_type_of(cached)
+        edges = {edge} | {
+            other for other in THUMBNAIL_EDGES
+            if not os.path.exists(_cache_path(file_path, other, image_format))
+        }
+        return render(file_path, edges, image_format)[edge]
+
+
+def batch_frame(index, status, content_type=None, body=b''):
+    """One frame of the POST /api/thumbnails stream.
+
+    ``u32 header_len | header JSON | u32 body_len | body`` (big-endian), where
+    the header is ``{"index", "status", "contentType"}``. Frames arrive in
+    completion order, so ``index`` ties each back to its request item.
+    """
+    header = json.dumps(
+        {'index': index, 'status': status, 'contentType': content_type},
+        separators=(',', ':'),
+    ).encode('utf-8')
+    return struct.pack('>I', len(header)) + header + struct.pack('>I', len(body)) + body
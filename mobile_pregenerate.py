@@ -0,0 +1,237 @@
+"""Opt-in pre-rendering of grid thumbnails, viewer previews and playable videos.
+
+Thumbnails and screen-sized previews are otherwise rendered on demand, so the
+first person to open the outputs panel after a batch finishes waits on every
+decode. When the ``pregenerateThumbnails`` app preference is on,
+``mobile_push`` hands each finished history entry to ``schedule_entry`` and the
+new outputs are rendered into the same on-disk caches the endpoints read.
+
+Work runs on one daemon thread with a short pause between files, so it never
+occupies the shared executor or competes with interactive requests for more
+than a single core. Renders go through the caches' own single-flight locks, so
+a request that arrives mid-render waits for (and reuses) the same result.
+
+With ``pretranscodeVideos`` on, new video outputs are also probed and, when
+they need a remux or transcode, prepared into the playable-video cache. That
+is far heavier, so it has its own thread and only starts a file while
+ComfyUI's prompt queue is empty. The queue is checked only before a file
+starts, so transcodes use the ``background`` encoder profile (two threads,
+in a worker at a lowered CPU priority) to yield to a prompt queued while one
+runs. Preparation goes through
+``mobile_video_playback.request_playable``, so someone opening the video
+meanwhile attaches to the same job.
+"""
+import os
+import queue
+import threading
+import time
+
+import mobile_image_preview as _mobile_image_preview
+import mobile_image_thumbs as _mobile_image_thumbs
+import mobile_video_playback as _mobile_video_playback
+import mobile_video_thumbs as _mobile_video_thumbs
+from file_utils import safe_join
+
+try:
+    import mobile_app_prefs as _mobile_app_prefs
+except Exception:  # pragma: no cover - module should always be importable
+    _mobile_app_prefs = None
+
+_LOG_PREFIX = "[\033[34mMobile\033[0m]"
+
+# Pause between renders so a batch of large outputs trickles through.
+_PAUSE_SECONDS = 0.1
+# A queue this deep means renders can't keep up; drop rather than grow.
+_QUEUE_MAX = 1024
+
+# How often a pending video preparation re-checks whether ComfyUI is idle.
+_IDLE_POLL_SECONDS = 2.0
+# A transcode outlives the idle check that let it start, so it runs on the
+# encoder profile that leaves the CPU to a prompt queued meanwhile.
+_VIDEO_PROFILE = 'background'
+
+_queue = queue.Queue(maxsize=_QUEUE_MAX)
+_video_queue = queue.Queue(maxsize=_QUEUE_MAX)
+_worker_lock = threading.Lock()
+_worker = None
+_video_worker = None
+
+
+def _pref(name):
+    if _mobile_app_prefs is None:
+        return False
+    try:
+        return bool(_mobile_app_prefs.get_prefs().get(name))
+    except Exception:
+        return False
+
+
+def is_enabled():
+    return _pref("pregenerateThumbnails")
+
+
+def videos_enabled():
+    return _pref("pretranscodeVideos")
+
+
+def comfy_is_busy():
+    """True while ComfyUI has a prompt running or queued."""
+    try:
+        import server
+
+        remaining = server.PromptServer.instance.prompt_queue.get_tasks_remaining()
+        return isinstance(remaining, int) and remaining > 0
+    except Exception:
+        return False
+
+
+def output_files(entry):
+    """Every {filename, subfolder, source} image/video output in a history entry."""
+    if not isinstance(entry, dict):
+        return []
+    outputs = entry.get("outputs")
+    if not isinstance(outputs, dict):
+        return []
+    files = []
+    for node_output in outputs.values():
+        if not isinstance(node_output, dict):
+            continue
+        for key in ("images", "gifs", "videos", "video"):
+            items = node_output.get(key)
+            if not isinstance(items, list):
+                continue
+            for item in items:
+                if not isinstance(item, dict) or not item.get("filename"):
+                    continue
+                item_type = item.get("type", "output")
+                files.append({
+                    "filename": item["filename"],
+                    "subfolder": item.get("subfolder", ""),
+                    # Previews of intermediate (temp) outputs are rarely opened
+                    # from the panel; only pre-render what the panel lists.
+                    "source": item_type if item_type in ("output", "input") else None,
+                })
+    return [f for f in files if f["source"] is not None]
+
+
+def _resolve(item):
+    import folder_paths
+
+    if item["source"] == "input":
+        base_dir = folder_paths.get_input_directory()
+    else:
+        base_dir = folder_paths.get_output_directory()
+    return safe_join(base_dir, item["subfolder"], item["filename"])
+
+
+def render_file(file_path):
+    """Render every cached variant a panel open will ask for. Synchronous."""
+    if _mobile_video_thumbs.is_video(file_path):
+        _mobile_video_thumbs.get_or_render_thumbnail(file_path)
+        return
+    # One decode covers every recent preview size and the thumbnail classes;
+    # the thumbnail call is then a cache hit (or fills a class the previews
+    # were too small to derive).
+    _mobile_image_preview.get_or_render_all(
+        file_path, _mobile_image_preview.recent_max_edges()
+    )
+    # WebP/AVIF thumbnails are separate cache variants; render the ones
+    # clients have been negotiating.
+    for image_format in _mobile_image_thumbs.recent_formats():
+        _mobile_image_thumbs.get_or_render(
+            file_path, _mobile_image_thumbs.THUMBNAIL_EDGE, image_format
+        )
+
+
+def prepare_video(file_path):
+    """Probe a video and, if it needs it, prepare it for playback. Synchronous.
+
+    Returns the mode it ends up served in ('original', 'remux', ...).
+    """
+    playable, job = _mobile_video_playback.request_playable(file_path, profile=_VIDEO_PROFILE)
+    if job is not None:
+        playable = job.future.result()
+    return playable.mode
+
+
+def _run():
+    while True:
+        file_path = _queue.get()
+        try:
+            if os.path.isfile(file_path):
+                render_file(file_path)
+        except Exception as exc:
+            print(f"{_LOG_PREFIX} pre-render failed for {os.path.basename(file_path)}: {exc}", flush=True)
+        finally:
+            _queue.task_done()
+        time.sleep(_PAUSE_SECONDS)
+
+
+def _run_videos():
+    while True:
+        file_path = _video_queue.get()
+        try:
+            # Checked per file: a transcode competes with sampling for CPU and
+            # memory bandwidth, so none starts while a prompt is running.
+            while comfy_is_busy():
+                time.sleep(_IDLE_POLL_SECONDS)
+            if os.path.isfile(file_path):
+                prepare_video(file_path)
+        except Exception as exc:
+            print(f"{_LOG_PREFIX} pre-transcode failed for {os.path.basename(file_path)}: {exc}", flush=True)
+        finally:
+            _video_queue.task_done()
+
+
+def _ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="mobile-pregenerate", daemon=True)
+            _worker.start()
+
+
+def _ensure_video_worker():
+    global _video_worker
+    with _worker_lock:
+        if _video_worker is None or not _video_worker.is_alive():
+            _video_worker = threading.Thread(
+                target=_run_videos, name="mobile-pretranscode", daemon=True
+            )
+            _video_worker.start()
+
+
+def schedule_entry(entry):
+    """Queue a finished history entry's outputs for pre-rendering.
+
+    Cheap and non-blocking — safe to call from the event loop. Returns the
+    number of files queued across both queues (0 when both preferences are
+    off).
+    """
+    renders = is_enabled()
+    videos = videos_enabled()
+    if not renders and not videos:
+        return 0
+    queued = 0
+    videos_queued = 0
+    for item in output_files(entry):
+        file_path = _resolve(item)
+        if file_path is None:
+            continue
+        if renders:
+            try:
+                _queue.put_nowait(file_path)
+                queued += 1
+            except queue.Full:
+                pass
+        if videos and _mobile_video_playback.is_video(file_path):
+            try:
+                _video_queue.put_nowait(file_path)
+                videos_queued += 1
+            except queue.Full:
+                pass
+    if queued:
+        _ensure_worker()
+    if videos_queued:
+        _ensure_video_worker()
+    return queued + videos_queued
@@ -5,8 +5,11 @@ in-process (a dict read, not a network call) and pushes a message to connected
 clients the instant the value changes, so delivery latency is bounded by the
 tick interval below rather than a client-chosen poll interval.
 
-Scope stays narrow: this channel carries only the progress fraction. Queue
-depth / isRunning stay on the `/queue` poll.
+Scope stays narrow: this channel carries the progress fraction, plus a
+``{"type": "video_job", ...}`` message whenever a background video
+preparation (mobile_video_playback.PreparationJob) changes state or progress,
+so a client holding a 202 from /api/video/playable needn't poll
+/api/video/jobs/{id}. Queue depth / isRunning stay on the `/queue` poll.
 """
 import asyncio
 import json
@@ -39,6 +42,12 @@ def _snapshot():
     }
 
 
+def _video_jobs():
+    """Video preparation statuses by job id (see mobile_video_playback.job_statuses)."""
+    import mobile_video_playback
+    return {status['jobId']: status for status in mobile_video_playback.job_statuses()}
+
+
 # Upper bound on how long one client's send may hold up a broadcast. The
 # broadcast sits on the completion-notification path (mobile_push awaits
 # broadcast_finished before dispatching pushes), so a suspended/backgrounded
@@ -85,10 +94,20 @@ async def _broadcast(snapshot):
 
 async def _watch_loop():
     last = None
+    last_jobs = {}
     while True:
         await asyncio.sleep(_TICK_SECONDS)
         if not _clients:
             continue
+        try:
+            jobs = _video_jobs()
+        except Exception as exc:
+            logger.debug("[Mobile Progress WS] video job read failed: %s", exc)
+        else:
+            for job_id, status in jobs.items():
+                if last_jobs.get(job_id) != status:
+                    await _broadcast({"type": "video_job", **status})
+            last_jobs = jobs
         try:
             snapshot = _snapshot()
         except Exception as exc:
@@ -37,6 +37,11 @@ try:
 except Exception:  # pragma: no cover - module should always be importable
     _mobile_progress_ws = None
 
+try:
+    import mobile_pregenerate as _mobile_pregenerate
+except Exception:  # pragma: no cover - module should always be importable
+    _mobile_pregenerate = None
+
 from urllib.parse import urlencode
 
 # How often to scan history. 1s is plenty for "your render is done" — the cost
@@ -166,6 +171,15 @@ async def _handle_completion(prompt_id, entry):
         except Exception as exc:
             print(f"{_LOG_PREFIX} progress-ws finished broadcast error: {exc}", flush=True)
 
+    # Opt-in and independent of the notify toggles below: queue the new
+    # outputs' thumbnails/previews for background rendering, and their videos
+    # for playback preparation once ComfyUI is idle.
+    if _mobile_pregenerate is not None:
+        try:
+            _mobile_pregenerate.schedule_entry(entry)
+        except Exception as exc:
+            print(f"{_LOG_PREFIX} pre-render scheduling error: {exc}", flush=True)
+
     prefs = _mobile_push_prefs.get_prefs() if _mobile_push_prefs is not None else {}
     is_error = status == "error"
     # Respect the user's notify-on toggles before doing any work.
@@ -0,0 +1,179 @@
+"""Optional process-pool backend for image decode / resize / encode.
+
+Thumbnails, viewer previews and model previews are rendered in executor
+threads inside the ComfyUI process. Pillow only partly releases the GIL, so a
+burst of large LANCZOS resizes competes with ComfyUI's own Python work, and a
+decoder crash on a corrupt file takes the whole server down. With the
+``renderInSubprocess`` app preference on, ``run`` sends the same pure render
+functions to a small pool of persistent ``mobile_render_worker`` processes
+instead: renders scale across cores, and a crash costs one worker, which is
+replaced on the next job. With it off (the default), ``run`` just calls the
+function in the current thread.
+
+Workers are this same interpreter (``sys.executable``), so there is nothing to
+install. Render functions must take and return picklable values and leave all
+cache writes to the caller, which keeps single-flight locks and eviction in
+this process.
+"""
+import importlib
+import os
+import pickle
+import struct
+import subprocess
+import sys
+import threading
+
+try:
+    import mobile_app_prefs as _mobile_app_prefs
+except Exception:  # the worker process has no folder_paths, hence no prefs
+    _mobile_app_prefs = None
+
+_LOG_PREFIX = "[\033[34mMobile\033[0m]"
+
+# Leave a core for ComfyUI itself; beyond four, renders are I/O-bound anyway.
+POOL_SIZE = max(1, min(4, (os.cpu_count() or 2) - 1))
+# A single 8K decode + pyramid takes a few seconds; anything near this is hung.
+RENDER_TIMEOUT_SECONDS = 60
+
+_WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mobile_render_worker.py')
+_HEADER = struct.Struct('>I')
+
+_slots = threading.BoundedSemaphore(POOL_SIZE)
+_idle_lock = threading.Lock()
+_idle = []
+
+
+class RenderError(RuntimeError):
+    """The render function raised in the worker (message carries the original)."""
+
+
+class RenderWorkerCrashed(RenderError):
+    """The worker died or timed out mid-job — never retried in-process."""
+
+
+def read_message(stream):
+    """Next length-prefixed pickle from ``stream``, or None on a clean EOF."""
+    header = stream.read(_HEADER.size)
+    if not header:
+        return None
+    if len(header) != _HEADER.size:
+        raise EOFError('truncated message header')
+    (length,) = _HEADER.unpack(header)
+    body = stream.read(length)
+    if len(body) != length:
+        raise EOFError('truncated message body')
+    return pickle.loads(body)
+
+
+def write_message(stream, message):
+    body = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+    stream.write(_HEADER.pack(len(body)) + body)
+    stream.flush()
+
+
+def is_enabled():
+    if _mobile_app_prefs is None:
+        return False
+    try:
+        return bool(_mobile_app_prefs.get_prefs().get("renderInSubprocess"))
+    except Exception:
+        return False
+
+
+class _Worker:
+    def __init__(self):
+        # stderr is inherited so worker tracebacks land in the ComfyUI log.
+        self.process = subprocess.Popen(
+            [sys.executable, _WORKER_PATH],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def stop(self):
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+
+    def call(self, module_name, function_name, args):
+        timed_out = threading.Event()
+
+        def _expire():
+            timed_out.set()
+            self.process.kill()
+
+        # A blocking pipe read can't time out on its own; killing the child
+        # turns a hung render into EOF.
+        timer = threading.Timer(RENDER_TIMEOUT_SECONDS, _expire)
+        timer.daemon = True
+        timer.start()
+        try:
+            write_message(self.process.stdin, (module_name, function_name, args))
+            reply = read_message(self.process.stdout)
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError):
+            reply = None
+        finally:
+            timer.cancel()
+
+        if reply is None:
+            self.stop()
+            if timed_out.is_set():
+                raise RenderWorkerCrashed('render timed out')
+            code = self.process.returncode
+            raise RenderWorkerCrashed(
+                'render worker was killed by signal {}'.format(-code) if code < 0
+                else 'render worker exited with status {}'.format(code)
+            )
+        status, value = reply
+        if status == 'ok':
+            return value
+        raise RenderError(value)
+
+
+def _checkout():
+    with _idle_lock:
+        while _idle:
+            worker = _idle.pop()
+            if worker.alive():
+                return worker
+    return _Worker()
+
+
+def _checkin(worker):
+    if worker.alive():
+        with _idle_lock:
+            _idle.append(worker)
+
+
+def shutdown():
+    """Stop every idle worker (busy ones rejoin the pool when their job ends)."""
+    with _idle_lock:
+        workers = list(_idle)
+        _idle.clear()
+    for worker in workers:
+        worker.stop()
+
+
+def run(module_name, function_name, *args):
+    """Call ``module_name.function_name(*args)``, in a worker when enabled.
+
+    Synchronous — call via run_in_executor. At most ``POOL_SIZE`` renders run
+    out of process at once; further callers wait for a free worker. Raises
+    ``RenderError`` when the function raised in the worker, and
+    ``RenderWorkerCrashed`` when the worker died or timed out (the job is not
+    retried in-process: whatever crashed the worker would crash the server).
+    """
+    if is_enabled():
+        with _slots:
+            try:
+                worker = _checkout()
+            except OSError as exc:
+                print(f"{_LOG_PREFIX} render worker failed to start, rendering in-process: {exc}", flush=True)
+            else:
+                try:
+                    return worker.call(module_name, function_name, args)
+                finally:
+                    _checkin(worker)
+    return getattr(importlib.import_module(module_name), function_name)(*args)
@@ -0,0 +1,61 @@
+"""Out-of-process image rendering for mobile_render_pool.
+
+Run as a script (``python mobile_render_worker.py``), never imported by the
+server. It stays up and serves jobs one at a time over its stdin/stdout, so a
+grid of thumbnails does not pay an interpreter + Pillow start per tile.
+
+Each message, in both directions, is a big-endian u32 length followed by that
+many bytes of pickle (framing lives in mobile_render_pool):
+
+  request  (module, function, args)
+  reply    ('ok', result) | ('error', 'ExceptionType: message')
+
+Only the pure render functions in ``ALLOWED`` may be called. A job that raises
+is reported and the worker keeps serving; a crash inside a decoder ends the
+process, which the parent sees as EOF and replaces.
+"""
+import importlib
+import os
+import sys
+
+# (module, function) pairs the parent may call. Each takes and returns plain
+# picklable values (paths, numbers, bytes) and touches no cache state.
+ALLOWED = frozenset({
+    ('mobile_image_thumbs', 'render_levels'),
+    ('mobile_image_preview', 'encode_pyramid'),
+    ('mobile_image_preview', 'encode_width_capped'),
+})
+
+
+def _handle(request):
+    module_name, function_name, args = request
+    if (module_name, function_name) not in ALLOWED:
+        return ('error', 'ValueError: {}.{} is not a render function'.format(
+            module_name, function_name))
+    try:
+        function = getattr(importlib.import_module(module_name), function_name)
+        return ('ok', function(*args))
+    except Exception as exc:
+        return ('error', '{}: {}'.format(type(exc).__name__, exc))
+
+
+def main():
+    # Same reasoning as mobile_video_worker: the child does not inherit the
+    # node's sys.path entry, and a ComfyUI-root import (folder_paths) would not
+    # resolve here — which is why only pure functions are ALLOWED.
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from mobile_render_pool import read_message, write_message
+
+    requests = sys.stdin.buffer
+    replies = sys.stdout.buffer
+    # A stray print() from a library must not corrupt the reply stream.
+    sys.stdout = sys.stderr
+    while True:
+        request = read_message(requests)
+        if request is None:
+            return 0
+        write_message(replies, _handle(request))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
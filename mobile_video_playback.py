@@ -8,22 +8,40 @@ stable playback format without modifying generated originals:
 * H.264/yuv420p MP4s that already have a front-loaded index are served as-is.
 * Compatible files with a late index are losslessly remuxed with faststart.
 * Other formats are transcoded to H.264/AAC MP4 with a front-loaded index.
-
-Prepared files live in ComfyUI's temp directory, are keyed by source identity,
-are written atomically, and are bounded by both count and total bytes.
+* On request, any source is also transcoded to a downscaled rendition
+  (``RENDITIONS``) for viewing over a slow link, cached as its own entry.
+* A transcode a viewer is waiting on can also write live HLS output, played
+  while it encodes (see `request_playable`).
+
+Prepared files live in ComfyUI's temp directory, sharded by the digest of their
+source identity, are written atomically, and are bounded by both count and
+total bytes, least recently served out first. Verdicts for sources served
+as-is (and why) persist in the user directory, so restarts don't re-probe the
+library.
 """
 
+import concurrent.futures
 from dataclasses import dataclass
 import hashlib
+import heapq
 import json
 import os
+import re
+import shutil
 import struct
 import subprocess
 import sys
+import tempfile
 import threading
 import time
 
 import binary_cache_io as _binary_cache_io
+from json_cache_io import atomic_write_json
+
+try:
+    import mobile_app_prefs as _mobile_app_prefs
+except Exception:  # the worker process has no folder_paths, hence no prefs
+    _mobile_app_prefs = None
 
 
 _LOG_PREFIX = "[\033[34mMobile Video\033[0m]"
@@ -36,30 +54,88 @@ CACHE_MAX_FILES = 256
 # response has opened it.
 _EVICTION_GRACE_SECONDS = 60
 PREPARE_TIMEOUT_SECONDS = 30 * 60
+# Downscaled renditions for remote viewing: name -> max SHORT edge, so a
+# portrait 832x1216 output at 720p becomes 720x1052 rather than 492x720.
+RENDITIONS = {'480p': 480, '720p': 720, '1080p': 1080}
+# Transcode speed/quality trade-offs, picked by the videoEncoderProfile app
+# pref. preset and crf are libx264's; every encoder gets the thread count
+# (0 = one per core) and the bit-rate cap, and the worker process runs the job
+# at the given nice value.
+ENCODER_PROFILES = {
+    # A mobile preview is watched once, on a small screen: on a CPU-only server
+    # 'veryfast' encodes several times faster than x264's default 'medium' for
+    # a modestly larger file.
+    'fast': {'preset': 'veryfast', 'crf': 26, 'threads': 0, 'max_bitrate': 8_000_000, 'nice': 0},
+    # libx264's own defaults, which transcodes used before profiles existed.
+    'balanced': {'preset': 'medium', 'crf': 23, 'threads': 0, 'max_bitrate': None, 'nice': 0},
+    'quality': {'preset': 'slow', 'crf': 20, 'threads': 0, 'max_bitrate': None, 'nice': 0},
+    # Two encoder threads at a low CPU priority: the idle check only gates a
+    # pre-transcode's start, and one still running when the next prompt is
+    # queued must yield the CPU to it.
+    'background': {
+        'preset': 'veryfast', 'crf': 26, 'threads': 2, 'max_bitrate': 8_000_000, 'nice': 10,
+    },
+}
+DEFAULT_ENCODER_PROFILE = 'balanced'
+# Live output of a transcode (see request_playable): an HLS EVENT playlist of
+# fMP4 segments this long, which is also the keyframe interval.
+LIVE_SEGMENT_SECONDS = 2
+LIVE_PLAYLIST = 'index.m3u8'
+_LIVE_INIT = 'init.mp4'
+_LIVE_MEDIA_RE = re.compile(r'^(?:init\.mp4|seg\d{5}\.m4s)$')
 
 _DIRECT_MP4_EXTENSIONS = frozenset(('.mp4', '.m4v'))
 _BROWSER_VIDEO_CODECS = frozenset(('h264',))
 _BROWSER_PIXEL_FORMATS = frozenset(('yuv420p', 'yuvj420p'))
 _BROWSER_AUDIO_CODECS = frozenset(('aac', 'mp3'))
-_prune_lock = threading.Lock()
-_recent_lock = threading.Lock()
-# cache path -> monotonic-ish last-served time. In memory because the on-disk
-# mtime is load-bearing for HTTP caching (see _read_cached).
-_recently_used: dict[str, float] = {}
-_RECENTLY_USED_MAX = 4096
+# .part. files older than this are leftovers of a hard kill (a preparation
+# is capped at PREPARE_TIMEOUT_SECONDS), swept every _JANITOR_INTERVAL_SECONDS.
+_PARTIAL_MAX_AGE_SECONDS = 24 * 60 * 60
+_JANITOR_INTERVAL_SECONDS = 60 * 60
+_index_lock = threading.Lock()
+# cache path -> _CacheEntry; None until first use scans the cache directory.
+# Recency lives here, not in file mtimes, which are load-bearing for HTTP
+# caching (see _read_cached).
+_index = None
+# (last_used, cache path) min-heap over _index. A serve pushes a fresh pair
+# instead of re-sorting; pairs whose time no longer matches their entry are
+# stale and skipped when popped.
+_index_heap = []
+_index_bytes = 0
+_janitor = None
 _originals_lock = threading.Lock()
+# source identity -> {mode, streams, reason, at[, transient]}; all but the
+# transient ones are mirrored to _verdicts_path().
 _known_originals = {}
-_KNOWN_ORIGINALS_MAX = 4096
+_KNOWN_ORIGINALS_MAX = 20000
+_verdicts_loaded = False
+_verdicts_save_timer = None
+_VERDICTS_SAVE_DELAY_SECONDS = 2.0
+# 2: transient failures are no longer saved, so version-1 files may hold some.
+_VERDICTS_VERSION = 2
+_short_edges_lock = threading.Lock()
+# source identity -> short edge of its video stream (None: unprobeable).
+_short_edges = {}
+_SHORT_EDGES_MAX = 4096
 
 
 class PlaybackPreparationError(RuntimeError):
     """Raised when a source cannot be converted into the playback format."""
 
 
+@dataclass
+class _CacheEntry:
+    size: int
+    last_used: float
+    mode: str | None  # None until read from the .mode sidecar
+
+
 @dataclass(frozen=True)
 class PlayableVideo:
     path: str
     mode: str
+    # RENDITIONS key this was downscaled to; None for source resolution.
+    rendition: str | None = None
 
 
 def is_video(filename):
@@ -87,7 +163,88 @@ def _source_identity(file_path):
 def _cache_path(file_path, source_identity=None):
     identity = source_identity if source_identity is not None else _source_identity(file_path)
     digest = hashlib.sha256(identity.encode('utf-8')).hexdigest()
-    return os.path.join(_cache_dir(), digest + '.mp4')
+    return _binary_cache_io.sharded_path(_cache_dir(), digest, '.mp4')
+
+
+def _verdicts_path():
+    # In the user directory, not next to the prepared files: ComfyUI empties
+    # its temp directory on every start, which is exactly what this outlives.
+    import folder_paths
+
+    return os.path.join(folder_paths.get_user_directory(), 'default', 'mobile', 'video_verdicts.json')
+
+
+def _pyav_version():
+    av = pyav_module()
+    return getattr(av, '__version__', None) if av is not None else None
+
+
+def _valid_verdict(record):
+    return (
+        isinstance(record, dict)
+        and record.get('mode') in ('original', 'unprepared')
+        and (record.get('streams') is None or isinstance(record.get('streams'), list))
+        and (record.get('reason') is None or isinstance(record.get('reason'), str))
+    )
+
+
+def _load_verdicts_locked():
+    """Fill _known_originals from disk once. Caller holds _originals_lock."""
+    global _verdicts_loaded
+    if _verdicts_loaded:
+        return
+    _verdicts_loaded = True
+    try:
+        with open(_verdicts_path(), 'r', encoding='utf-8') as handle:
+            data = json.load(handle)
+    except FileNotFoundError:
+        return
+    except Exception as exc:
+        print('{} failed to read video verdicts, re-probing: {}'.format(_LOG_PREFIX, exc))
+        return
+    if not isinstance(data, dict) or not isinstance(data.get('entries'), dict):
+        return
+    # 'unprepared' can mean "this PyAV build has no H.264 encoder"; after a
+    # PyAV upgrade those files deserve another attempt. 'original' is a fact
+    # about the file alone.
+    keep_unprepared = (
+        data.get('version') == _VERDICTS_VERSION
+        and data.get('pyav') == _pyav_version()
+    )
+    for source_identity, record in list(data['entries'].items())[-_KNOWN_ORIGINALS_MAX:]:
+        if not _valid_verdict(record):
+            continue
+        if record['mode'] == 'unprepared' and not keep_unprepared:
+            continue
+        _known_originals.setdefault(source_identity, record)
+
+
+def _save_verdicts():
+    global _verdicts_save_timer
+    with _originals_lock:
+        _verdicts_save_timer = None
+        entries = {
+            source_identity: record
+            for source_identity, record in _known_originals.items()
+            if not record.get('transient')
+        }
+    try:
+        atomic_write_json(
+            _verdicts_path(),
+            {'version': _VERDICTS_VERSION, 'pyav': _pyav_version(), 'entries': entries},
+            prefix='.video_verdicts.',
+        )
+    except Exception as exc:
+        print('{} failed to save video verdicts: {}'.format(_LOG_PREFIX, exc))
+
+
+def _schedule_save_locked():
+    """Coalesce a burst of new verdicts into one write. Caller holds _originals_lock."""
+    global _verdicts_save_timer
+    if _verdicts_save_timer is None:
+        _verdicts_save_timer = threading.Timer(_VERDICTS_SAVE_DELAY_SECONDS, _save_verdicts)
+        _verdicts_save_timer.daemon = True
+        _verdicts_save_timer.start()
 
 
 def _known_original_mode(source_identity):
@@ -96,10 +253,20 @@ def _known_original_mode(source_identity):
     Returns None when this source has not been resolved to an original.
     """
     with _originals_lock:
-        return _known_originals.get(source_identity)
+        _load_verdicts_locked()
+        record = _known_originals.get(source_identity)
+    return record['mode'] if record is not None else None
+
 
+def known_verdict(source_identity):
+    """The stored verdict ({mode, streams, reason, at}) for a source, or None."""
+    with _originals_lock:
+        _load_verdicts_locked()
+        record = _known_originals.get(source_identity)
+    return dict(record) if record is not None else None
 
-def _remember_original(source_identity, mode):
+
+def _remember_original(source_identity, mode, streams=None, reason=None, transient=False):
     """Memoize "serve this source as-is", together with the mode to serve it in.
 
     The mode has to ride along: 'original' is a faststart MP4, while
@@ -107,67 +274,181 @@ def _remember_original(source_identity, mode):
     Content-Type from that distinction. Replaying an unprepared webm as
     'original' would stamp video/mp4 on it mid-stream and the browser would
     stop playing a file it had already accepted.
+
+    Verdicts persist across restarts (with the probed ``streams`` and, for
+    failures, the ``reason``), so a restart neither re-probes the whole library
+    nor re-spends a preparation budget on a file already known to defeat it.
+    A ``transient`` verdict (a failure that may not repeat) is kept for this
+    process only.
     """
+    record = {
+        'mode': mode,
+        'streams': streams,
+        'reason': reason,
+        'at': int(time.time()),
+    }
+    if transient:
+        record['transient'] = True
     with _originals_lock:
+        _load_verdicts_locked()
         if len(_known_originals) >= _KNOWN_ORIGINALS_MAX and source_identity not in _known_originals:
             # Drop the oldest quarter rather than the whole map: a wipe sends
             # every in-flight video back through a full probe at once.
             for stale in list(_known_originals)[: max(1, _KNOWN_ORIGINALS_MAX // 4)]:
                 del _known_originals[stale]
-        _known_originals[source_identity] = mode
+        _known_originals.pop(source_identity, None)
+        _known_originals[source_identity] = record
+        _schedule_save_locked()
 
 
 def _mode_path(cache_path):
     return cache_path + '.mode'
 
 
-def _mark_recently_used(cache_path):
-    with _recent_lock:
-        if len(_recently_used) >= _RECENTLY_USED_MAX and cache_path not in _recently_used:
-            # Evict the oldest quarter, never the whole map: wiping it drops
-            # every entry back to its mtime, which is when the file was
-            # prepared — so prune_cache could delete a video that was resolved
-            # seconds ago and is still waiting to be opened on the event loop.
-            for stale in sorted(_recently_used, key=_recently_used.get)[
-                : max(1, _RECENTLY_USED_MAX // 4)
-            ]:
-                del _recently_used[stale]
-        _recently_used[cache_path] = time.time()
-
-
-def _last_used(cache_path, fallback_mtime_ns):
-    with _recent_lock:
-        served = _recently_used.get(cache_path)
-    if served is not None:
-        return served
-    # Clamp the mtime fallback to now. prune_cache skips anything newer than its
-    # grace cutoff, so a future-dated mtime — a clock step, or a file restored
-    # from a machine whose clock was ahead — would make that entry permanently
-    # unevictable and the cache would grow without limit.
-    return min(fallback_mtime_ns / 1_000_000_000, time.time())
+# --- Cache index -----------------------------------------------------------
+# prune_cache used to listdir + stat + sort the whole cache under one lock after
+# every preparation. The index holds each entry's size, last serve and mode
+# instead, built by a single scan on first use: a serve is O(log n), and an
+# eviction pops the heap rather than sorting everything.
+#
+# Not persisted: ComfyUI empties its temp directory on every start, so the
+# prepared files never outlive the process that indexed them.
+
+
+def _clamped_mtime(stat):
+    # Clamp to now. prune_cache keeps anything newer than its grace cutoff, so
+    # a future-dated mtime — a clock step, or a file restored from a machine
+    # whose clock was ahead — would make that entry permanently unevictable
+    # and the cache would grow without limit.
+    return min(stat.st_mtime_ns / 1_000_000_000, time.time())
+
+
+def _index_put_locked(cache_path, size, last_used, mode=None):
+    global _index_bytes
+    old = _index.get(cache_path)
+    if old is not None:
+        _index_bytes -= old.size
+    entry = _CacheEntry(size, last_used, mode)
+    _index[cache_path] = entry
+    _index_bytes += size
+    heapq.heappush(_index_heap, (last_used, cache_path))
+    return entry
+
+
+def _index_drop_locked(cache_path):
+    global _index_bytes
+    entry = _index.pop(cache_path, None)
+    if entry is not None:
+        _index_bytes -= entry.size
+
+
+def _index_touch_locked(cache_path, entry, when):
+    entry.last_used = when
+    heapq.heappush(_index_heap, (when, cache_path))
+    if len(_index_heap) > 4 * len(_index) + 64:
+        # Mostly stale pairs from repeat serves; rebuild from the live entries.
+        _index_heap[:] = [(item.last_used, path) for path, item in _index.items()]
+        heapq.heapify(_index_heap)
+
+
+def _cache_index_locked():
+    """The index, scanning the cache directory on first use."""
+    global _index, _index_bytes
+    if _index is None:
+        _index = {}
+        _index_heap.clear()
+        _index_bytes = 0
+        for root, _dirs, names in os.walk(_cache_dir()):
+            for name in names:
+                if not name.endswith('.mp4') or '.part.' in name:
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                _index_put_locked(path, stat.st_size, _clamped_mtime(stat))
+        _start_janitor()
+    return _index
+
+
+def _index_insert(cache_path, mode):
+    """Record a just-prepared file as an entry served now."""
+    size = os.path.getsize(cache_path)
+    with _index_lock:
+        _cache_index_locked()
+        _index_put_locked(cache_path, size, time.time(), mode)
+
+
+def sweep_partials():
+    """Delete ``.part.`` files a hard kill left behind; they are never playable."""
+    cutoff = time.time() - _PARTIAL_MAX_AGE_SECONDS
+    for root, _dirs, names in os.walk(_cache_dir()):
+        for name in names:
+            if '.part.' not in name:
+                continue
+            path = os.path.join(root, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                continue
+
+
+def _janitor_loop():
+    while True:
+        time.sleep(_JANITOR_INTERVAL_SECONDS)
+        try:
+            sweep_partials()
+        except Exception as exc:
+            print('{} playable-video janitor failed: {}'.format(_LOG_PREFIX, exc))
+
+
+def _start_janitor():
+    global _janitor
+    if _janitor is None:
+        sweep_partials()
+        _janitor = threading.Thread(
+            target=_janitor_loop, name='mobile-video-janitor', daemon=True
+        )
+        _janitor.start()
+
+
+def _read_mode(cache_path):
+    try:
+        with open(_mode_path(cache_path), 'r', encoding='utf-8') as handle:
+            mode = handle.read().strip()
+    except OSError:
+        return 'cached'
+    return mode if mode in ('remux', 'transcode') else 'cached'
 
 
 def _read_cached(cache_path):
     try:
-        if not os.path.isfile(cache_path) or os.path.getsize(cache_path) <= 0:
-            return None
-        # Recency is tracked in memory, NOT by touching the file: aiohttp builds
-        # its ETag from st_mtime_ns and compares If-Range against the file's
-        # mtime, so rewriting it on every read would break 304 revalidation and
-        # turn every seek into a full 200 body — on exactly the remote-playback
-        # path this cache exists to smooth.
-        _mark_recently_used(cache_path)
-        mode = 'cached'
-        try:
-            with open(_mode_path(cache_path), 'r', encoding='utf-8') as handle:
-                cached_mode = handle.read().strip()
-            if cached_mode in ('remux', 'transcode'):
-                mode = cached_mode
-        except OSError:
-            pass
-        return PlayableVideo(cache_path, mode)
+        size = os.path.getsize(cache_path)
     except OSError:
-        return None
+        size = 0
+    with _index_lock:
+        index = _cache_index_locked()
+        if size <= 0:
+            _index_drop_locked(cache_path)
+            return None
+        # Recency is tracked in the index, NOT by touching the file: aiohttp
+        # builds its ETag from st_mtime_ns and compares If-Range against the
+        # file's mtime, so rewriting it on every read would break 304
+        # revalidation and turn every seek into a full 200 body — on exactly
+        # the remote-playback path this cache exists to smooth.
+        entry = index.get(cache_path)
+        if entry is None or entry.size != size:
+            entry = _index_put_locked(cache_path, size, time.time())
+        else:
+            _index_touch_locked(cache_path, entry, time.time())
+        mode = entry.mode
+    if mode is None:
+        mode = _read_mode(cache_path)
+        with _index_lock:
+            entry.mode = mode
+    return PlayableVideo(cache_path, mode)
 
 
 def _preparation_possible():
@@ -230,6 +511,8 @@ def _pyav_probe(file_path):
                         'codec_type': stream.type,
                         'codec_name': codec_context.name,
                         'pix_fmt': getattr(codec_context, 'pix_fmt', None),
+                        'width': getattr(codec_context, 'width', None),
+                        'height': getattr(codec_context, 'height', None),
                     })
                 except Exception:
                     streams.append({
@@ -249,11 +532,36 @@ def _pyav_mapped_streams(container):
     return [s for s in (video, audio) if s is not None]
 
 
-def pyav_remux(av, file_path, output_path):
+def _progress_reporter(source, on_progress):
+    """Per-packet callback reporting the demux position as a 0-1 fraction.
+
+    Called at most once per whole percent. A no-op without ``on_progress`` or
+    when the container does not know its duration.
+    """
+    duration = source.duration  # in av.time_base units (microseconds)
+    if on_progress is None or not duration or duration <= 0:
+        return lambda packet: None
+    start = source.start_time or 0
+    reported = [-1]
+
+    def report(packet):
+        if packet.pts is None or packet.time_base is None:
+            return
+        position = float(packet.pts * packet.time_base) * 1_000_000 - start
+        fraction = min(1.0, max(0.0, position / duration))
+        if int(fraction * 100) > reported[0]:
+            reported[0] = int(fraction * 100)
+            on_progress(fraction)
+
+    return report
+
+
+def pyav_remux(av, file_path, output_path, on_progress=None):
     with av.open(file_path) as source:
         mapped = _pyav_mapped_streams(source)
         if not mapped:
             raise PlaybackPreparationError('source has no video stream to remux')
+        report = _progress_reporter(source, on_progress)
         # movflags=faststart is the muxer's own second pass, so the index
         # lands up front.
         with av.open(output_path, 'w', options={'movflags': 'faststart'}) as target:
@@ -265,6 +573,7 @@ def pyav_remux(av, file_path, output_path):
                 # Flush packets carry no timestamps and must not be muxed.
                 if packet.dts is None:
                     continue
+                report(packet)
                 packet.stream = out_streams[packet.stream.index]
                 target.mux(packet)
     return True
@@ -280,29 +589,133 @@ def pyav_h264_encoder(av):
     return None
 
 
-def pyav_transcode(av, encoder, file_path, output_path):
+def _scaled_size(width, height, max_short_edge):
+    """(width, height) with the short edge capped, both rounded down to even."""
+    short_edge = min(width, height)
+    if max_short_edge and short_edge > max_short_edge:
+        width = round(width * max_short_edge / short_edge)
+        height = round(height * max_short_edge / short_edge)
+    # H.264 requires even dimensions (the equivalent of scale=trunc(iw/2)*2).
+    return (width // 2) * 2, (height // 2) * 2
+
+
+def encoder_profile():
+    """Name of the ENCODER_PROFILES entry the app prefs select."""
+    if _mobile_app_prefs is None:
+        return DEFAULT_ENCODER_PROFILE
+    try:
+        name = _mobile_app_prefs.get_prefs().get('videoEncoderProfile')
+    except Exception:
+        return DEFAULT_ENCODER_PROFILE
+    return name if name in ENCODER_PROFILES else DEFAULT_ENCODER_PROFILE
+
+
+def _apply_encoder_profile(video_out, encoder, profile):
+    context = video_out.codec_context
+    context.thread_count = profile['threads']
+    options = {}
+    if encoder == 'libx264':
+        options['preset'] = profile['preset']
+        options['crf'] = str(profile['crf'])
+    if profile['max_bitrate']:
+        # A VBV cap over CRF: quality-driven, but no spikes a phone on a
+        # cellular link can't keep up with.
+        options['maxrate'] = str(profile['max_bitrate'])
+        options['bufsize'] = str(profile['max_bitrate'] * 2)
+        if encoder != 'libx264':
+            # Encoders without CRF rate-control to a target instead.
+            context.bit_rate = profile['max_bitrate']
+    context.options = options
+
+
+def _live_options(live_dir):
+    """hls muxer options for a transcode's live output in ``live_dir``."""
+    return {
+        'hls_time': str(LIVE_SEGMENT_SECONDS),
+        'hls_list_size': '0',
+        'hls_playlist_type': 'event',
+        'hls_segment_type': 'fmp4',
+        'hls_fmp4_init_filename': _LIVE_INIT,
+        'hls_segment_filename': os.path.join(live_dir, 'seg%05d.m4s'),
+        # Segments and the playlist are written to .tmp and renamed, so a
+        # reader never sees either half-written.
+        'hls_flags': 'temp_file+independent_segments',
+    }
+
+
+def _live_segment_names(playlist_text):
+    return [
+        os.path.basename(line.strip())
+        for line in playlist_text.splitlines()
+        if line.strip() and not line.startswith('#')
+    ]
+
+
+def _join_live_segments(live_dir, joined_path):
+    """Concatenate finished live output into one fragmented MP4."""
+    with open(os.path.join(live_dir, LIVE_PLAYLIST), 'r', encoding='utf-8') as handle:
+        names = _live_segment_names(handle.read())
+    with open(joined_path, 'wb') as joined:
+        for name in [_LIVE_INIT] + names:
+            with open(os.path.join(live_dir, name), 'rb') as part:
+                shutil.copyfileobj(part, joined)
+
+
+def pyav_transcode(
+    av, encoder, file_path, output_path, on_progress=None, max_short_edge=None, profile=None,
+    live_dir=None,
+):
+    """Re-encode to H.264/AAC MP4 with the named ENCODER_PROFILES entry.
+
+    With ``live_dir``, the encode goes to HLS there instead, playable while it
+    grows; the finished segments are then joined and remuxed losslessly into
+    ``output_path``, since browsers only seek reliably in a file with one
+    up-front index.
+    """
+    if live_dir is None:
+        target_path, target_format = output_path, None
+        target_options = {'movflags': 'faststart'}
+    else:
+        target_path, target_format = os.path.join(live_dir, LIVE_PLAYLIST), 'hls'
+        target_options = _live_options(live_dir)
     with av.open(file_path) as source:
         video_in = next((s for s in source.streams if s.type == 'video'), None)
         if video_in is None:
             raise PlaybackPreparationError('source has no video stream to transcode')
+        report = _progress_reporter(source, on_progress)
         audio_in = next((s for s in source.streams if s.type == 'audio'), None)
-        with av.open(output_path, 'w', options={'movflags': 'faststart'}) as target:
-            # H.264 requires even dimensions, so frames are reformatted on the
-            # way in (the equivalent of scale=trunc(iw/2)*2).
-            width = (video_in.codec_context.width // 2) * 2
-            height = (video_in.codec_context.height // 2) * 2
+        with av.open(
+            target_path, 'w', format=target_format, options=target_options
+        ) as target:
+            # Frames are reformatted on the way in: to even dimensions, and
+            # down to the rendition's size when one was asked for.
+            width, height = _scaled_size(
+                video_in.codec_context.width, video_in.codec_context.height, max_short_edge
+            )
             if width <= 0 or height <= 0:
                 raise PlaybackPreparationError('source video has no usable dimensions')
-            video_out = target.add_stream(encoder, rate=video_in.average_rate or 30)
+            rate = video_in.average_rate or 30
+            video_out = target.add_stream(encoder, rate=rate)
             video_out.width = width
             video_out.height = height
             video_out.pix_fmt = 'yuv420p'
+            _apply_encoder_profile(
+                video_out, encoder,
+                ENCODER_PROFILES.get(profile, ENCODER_PROFILES[DEFAULT_ENCODER_PROFILE]),
+            )
+            if live_dir is not None:
+                # Segments are cut on keyframes; the encoder's default GOP
+                # (~10 s) would hold back the first playable segment that long.
+                video_out.codec_context.gop_size = max(
+                    1, round(float(rate) * LIVE_SEGMENT_SECONDS)
+                )
             audio_out = target.add_stream('aac') if audio_in is not None else None
 
             for packet in source.demux(*[s for s in (video_in, audio_in) if s]):
                 if packet.dts is None:
                     continue
                 if packet.stream is video_in:
+                    report(packet)
                     for frame in packet.decode():
                         frame = frame.reformat(width=width, height=height, format='yuv420p')
                         for out_packet in video_out.encode(frame):
@@ -317,6 +730,16 @@ def pyav_transcode(av, encoder, file_path, output_path):
             if audio_out is not None:
                 for out_packet in audio_out.encode():
                     target.mux(out_packet)
+    if live_dir is not None:
+        joined_path = output_path[:-len('.mp4')] + '.joined.mp4'
+        try:
+            _join_live_segments(live_dir, joined_path)
+            pyav_remux(av, joined_path, output_path)
+        finally:
+            try:
+                os.remove(joined_path)
+            except OSError:
+                pass
     return True
 
 
@@ -397,60 +820,227 @@ class PreparationUnavailable(RuntimeError):
 
 _WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mobile_video_worker.py')
 _WORKER_EXIT_UNAVAILABLE = 3
+# Recycle a warm worker after this many jobs, so whatever libav leaks or
+# fragments over long runs doesn't accumulate for the life of ComfyUI.
+_WORKER_MAX_JOBS = 50
+_workers_lock = threading.Lock()
+_idle_workers = []
+
+
+class _VideoWorker:
+    """A long-lived mobile_video_worker.py serving JSON-line jobs over its pipes."""
+
+    def __init__(self):
+        # Nice value the child lowered itself to; it cannot raise it back.
+        self.nice = 0
+        # stderr goes to a file, not a pipe: only stdout is read while a job
+        # runs, and a full stderr pipe would block the child.
+        self.stderr_file = tempfile.TemporaryFile()
+        try:
+            self.process = subprocess.Popen(
+                [sys.executable, _WORKER_PATH],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=self.stderr_file,
+                text=True,
+            )
+        except OSError:
+            self.stderr_file.close()
+            raise
+        self.jobs = 0
+
+    def alive(self):
+        return self.process.poll() is None
+
+    def stop(self):
+        """Kill (if needed) and reap the child; return (returncode, stderr tail)."""
+        if self.alive():
+            self.process.kill()
+        returncode = self.process.wait()
+        for stream in (self.process.stdin, self.process.stdout):
+            try:
+                stream.close()
+            except (OSError, ValueError):
+                pass
+        try:
+            self.stderr_file.seek(0)
+            detail = self.stderr_file.read().decode('utf-8', errors='replace')
+        except (OSError, ValueError):
+            detail = ''
+        finally:
+            self.stderr_file.close()
+        detail = detail.strip().replace('\n', ' ')
+        return returncode, detail[-800:]
+
+    def run(
+        self, mode, file_path, output_path, on_progress, max_short_edge=None, profile=None,
+        live_dir=None,
+    ):
+        """Run one job. Returns ((code, detail) or None if the child died, timed_out)."""
+        self.jobs += 1
+        nice = ENCODER_PROFILES.get(profile, {}).get('nice', 0)
+        self.nice = max(self.nice, nice)
+        timed_out = threading.Event()
+
+        def _expire():
+            timed_out.set()
+            self.process.kill()
+
+        # Killing the child is what ends the stdout loop below on a timeout.
+        timer = threading.Timer(PREPARE_TIMEOUT_SECONDS, _expire)
+        timer.daemon = True
+        timer.start()
+        result = None
+        try:
+            self.process.stdin.write(json.dumps({
+                'mode': mode,
+                'source': file_path,
+                'output': output_path,
+                'maxShortEdge': max_short_edge,
+                'profile': profile,
+                'nice': nice,
+                'liveDir': live_dir,
+            }) + '\n')
+            self.process.stdin.flush()
+            for line in self.process.stdout:
+                if line.startswith('result '):
+                    code, _, detail = line[len('result '):].rstrip('\n').partition(' ')
+                    result = (int(code), detail)
+                    break
+                if on_progress is None or not line.startswith('progress '):
+                    continue
+                try:
+                    on_progress(min(1.0, max(0.0, float(line.split()[1]))))
+                except (IndexError, ValueError):
+                    continue
+        except (OSError, ValueError):
+            result = None
+        finally:
+            timer.cancel()
+        return result, timed_out.is_set()
+
+
+def _checkout_worker(nice=0):
+    """A warm worker (else a new one) that runs no lower than ``nice``."""
+    with _workers_lock:
+        for index in range(len(_idle_workers) - 1, -1, -1):
+            worker = _idle_workers[index]
+            if worker.nice > nice:
+                continue
+            del _idle_workers[index]
+            if worker.alive():
+                return worker
+            worker.stop()
+    return _VideoWorker()
+
+
+def _checkin_worker(worker):
+    with _workers_lock:
+        if (
+            worker.alive()
+            and worker.jobs < _WORKER_MAX_JOBS
+            and len(_idle_workers) < PREPARE_CONCURRENCY
+        ):
+            _idle_workers.append(worker)
+            return
+    worker.stop()
+
 
+def shutdown_workers():
+    """Stop every idle warm worker (closing stdin would too, at exit)."""
+    with _workers_lock:
+        workers = list(_idle_workers)
+        _idle_workers.clear()
+    for worker in workers:
+        worker.stop()
 
-def _run_worker(mode, file_path, output_path):
+
+def _run_worker(
+    mode, file_path, output_path, on_progress=None, max_short_edge=None, profile=None,
+    live_dir=None,
+):
     """Prepare in a child process; return on success, raise on failure.
 
     Out of process for two reasons in-process work cannot provide: a libav crash
     on a malformed file kills the child rather than ComfyUI mid-generation, and a
     run that never finishes can actually be killed (a Python thread cannot). The
     child is this same interpreter, so PyAV is the only requirement — there is no
-    external binary to install.
+    external binary to install. Children stay warm between jobs; one that dies
+    or times out is reaped and the next job gets a fresh one. ``on_progress``
+    receives the child's 0-1 progress lines as they arrive; ``max_short_edge``
+    downscales a transcode to a rendition. Transcodes use ``profile`` (an
+    ENCODER_PROFILES key), else the one the app prefs select at the time of
+    the job. A profile with a nice value gets a worker at that priority, and
+    that worker then only serves such jobs. ``live_dir`` asks a transcode for
+    live output (see `pyav_transcode`).
     """
+    profile = profile or encoder_profile()
     try:
-        result = subprocess.run(
-            [sys.executable, _WORKER_PATH, mode, file_path, output_path],
-            check=False,
-            capture_output=True,
-            text=True,
-            timeout=PREPARE_TIMEOUT_SECONDS,
-        )
-    except subprocess.TimeoutExpired as exc:
-        raise PreparationTimeout('preparing the video timed out') from exc
+        worker = _checkout_worker(ENCODER_PROFILES.get(profile, {}).get('nice', 0))
     except OSError as exc:
         raise PlaybackPreparationError('could not start the video worker') from exc
-
-    if result.returncode == 0:
-        return
-    if result.returncode == _WORKER_EXIT_UNAVAILABLE:
+    try:
+        result, timed_out = worker.run(
+            mode, file_path, output_path, on_progress, max_short_edge, profile, live_dir,
+        )
+    except BaseException:
+        worker.stop()
+        raise
+
+    if result is not None:
+        _checkin_worker(worker)
+        code, detail = result
+        if code == 0:
+            return
+        if code == _WORKER_EXIT_UNAVAILABLE:
+            raise PreparationUnavailable('PyAV cannot prepare this video here')
+        message = 'video preparation failed'
+        if detail:
+            message += ': ' + detail
+        raise PlaybackPreparationError(message)
+
+    returncode, detail = worker.stop()
+    if timed_out:
+        raise PreparationTimeout('preparing the video timed out')
+    # Exiting with 3 before answering: this interpreter can't even start PyAV.
+    if returncode == _WORKER_EXIT_UNAVAILABLE:
         raise PreparationUnavailable('PyAV cannot prepare this video here')
-
-    detail = (result.stderr or '').strip().replace('\n', ' ')
-    if len(detail) > 800:
-        detail = detail[-800:]
     # A negative code means a signal: the child died, e.g. a decoder segfault on
     # malformed media. That is precisely the crash this process no longer takes.
     message = (
-        'video worker was killed by signal {}'.format(-result.returncode)
-        if result.returncode < 0
-        else 'video worker exited with status {}'.format(result.returncode)
+        'video worker was killed by signal {}'.format(-returncode)
+        if returncode < 0
+        else 'video worker exited with status {}'.format(returncode)
     )
     if detail:
         message += ': ' + detail
     raise PlaybackPreparationError(message)
 
 
-def _remux(file_path, output_path):
-    _run_worker('remux', file_path, output_path)
-
+def _remux(file_path, output_path, on_progress=None):
+    _run_worker('remux', file_path, output_path, on_progress)
 
-def _transcode(file_path, output_path):
-    _run_worker('transcode', file_path, output_path)
 
+def _transcode(
+    file_path, output_path, on_progress=None, max_short_edge=None, profile=None, live_dir=None,
+):
+    if live_dir is not None:
+        # The job id names the directory, and a re-run of the same source
+        # reuses it: start from nothing.
+        shutil.rmtree(live_dir, ignore_errors=True)
+        try:
+            os.makedirs(live_dir)
+        except OSError as exc:
+            raise PlaybackPreparationError('could not create the live output directory') from exc
+    _run_worker(
+        'transcode', file_path, output_path, on_progress, max_short_edge, profile, live_dir,
+    )
 
 
-def _prepare_into(mode, file_path, tmp_path):
+def _prepare_into(
+    mode, file_path, tmp_path, on_progress=None, max_short_edge=None, profile=None,
+    live_dir=None,
+):
     """Run the chosen preparation into ``tmp_path``; return the mode used.
 
     A remux that fails falls back to a full re-encode: probe data can be
@@ -460,7 +1050,7 @@ def _prepare_into(mode, file_path, tmp_path):
     """
     if mode == 'remux':
         try:
-            _remux(file_path, tmp_path)
+            _remux(file_path, tmp_path, on_progress)
             return 'remux'
         except PreparationUnavailable:
             raise
@@ -476,7 +1066,7 @@ def _prepare_into(mode, file_path, tmp_path):
                 os.remove(tmp_path)
             except OSError:
                 pass
-    _transcode(file_path, tmp_path)
+    _transcode(file_path, tmp_path, on_progress, max_short_edge, profile, live_dir)
     return 'transcode'
 
 
@@ -491,157 +1081,451 @@ def _validate_output(output_path):
 
 
 def prune_cache(current_path=None, max_bytes=CACHE_MAX_BYTES, max_files=CACHE_MAX_FILES):
-    """Remove the oldest prepared videos until the configured bounds are met."""
-    with _prune_lock:
-        cache_dir = _cache_dir()
-        entries = []
-        try:
-            names = os.listdir(cache_dir)
-        except OSError:
-            return
-        for name in names:
-            path = os.path.join(cache_dir, name)
-            if name.endswith('.mp4') and '.part.' not in name:
-                try:
-                    stat = os.stat(path)
-                    entries.append((stat.st_mtime_ns, stat.st_size, path))
-                except OSError:
-                    continue
-            elif '.part.' in name:
-                # A hard process termination can bypass the normal finally
-                # cleanup. Old partials are never playable and can be discarded.
-                try:
-                    if time.time() - os.path.getmtime(path) > 24 * 60 * 60:
-                        os.remove(path)
-                except OSError:
-                    pass
-
-        # Order by last SERVE, not by mtime: mtime is when the file was
-        # prepared, so a video watched daily would otherwise be a prime target.
-        entries = [
-            (_last_used(path, mtime_ns), size, path) for mtime_ns, size, path in entries
-        ]
-        entries.sort()
+    """Remove the least recently served videos until the configured bounds are met."""
+    with _index_lock:
+        index = _cache_index_locked()
         # get_or_prepare returns a PATH and aiohttp opens it later, on the event
         # loop — so a file resolved by another request may not be open yet.
         # Anything served within the grace window is in flight or hot; deleting
         # it turns a fully prepared video into "unable to play".
         cutoff = time.time() - _EVICTION_GRACE_SECONDS
-        total_bytes = sum(size for _, size, _ in entries)
-        total_files = len(entries)
-        for last_used, size, path in entries:
-            if last_used > cutoff:
+        kept = []
+        while _index_heap and (len(index) > max_files or _index_bytes > max_bytes):
+            last_used, path = heapq.heappop(_index_heap)
+            entry = index.get(path)
+            if entry is None or entry.last_used != last_used:
                 continue
-            if total_files <= max_files and total_bytes <= max_bytes:
+            if last_used > cutoff:
+                # Oldest first, so everything left is in the window too.
+                kept.append((last_used, path))
                 break
             if current_path is not None and os.path.abspath(path) == os.path.abspath(current_path):
+                kept.append((last_used, path))
                 continue
             try:
                 os.remove(path)
-                total_files -= 1
-                total_bytes -= size
+            except FileNotFoundError:
+                pass
             except OSError:
+                kept.append((last_used, path))
                 continue
+            _index_drop_locked(path)
             try:
                 os.remove(_mode_path(path))
             except OSError:
                 pass
+        for item in kept:
+            heapq.heappush(_index_heap, item)
 
 
-def get_or_prepare(file_path):
-    """Return a browser-playable path without modifying ``file_path``.
-
-    Synchronous by design; aiohttp callers must use ``run_in_executor``. The
-    per-cache-path lock collapses concurrent misses into one worker process.
-    """
+def _check_source(file_path):
     if not is_video(file_path):
         raise PlaybackPreparationError('unsupported video file extension')
     if not os.path.isfile(file_path):
         raise PlaybackPreparationError('video file does not exist')
 
-    source_identity = _source_identity(file_path)
-    cache_path = _cache_path(file_path, source_identity)
+
+def _ready(file_path, source_identity, cache_path, rendition=None):
+    """A cache hit or remembered original for this source, else None."""
     cached = _read_cached(cache_path)
     if cached is not None:
-        return cached
+        return PlayableVideo(cached.path, cached.mode, rendition)
     # Faststart originals have no prepared file to act as a cache-hit marker.
     # Remember their source identity in-process so a browser's follow-up range
     # requests do not each re-probe the file.
     known_mode = _known_original_mode(source_identity)
     if known_mode is not None:
         return PlayableVideo(file_path, known_mode)
+    return None
+
+
+def _resolve_without_preparing(file_path, source_identity):
+    """Decide whether this source needs preparing at all.
+
+    Returns ``(playable, streams)``: a PlayableVideo when the original can be
+    served as-is, else None plus the probed streams for `_prepare`.
+    """
+    # Nothing to prepare with. Serve the original bytes and let the browser
+    # decide, which is exactly what 3.0.x did before this gateway existed —
+    # most ComfyUI outputs are already browser-playable H.264 MP4s. Refusing
+    # here would make every video unplayable on such an install, a
+    # regression against files that used to play fine. Not remembered as an
+    # "original", so a later PyAV install takes effect without a restart.
+    if not _preparation_possible():
+        _warn_missing_tools_once()
+        return PlayableVideo(file_path, 'unprepared'), None
+
+    streams = _probe_media(file_path)
+    extension = os.path.splitext(file_path)[1].lower()
+    if (
+        extension in _DIRECT_MP4_EXTENSIONS
+        and _is_browser_compatible(streams)
+        and _is_faststart_mp4(file_path)
+    ):
+        _remember_original(source_identity, 'original', streams)
+        return PlayableVideo(file_path, 'original'), streams
+    return None, streams
+
+
+def _planned_mode(streams, rendition=None):
+    """'remux' or 'transcode': what `_prepare` tries first.
+
+    A ``rendition`` always transcodes (a remux can't change the resolution).
+    """
+    if rendition is None and _is_browser_compatible(streams):
+        return 'remux'
+    return 'transcode'
 
-    with _binary_cache_io.render_lock(cache_path):
-        cached = _read_cached(cache_path)
-        if cached is not None:
-            return cached
-        known_mode = _known_original_mode(source_identity)
-        if known_mode is not None:
-            return PlayableVideo(file_path, known_mode)
-
-        # Nothing to prepare with. Serve the original bytes and let the browser
-        # decide, which is exactly what 3.0.x did before this gateway existed —
-        # most ComfyUI outputs are already browser-playable H.264 MP4s. Refusing
-        # here would make every video unplayable on such an install, a
-        # regression against files that used to play fine. Not remembered as an
-        # "original", so a later PyAV install takes effect without a restart.
-        if not _preparation_possible():
-            _warn_missing_tools_once()
-            return PlayableVideo(file_path, 'unprepared')
-
-        streams = _probe_media(file_path)
-        browser_compatible = _is_browser_compatible(streams)
-        extension = os.path.splitext(file_path)[1].lower()
-        if (
-            extension in _DIRECT_MP4_EXTENSIONS
-            and browser_compatible
-            and _is_faststart_mp4(file_path)
-        ):
-            _remember_original(source_identity, 'original')
-            return PlayableVideo(file_path, 'original')
 
-        tmp_path = '{}.{}.{}.part.mp4'.format(
-            cache_path[:-4], os.getpid(), threading.get_ident()
+def _prepare(
+    file_path, source_identity, cache_path, streams, on_progress=None, rendition=None,
+    profile=None, live_dir=None,
+):
+    """Remux or transcode into the cache. Caller holds the cache path's render lock.
+
+    For a ``rendition``, ``source_identity`` is the rendition's identity, so
+    its verdicts and cache entry are separate from the source's. ``profile``
+    overrides the app's encoder profile for a transcode, and ``live_dir``
+    asks it for live output.
+    """
+    tmp_path = '{}.{}.{}.part.mp4'.format(
+        cache_path[:-4], os.getpid(), threading.get_ident()
+    )
+    max_short_edge = RENDITIONS.get(rendition)
+    mode = _planned_mode(streams, rendition)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    try:
+        mode = _prepare_into(
+            mode, file_path, tmp_path, on_progress, max_short_edge, profile, live_dir,
+        )
+        _validate_output(tmp_path)
+        os.replace(tmp_path, cache_path)
+        _binary_cache_io.atomic_write_bytes(
+            _mode_path(cache_path), mode.encode('utf-8')
         )
-        mode = 'remux' if browser_compatible else 'transcode'
+        _index_insert(cache_path, mode)
+    except PreparationUnavailable as exc:
+        # PyAV is installed but can't do this particular job (typically a
+        # build with no H.264 encoder). Serving the original still plays
+        # wherever the browser understands the codec; refusing guarantees it
+        # plays nowhere, which is strictly worse.
+        _warn_missing_tools_once()
+        # Remember it: the browser fetches this file in byte ranges, and
+        # without this every range re-probes the source (a full av.open of a
+        # possibly multi-GB file) and re-spawns the worker, all serialized
+        # behind this same lock. Keyed by source identity, so a re-encoded
+        # or replaced file is re-evaluated.
+        _remember_original(source_identity, 'unprepared', streams, str(exc))
+        return PlayableVideo(file_path, 'unprepared')
+    except (PlaybackPreparationError, PreparationTimeout) as exc:
+        # Preparation was possible but failed — a decode error, a worker
+        # killed by signal, a transcode that ran past the deadline, output
+        # that failed validation, or a worker that could not start. Memoize
+        # it for the same reason as the branch above: the browser asks for
+        # this file in byte ranges, and re-attempting on every range means a
+        # full probe plus a fresh worker each time, serialized behind this
+        # lock and occupying a preparation slot for up to
+        # PREPARE_TIMEOUT_SECONDS apiece. Keyed by source identity, so a
+        # replaced file is re-evaluated. Not persisted: many of these (a full
+        # disk, an OOM kill, a timeout while ComfyUI held the CPU) don't
+        # repeat, and a saved verdict would pin the file as unprepared for
+        # good, so the next start tries again.
+        _remember_original(source_identity, 'unprepared', streams, str(exc), transient=True)
+        return PlayableVideo(file_path, 'unprepared')
+    finally:
         try:
-            mode = _prepare_into(mode, file_path, tmp_path)
-            _validate_output(tmp_path)
-            os.replace(tmp_path, cache_path)
-            _binary_cache_io.atomic_write_bytes(
-                _mode_path(cache_path), mode.encode('utf-8')
-            )
-        except PreparationUnavailable:
-            # PyAV is installed but can't do this particular job (typically a
-            # build with no H.264 encoder). Serving the original still plays
-            # wherever the browser understands the codec; refusing guarantees it
-            # plays nowhere, which is strictly worse.
-            _warn_missing_tools_once()
-            # Remember it: the browser fetches this file in byte ranges, and
-            # without this every range re-probes the source (a full av.open of a
-            # possibly multi-GB file) and re-spawns the worker, all serialized
-            # behind this same lock. Keyed by source identity, so a re-encoded
-            # or replaced file is re-evaluated.
-            _remember_original(source_identity, 'unprepared')
-            return PlayableVideo(file_path, 'unprepared')
-        except (PlaybackPreparationError, PreparationTimeout):
-            # Preparation was possible but this file defeated it — a decode
-            # error, a worker killed by signal, a transcode that ran past the
-            # deadline, or output that failed validation. Memoize it for the
-            # same reason as the branch above: the browser asks for this file in
-            # byte ranges, and re-attempting on every range means a full probe
-            # plus a fresh worker each time, serialized behind this lock and
-            # occupying the executor for up to PREPARE_TIMEOUT_SECONDS apiece.
-            # One unpreparable video would otherwise stall the whole mobile API.
-            # Keyed by source identity, so a replaced file is re-evaluated, and
-            # in-process only, so a restart retries.
-            _remember_original(source_identity, 'unprepared')
-            return PlayableVideo(file_path, 'unprepared')
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+    prune_cache(current_path=cache_path)
+    return PlayableVideo(cache_path, mode, rendition)
+
+
+def normalize_rendition(value):
+    """A RENDITIONS key, or None for source resolution ('source', '', unknown)."""
+    value = (value or '').strip().lower()
+    return value if value in RENDITIONS else None
+
+
+def _source_short_edge(file_path, source_identity):
+    """Short edge of the source's video stream, probed once per identity."""
+    with _short_edges_lock:
+        if source_identity in _short_edges:
+            return _short_edges[source_identity]
+    video = next(
+        (s for s in _probe_media(file_path) or () if s.get('codec_type') == 'video'),
+        None,
+    )
+    short_edge = None
+    if video is not None and video.get('width') and video.get('height'):
+        short_edge = min(video['width'], video['height'])
+    with _short_edges_lock:
+        if len(_short_edges) >= _SHORT_EDGES_MAX and source_identity not in _short_edges:
+            for stale in list(_short_edges)[: max(1, _SHORT_EDGES_MAX // 4)]:
+                del _short_edges[stale]
+        _short_edges[source_identity] = short_edge
+    return short_edge
+
+
+def _rendition_identity(file_path, source_identity, rendition):
+    """``(identity, rendition)`` actually to serve for a requested rendition.
+
+    Falls back to the source (rendition None) when the source is no larger
+    than the rendition, or can't be probed — downscaling would only re-encode.
+    """
+    max_short_edge = RENDITIONS.get(rendition)
+    if max_short_edge is None:
+        return source_identity, None
+    short_edge = _source_short_edge(file_path, source_identity)
+    if short_edge is None or short_edge <= max_short_edge:
+        return source_identity, None
+    return '{}|{}'.format(source_identity, rendition), rendition
+
+
+def get_or_prepare(file_path, rendition=None):
+    """Return a browser-playable path without modifying ``file_path``.
+
+    Synchronous by design, and blocks for the whole preparation; the HTTP
+    endpoint goes through `request_playable` instead. The per-cache-path lock
+    collapses concurrent misses into one worker process. ``rendition`` (a
+    RENDITIONS key) asks for a downscaled transcode, cached separately.
+    """
+    _check_source(file_path)
+    source_identity = _source_identity(file_path)
+    identity, rendition = _rendition_identity(file_path, source_identity, rendition)
+    cache_path = _cache_path(file_path, identity)
+    ready = _ready(file_path, identity, cache_path, rendition)
+    if ready is not None:
+        return ready
+
+    with _binary_cache_io.render_lock(cache_path):
+        ready = _ready(file_path, identity, cache_path, rendition)
+        if ready is not None:
+            return ready
+        if rendition is not None:
+            return _prepare(file_path, identity, cache_path, None, rendition=rendition)
+        playable, streams = _resolve_without_preparing(file_path, source_identity)
+        if playable is not None:
+            return playable
+        return _prepare(file_path, source_identity, cache_path, streams)
+
+
+# --- Background preparation ---------------------------------------------
+# A transcode can take minutes. Run inline, it held an executor thread (shared
+# by every mobile endpoint) for the whole time, and each parallel range request
+# for the same video piled up behind the render lock on another thread. Jobs
+# run on a small dedicated pool instead; requests for a video that is being
+# prepared attach to its job rather than to a thread.
+
+# Concurrent preparations. Each is a full decode/encode in a child process.
+PREPARE_CONCURRENCY = 2
+# How long a finished job stays queryable by id.
+_JOB_RETENTION_SECONDS = 10 * 60
+_jobs_lock = threading.Lock()
+_jobs = {}            # job id -> PreparationJob
+_active_jobs = {}     # cache path -> unfinished PreparationJob
+_job_executor = None
+
+
+class PreparationJob:
+    """One queued or running preparation. ``future`` resolves to a PlayableVideo."""
+
+    def __init__(
+        self, file_path, source_identity, cache_path, streams, rendition=None, profile=None,
+    ):
+        self.id = hashlib.sha256(source_identity.encode('utf-8')).hexdigest()[:16]
+        self.file_path = file_path
+        self.source_identity = source_identity
+        self.cache_path = cache_path
+        self.streams = streams
+        self.rendition = rendition
+        self.profile = profile
+        self.state = 'queued'
+        self.progress = 0.0
+        self.mode = None
+        self.finished_at = None
+        self.future = None
+        # Where a live transcode writes its HLS output; set (under _jobs_lock)
+        # only while the job is queued, see request_playable.
+        self.live_dir = None
+
+    def _set_progress(self, fraction):
+        self.progress = fraction
+
+    def status(self):
+        return {
+            'jobId': self.id,
+            'state': self.state,
+            'progress': round(self.progress, 3),
+            'mode': self.mode,
+            'rendition': self.rendition,
+            'live': self.live_dir is not None,
+        }
+
+    def run(self):
+        with _jobs_lock:
+            self.state = 'running'
+        try:
+            with _binary_cache_io.render_lock(self.cache_path):
+                playable = _ready(
+                    self.file_path, self.source_identity, self.cache_path, self.rendition
+                )
+                if playable is None:
+                    playable = _prepare(
+                        self.file_path, self.source_identity, self.cache_path,
+                        self.streams, self._set_progress, self.rendition, self.profile,
+                        self.live_dir,
+                    )
+            # 'unprepared' is still done: the original is what gets served.
+            self.mode = playable.mode
+            self.state = 'done'
+            self.progress = 1.0
+            return playable
+        except Exception:
+            self.state = 'failed'
+            raise
         finally:
-            try:
-                os.remove(tmp_path)
-            except OSError:
-                pass
+            self.finished_at = time.time()
+            with _jobs_lock:
+                if _active_jobs.get(self.cache_path) is self:
+                    del _active_jobs[self.cache_path]
+
+
+def _executor():
+    global _job_executor
+    if _job_executor is None:
+        _job_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=PREPARE_CONCURRENCY, thread_name_prefix='mobile-video-prepare'
+        )
+    return _job_executor
+
+
+def _live_dir(job_id):
+    import folder_paths
+
+    return os.path.join(folder_paths.get_temp_directory(), 'mobile_live_videos', job_id)
+
+
+def _forget_finished_jobs_locked():
+    cutoff = time.time() - _JOB_RETENTION_SECONDS
+    for job_id in [
+        job_id for job_id, job in _jobs.items()
+        if job.finished_at is not None and job.finished_at < cutoff
+    ]:
+        job = _jobs.pop(job_id)
+        if job.live_dir is not None:
+            shutil.rmtree(job.live_dir, ignore_errors=True)
+
+
+def get_job(job_id):
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def job_statuses():
+    """`PreparationJob.status` of every queued, running or recently finished job."""
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    return [job.status() for job in jobs]
+
+
+def request_playable(file_path, rendition=None, profile=None, live=False):
+    """Resolve without waiting for a preparation.
 
-        prune_cache(current_path=cache_path)
-        return PlayableVideo(cache_path, mode)
+    Returns ``(playable, None)`` when the video can be served now — a cache
+    hit, or an original that needs no preparing — else ``(None, job)`` for the
+    queued or running preparation, shared by every request for the same video
+    and rendition. Synchronous (stat + probe) — call via run_in_executor; await
+    ``job.future`` (wrapped) to be served once it is ready. ``profile``
+    picks the encoder profile of a job this call starts; one already queued
+    keeps its own.
+
+    ``live`` is for a viewer about to play the result: a transcode this call
+    starts, or finds still queued, also writes live HLS output to
+    ``job.live_dir`` (see `live_playlist`). Only then — the extra keyframes
+    and the final remux are not worth paying for a job nobody watches. A
+    remux is quick enough to wait for, and a running job can't switch, so
+    those leave ``job.live_dir`` None.
+    """
+    _check_source(file_path)
+    source_identity = _source_identity(file_path)
+    identity, rendition = _rendition_identity(file_path, source_identity, rendition)
+    cache_path = _cache_path(file_path, identity)
+    ready = _ready(file_path, identity, cache_path, rendition)
+    if ready is not None:
+        return ready, None
+    with _jobs_lock:
+        job = _active_jobs.get(cache_path)
+        if job is not None:
+            if live:
+                _make_live_locked(job)
+            return None, job
+
+    streams = None
+    if rendition is None:
+        playable, streams = _resolve_without_preparing(file_path, source_identity)
+        if playable is not None:
+            return playable, None
+
+    with _jobs_lock:
+        job = _active_jobs.get(cache_path)
+        if job is None:
+            _forget_finished_jobs_locked()
+            job = PreparationJob(file_path, identity, cache_path, streams, rendition, profile)
+            replaced = _jobs.get(job.id)
+            if replaced is not None and replaced.live_dir is not None:
+                shutil.rmtree(replaced.live_dir, ignore_errors=True)
+            _jobs[job.id] = job
+            _active_jobs[cache_path] = job
+        if live:
+            _make_live_locked(job)
+        if job.future is None:
+            job.future = _executor().submit(job.run)
+    return None, job
+
+
+def _make_live_locked(job):
+    if job.state == 'queued' and _planned_mode(job.streams, job.rendition) == 'transcode':
+        job.live_dir = job.live_dir or _live_dir(job.id)
+
+
+def live_playlist(job):
+    """The job's live playlist as served to a player, or None (none yet).
+
+    Playback starts at the beginning rather than the live edge, and segment
+    names lose any directory the muxer put in front: they are served next to
+    the playlist. A job that finished without a transcode (it failed, or
+    fell back to the original) has no live output worth playing.
+    """
+    if job.live_dir is None:
+        return None
+    if job.finished_at is not None and job.mode != 'transcode':
+        return None
+    try:
+        with open(os.path.join(job.live_dir, LIVE_PLAYLIST), 'r', encoding='utf-8') as handle:
+            text = handle.read()
+    except OSError:
+        return None
+    lines = []
+    for line in text.splitlines():
+        if line.startswith('#EXT-X-MAP:'):
+            line = re.sub(
+                r'URI="([^"]*)"',
+                lambda match: 'URI="{}"'.format(os.path.basename(match.group(1))),
+                line,
+            )
+        elif line.strip() and not line.startswith('#'):
+            line = os.path.basename(line.strip())
+        lines.append(line)
+        if line == '#EXTM3U':
+            lines.append('#EXT-X-START:TIME-OFFSET=0')
+    return '\n'.join(lines) + '\n'
+
+
+def live_file(job, name):
+    """Path of a job's live init section or segment ``name``, or None."""
+    if job.live_dir is None or not _LIVE_MEDIA_RE.match(name):
+        return None
+    path = os.path.join(job.live_dir, name)
+    return path if os.path.isfile(path) else None
@@ -5,8 +5,16 @@ Used by the /mobile/api/thumbnail endpoint when a video has no sidecar image
 each backend is tried in turn, so the node still loads (and image thumbnails
 still work) even when no video backend is available.
 
+The first frame of a generation is often black or mid fade-in, so with PyAV the
+poster is the best-scoring (exposure x detail) of a few frames across the clip,
+found by seeking and decoding keyframes only. The other backends fall back to
+the first frame. The same keyframe seeking builds scrub sprite sheets: one
+JPEG row of evenly spaced frames, so the grid can preview a video without
+fetching it.
+
 Extracted frames are cached as JPEGs under ComfyUI's temp directory, keyed by
-the source path + mtime + size, so repeated grid loads don't re-decode.
+the source path + mtime + size, so repeated grid loads don't re-decode. The
+cache is bounded (see ``binary_cache_io.prune``).
 """
 
 import hashlib
@@ -17,6 +25,23 @@ import binary_cache_io as _binary_cache_io
 
 # Kept in sync with the video extensions recognized by api_get_thumbnail.
 VIDEO_EXTENSIONS = ('.mp4', '.m4v', '.mov', '.webm', '.mkv', '.avi')
+# Frame JPEGs are tens of KB each.
+CACHE_MAX_BYTES = 512 * 1024 * 1024
+CACHE_MAX_FILES = 20000
+# Poster candidates, as fractions of the duration: past a fade-in, and early
+# enough to still show what the clip opens with.
+POSTER_POSITIONS = (0.1, 0.3, 0.5)
+# Bound on the frames decoded when the clip has too few keyframes to choose
+# between (short generations often have just the first).
+POSTER_MAX_DECODED_FRAMES = 120
+# Bumped when poster selection changes, so cached frames are re-picked.
+_POSTER_VERSION = 'poster1'
+# Scrub sprites: tiles per sheet (clients may ask for 2..SPRITE_MAX_FRAMES),
+# each fitted within SPRITE_TILE_EDGE. Ten 160px tiles are ~30-60 KB of JPEG.
+SPRITE_FRAMES = 10
+SPRITE_MAX_FRAMES = 30
+SPRITE_TILE_EDGE = 160
+SPRITE_MAX_DECODED_FRAMES = 600
 
 
 def is_video(filename):
@@ -31,33 +56,60 @@ def _cache_dir():
     return path
 
 
-def _cache_path(file_path):
+def _cache_digest(file_path, variant=None):
     try:
         stat = os.stat(file_path)
-        key = '{}|{}|{}'.format(os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        key = '{}|{}|{}|{}'.format(
+            os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, _POSTER_VERSION
+        )
     except OSError:
-        key = os.path.abspath(file_path)
+        key = '{}|{}'.format(os.path.abspath(file_path), _POSTER_VERSION)
+    if variant is not None:
+        key += '|' + variant
     # Non-security cache key; usedforsecurity=False keeps security scanners quiet.
-    digest = hashlib.md5(key.encode('utf-8'), usedforsecurity=False).hexdigest()
-    return os.path.join(_cache_dir(), digest + '.jpg')
+    return hashlib.md5(key.encode('utf-8'), usedforsecurity=False).hexdigest()
+
+
+def _cache_path(file_path):
+    return _binary_cache_io.sharded_path(_cache_dir(), _cache_digest(file_path), '.jpg')
+
+
+def _sprite_variant(frames):
+    return 'sprite{}x{}'.format(frames, SPRITE_TILE_EDGE)
+
+
+def _sprite_cache_path(file_path, frames):
+    return _binary_cache_io.sharded_path(
+        _cache_dir(), _cache_digest(file_path, _sprite_variant(frames)), '.jpg'
+    )
+
+
+def etag(file_path):
+    """Strong ETag for this video's frame: changes exactly when the cache key does."""
+    return _binary_cache_io.etag_for(_cache_digest(file_path))
+
+
+def sprite_etag(file_path, frames=SPRITE_FRAMES):
+    """Strong ETag for this video's sprite sheet of ``frames`` tiles."""
+    return _binary_cache_io.etag_for(_cache_digest(file_path, _sprite_variant(frames)))
 
 
 def get_cached_thumbnail(file_path):
     """Return cached JPEG bytes for this video, or None if not cached."""
-    try:
-        path = _cache_path(file_path)
-        if os.path.exists(path):
-            with open(path, 'rb') as handle:
-                return handle.read()
-    except OSError:
-        pass
-    return None
+    return _binary_cache_io.read_cached(_cache_path(file_path))
+
+
+def cached_thumbnail_file(file_path):
+    """Path of this video's cached JPEG frame, or None if not cached."""
+    return _binary_cache_io.cached_file(_cache_path(file_path))
 
 
 def store_cached_thumbnail(file_path, data):
     # Atomic: a concurrent reader must never see (and the 24h browser cache
     # never pin) a half-written thumbnail.
-    _binary_cache_io.atomic_write_bytes(_cache_path(file_path), data)
+    _binary_cache_io.store_cached(
+        _cache_path(file_path), data, CACHE_MAX_BYTES, CACHE_MAX_FILES
+    )
 
 
 def get_or_render_thumbnail(file_path, size=(300, 300)):
@@ -79,19 +131,91 @@ def get_or_render_thumbnail(file_path, size=(300, 300)):
         return data
 
 
+def cached_sprite_file(file_path, frames=SPRITE_FRAMES):
+    """Path of this video's cached sprite sheet, or None if not cached."""
+    return _binary_cache_io.cached_file(_sprite_cache_path(file_path, frames))
+
+
+def get_or_render_sprite(file_path, frames=SPRITE_FRAMES):
+    """Cached-or-render JPEG sprite sheet bytes for a video, or None on failure.
+
+    Synchronous (keyframe decodes) — call via run_in_executor. Concurrent
+    misses for the same sheet collapse to a single render.
+    """
+    path = _sprite_cache_path(file_path, frames)
+    cached = _binary_cache_io.read_cached(path)
+    if cached is not None:
+        return cached
+    with _binary_cache_io.render_lock(path):
+        cached = _binary_cache_io.read_cached(path)
+        if cached is not None:
+            return cached
+        data = render_sprite(file_path, frames)
+        if data is not None:
+            _binary_cache_io.store_cached(path, data, CACHE_MAX_BYTES, CACHE_MAX_FILES)
+        return data
+
+
+# Negotiated thumbnail formats: (Pillow format, quality, content type). The
+# qualities are tuned to look like the JPEG q80 tiles at roughly half the bytes.
+_MODERN_FORMATS = {
+    'avif': ('AVIF', 55, 'image/avif'),
+    'webp': ('WEBP', 75, 'image/webp'),
+}
+
+# EXIF orientations that swap width and height (transpose, rotate 90/270,
+# transverse).
+_SWAPPING_ORIENTATIONS = (5, 6, 7, 8)
+
+
+def downscale_oriented(img, size, resample=None):
+    """Downscale `img` to fit `size`, then apply its EXIF orientation.
+
+    Shrinking first is what lets ``thumbnail`` take its cheap paths: ``draft``
+    decodes JPEGs at 1/2-1/8 scale and ``reducing_gap`` integer-reduces other
+    formats before the final filter. Transposing first forces a full-resolution
+    decode and copy. The box is swapped for rotated orientations, so the result
+    matches orient-then-shrink. Returns the (possibly new) image.
+    """
+    from PIL import ImageOps
+
+    try:
+        orientation = img.getexif().get(0x0112)
+    except Exception:
+        orientation = None
+    box = (size[1], size[0]) if orientation in _SWAPPING_ORIENTATIONS else size
+    if resample is None:
+        img.thumbnail(box)
+    else:
+        img.thumbnail(box, resample)
+    return ImageOps.exif_transpose(img)
+
+
 def encode_thumbnail(img, size=(300, 300), force_jpeg=False):
-    """Orient, downscale to `size`, and encode a PIL image to thumbnail bytes.
+    """Downscale to `size`, orient, and encode a PIL image to thumbnail bytes.
 
     Returns (bytes, content_type). Images with transparency are saved as PNG to
     preserve the alpha channel, unless `force_jpeg` is set (used for opaque video
     frames so the on-disk cache stays a single format).
     """
-    from PIL import ImageOps
+    return encode_downscaled(downscale_oriented(img, size), force_jpeg)
+
 
-    img = ImageOps.exif_transpose(img)
-    img.thumbnail(size)
+def encode_downscaled(img, force_jpeg=False, image_format=None):
+    """Encode an already downscaled, oriented image like `encode_thumbnail`.
 
+    ``image_format`` of ``'webp'`` or ``'avif'`` (negotiated from the client's
+    Accept header) encodes to that format instead; both keep alpha, so there's
+    no PNG fallback for them.
+    """
     buffer = io.BytesIO()
+    if image_format in _MODERN_FORMATS:
+        if img.mode not in ('RGB', 'RGBA'):
+            has_alpha = 'A' in img.getbands() or 'transparency' in img.info
+            img = img.convert('RGBA' if has_alpha else 'RGB')
+        pil_format, quality, content_type = _MODERN_FORMATS[image_format]
+        img.save(buffer, format=pil_format, quality=quality)
+        return buffer.getvalue(), content_type
     has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
     if has_alpha and not force_jpeg:
         img.save(buffer, format='PNG')
@@ -111,9 +235,54 @@ def render_thumbnail(file_path, size=(300, 300)):
     return data
 
 
+def render_sprite(file_path, frames=SPRITE_FRAMES):
+    """JPEG sprite sheet of ``frames`` evenly spaced tiles in one row, or None.
+
+    Tile i shows the clip at (i + 0.5) / frames of its duration, snapped to the
+    keyframe at or before it. All tiles share one size, so a client slices the
+    sheet at ``width / frames``. PyAV only: the other backends can't seek
+    without decoding every frame on the way.
+    """
+    from PIL import Image
+
+    try:
+        import av
+
+        with av.open(file_path) as container:
+            stream = _av_video_stream(container)
+            if stream is None:
+                return None
+            picked = _av_frames_at(
+                av, container, stream,
+                [(index + 0.5) / frames for index in range(frames)],
+                SPRITE_MAX_DECODED_FRAMES,
+            )
+    except Exception:
+        return None
+    if len(picked) != frames:
+        return None
+
+    tiles = {}
+    for _pts, image in picked:
+        if id(image) not in tiles:
+            tile = image.convert('RGB')
+            tile.thumbnail((SPRITE_TILE_EDGE, SPRITE_TILE_EDGE))
+            tiles[id(image)] = tile
+    tile_width, tile_height = next(iter(tiles.values())).size
+    sheet = Image.new('RGB', (tile_width * frames, tile_height))
+    for index, (_pts, image) in enumerate(picked):
+        tile = tiles[id(image)]
+        if tile.size != (tile_width, tile_height):
+            # A mid-clip resolution change; keep the grid regular.
+            tile = tile.resize((tile_width, tile_height))
+        sheet.paste(tile, (index * tile_width, 0))
+    data, _ = encode_downscaled(sheet, force_jpeg=True)
+    return data
+
+
 def _extract_frame(file_path):
-    """Return a PIL.Image of an early frame, trying each backend until one works."""
-    for backend in (_frame_cv2, _frame_av, _frame_imageio):
+    """Return a PIL.Image poster frame, trying each backend until one works."""
+    for backend in (_poster_av, _frame_cv2, _frame_av, _frame_imageio):
         try:
             frame = backend(file_path)
             if frame is not None:
@@ -123,6 +292,105 @@ def _extract_frame(file_path):
     return None
 
 
+def _poster_score(img):
+    """Higher for a well-exposed, detailed frame; ~0 for black or blown out."""
+    from PIL import ImageStat
+
+    gray = img.convert('L')
+    gray.thumbnail((64, 64))
+    exposure = 1 - abs(ImageStat.Stat(gray).mean[0] - 128) / 128
+    # entropy() is 0-8 bits: flat frames score low even when mid-grey.
+    return gray.entropy() * (0.25 + 0.75 * exposure)
+
+
+def _best_frame(images):
+    """The best-scoring image (the earliest on a tie), or None."""
+    best, best_score = None, None
+    for img in images:
+        score = _poster_score(img)
+        if best_score is None or score > best_score:
+            best, best_score = img, score
+    return best
+
+
+def _av_video_stream(container):
+    stream = next((s for s in container.streams if s.type == 'video'), None)
+    return stream if stream is not None and stream.time_base else None
+
+
+def _av_frames_at(av, container, stream, fractions, max_decoded):
+    """``(pts, image)`` for each fraction of the stream's duration.
+
+    Seeks keyframe-only first: when every target lands on a keyframe of its
+    own, those keyframes are the answer and nothing in between is decoded.
+    When targets share a keyframe (short generations often have just one or
+    two), decodes forward from each keyframe to its target instead, seeking
+    again only when the next keyframe lies past the decoder, at most
+    ``max_decoded`` frames in all; a target beyond that gets the later of
+    its keyframe and the last frame decoded. Empty when the duration is
+    unknown.
+    """
+    if stream.duration:
+        duration = stream.duration
+    elif container.duration:
+        duration = int(container.duration / av.time_base / stream.time_base)
+    else:
+        return []
+    start = stream.start_time or 0
+    targets = [start + int(duration * fraction) for fraction in fractions]
+
+    stream.codec_context.skip_frame = 'NONKEY'
+    images = {}
+    landed = []
+    for target in targets:
+        container.seek(target, stream=stream)
+        frame = next(container.decode(stream), None)
+        if frame is None:
+            continue
+        if frame.pts not in images:
+            images[frame.pts] = frame.to_image()
+        landed.append((target, frame.pts))
+    if len(images) == len(targets):
+        return [(pts, images[pts]) for _target, pts in landed]
+
+    stream.codec_context.skip_frame = 'DEFAULT'
+    picked = []
+    frames = iter(())
+    last = None
+    decoded = 0
+    for target, keyframe in landed:
+        if decoded < max_decoded and (last is None or keyframe > last.pts):
+            container.seek(target, stream=stream)
+            frames = container.decode(stream)
+            last = None
+        while decoded < max_decoded and (last is None or last.pts < target):
+            frame = next(frames, None)
+            if frame is None:
+                break
+            decoded += 1
+            if frame.pts is not None:
+                last = frame
+        if last is None or last.pts < keyframe:
+            picked.append((keyframe, images[keyframe]))
+            continue
+        if last.pts not in images:
+            images[last.pts] = last.to_image()
+        picked.append((last.pts, images[last.pts]))
+    return picked
+
+
+def _poster_av(file_path):
+    import av
+
+    with av.open(file_path) as container:
+        stream = _av_video_stream(container)
+        if stream is None:
+            return None
+        frames = _av_frames_at(av, container, stream, POSTER_POSITIONS, POSTER_MAX_DECODED_FRAMES)
+        # Distinct frames only, in clip order.
+        return _best_frame({pts: image for pts, image in frames}.values())
+
+
 def _frame_cv2(file_path):
     import cv2
     from PIL import Image
@@ -1,22 +1,40 @@
 """Out-of-process PyAV video preparation.
 
-Run as a script (``python mobile_video_worker.py <mode> <src> <dst>``), never
-imported by the server. Preparation decodes untrusted media through libav, where
-a malformed file can take the interpreter down with it — in-process that would
-kill ComfyUI mid-generation. A child process turns the same crash into a
-non-zero exit the parent can recover from, and gives the parent a wall-clock
-timeout it can actually enforce (a thread can't be killed).
-
-This deliberately shells out to the SAME interpreter (``sys.executable``) rather
-than to an external ffmpeg binary: ComfyUI ships PyAV, so there is no new
-dependency and nothing to install.
-
-Exit codes are the parent's contract:
+Run as a script, never imported by the server. Preparation decodes untrusted
+media through libav, where a malformed file can take the interpreter down with
+it — in-process that would kill ComfyUI mid-generation. A child process turns
+the same crash into an exit the parent can recover from, and gives the parent a
+wall-clock timeout it can actually enforce (a thread can't be killed).
+
+This deliberately runs the SAME interpreter (``sys.executable``) rather than an
+external ffmpeg binary: ComfyUI ships PyAV, so there is no new dependency and
+nothing to install.
+
+Two ways to run it:
+
+* ``python mobile_video_worker.py`` serves jobs until stdin closes, so the
+  parent keeps a warm worker and doesn't pay interpreter start-up plus the
+  PyAV import per job. Each job is one JSON line on stdin,
+  ``{"mode": ..., "source": ..., "output": ..., "maxShortEdge": null,
+  "profile": null, "nice": 0, "liveDir": null}`` (``maxShortEdge``
+  downscales a transcode, ``profile`` names its ENCODER_PROFILES entry,
+  ``nice`` lowers the worker's CPU priority for this and every later job,
+  ``liveDir`` has a transcode write live HLS output there first), answered
+  on stdout by
+  ``progress <fraction>`` lines and then one ``result <code> <detail>`` line.
+* ``python mobile_video_worker.py <mode> <src> <dst>`` runs a single job,
+  printing progress lines and reporting through its exit code.
+
+While it works, the worker reports progress (0-1, at most one line per whole
+percent).
+
+Result / exit codes are the parent's contract:
   0  prepared successfully
   2  bad invocation
   3  PyAV cannot do this job here (missing module or no H.264 encoder)
-  1  the attempt failed (message on stderr)
+  1  the attempt failed (detail = the error)
 """
+import json
 import os
 import sys
 
@@ -25,43 +43,109 @@ EXIT_USAGE = 2
 EXIT_UNAVAILABLE = 3
 EXIT_FAILED = 1
 
+MODES = ('remux', 'transcode')
+
+
+def _print_progress(fraction):
+    print('progress {:.3f}'.format(fraction), flush=True)
 
-def main(argv):
-    if len(argv) != 4:
-        print('usage: mobile_video_worker.py <remux|transcode> <source> <output>',
-              file=sys.stderr)
-        return EXIT_USAGE
-    mode, source, output = argv[1], argv[2], argv[3]
-    if mode not in ('remux', 'transcode'):
-        print('unknown mode: {}'.format(mode), file=sys.stderr)
-        return EXIT_USAGE
 
-    # The child inherits no sys.path from the parent (subprocess.run is called
-    # without env=, and ComfyUI's path additions are runtime-only), so make the
-    # node's own directory importable. Anything this worker needs must live
-    # here or be installed in the interpreter — a ComfyUI-root import such as
-    # folder_paths would NOT resolve.
-    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+def _import_playback():
+    # The child inherits no sys.path from the parent (Popen is called without
+    # env=, and ComfyUI's path additions are runtime-only), so make the node's
+    # own directory importable. Anything this worker needs must live here or be
+    # installed in the interpreter — a ComfyUI-root import such as folder_paths
+    # would NOT resolve.
+    directory = os.path.dirname(os.path.abspath(__file__))
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
     import mobile_video_playback as playback
 
-    av = playback.pyav_module()
-    if av is None:
-        return EXIT_UNAVAILABLE
+    return playback
+
+
+def run_job(
+    mode, source, output, on_progress, max_short_edge=None, profile=None, live_dir=None,
+):
+    """Run one job; return ``(code, detail)``. Exceptions become EXIT_FAILED."""
+    if mode not in MODES:
+        return EXIT_USAGE, 'unknown mode: {}'.format(mode)
+    try:
+        playback = _import_playback()
+        av = playback.pyav_module()
+        if av is None:
+            return EXIT_UNAVAILABLE, 'PyAV is not importable'
 
-    if mode == 'remux':
-        playback.pyav_remux(av, source, output)
-        return EXIT_OK
+        if mode == 'remux':
+            playback.pyav_remux(av, source, output, on_progress)
+            return EXIT_OK, ''
 
-    encoder = playback.pyav_h264_encoder(av)
-    if encoder is None:
-        return EXIT_UNAVAILABLE
-    playback.pyav_transcode(av, encoder, source, output)
+        encoder = playback.pyav_h264_encoder(av)
+        if encoder is None:
+            return EXIT_UNAVAILABLE, 'no H.264 encoder'
+        playback.pyav_transcode(
+            av, encoder, source, output, on_progress,
+            max_short_edge=max_short_edge,
+            profile=profile,
+            live_dir=live_dir,
+        )
+        return EXIT_OK, ''
+    except Exception as exc:
+        return EXIT_FAILED, '{}: {}'.format(type(exc).__name__, exc)
+
+
+def _lower_priority(nice):
+    """Raise this process's nice value to at least ``nice`` (never lowers it).
+
+    Called before the job's encoder threads exist: on Linux the value is per
+    thread and new threads inherit it from the one that creates them.
+    """
+    if not nice or not hasattr(os, 'nice'):
+        return
+    try:
+        current = os.nice(0)
+        if nice > current:
+            os.nice(nice - current)
+    except OSError:
+        pass
+
+
+def serve(requests, replies):
+    """Answer JSON-line jobs from ``requests`` until EOF."""
+    def progress(fraction):
+        replies.write('progress {:.3f}\n'.format(fraction))
+        replies.flush()
+
+    for line in requests:
+        try:
+            job = json.loads(line)
+            _lower_priority(job.get('nice'))
+            code, detail = run_job(
+                job['mode'], job['source'], job['output'], progress,
+                job.get('maxShortEdge'), job.get('profile'), job.get('liveDir'),
+            )
+        except (ValueError, KeyError, TypeError):
+            code, detail = EXIT_USAGE, 'malformed job'
+        replies.write('result {} {}\n'.format(code, detail.replace('\n', ' ')))
+        replies.flush()
     return EXIT_OK
 
 
+def main(argv):
+    if len(argv) == 1:
+        replies = sys.stdout
+        # Anything a library prints must not be mistaken for a reply.
+        sys.stdout = sys.stderr
+        return serve(sys.stdin, replies)
+    if len(argv) != 4:
+        print('usage: mobile_video_worker.py [<{}> <source> <output>]'.format('|'.join(MODES)),
+              file=sys.stderr)
+        return EXIT_USAGE
+    code, detail = run_job(argv[1], argv[2], argv[3], _print_progress)
+    if detail:
+        print(detail, file=sys.stderr)
+    return code
+
+
 if __name__ == '__main__':
-    try:
-        sys.exit(main(sys.argv))
-    except Exception as exc:  # surfaced to the parent as stderr + exit 1
-        print('{}: {}'.format(type(exc).__name__, exc), file=sys.stderr)
-        sys.exit(EXIT_FAILED)
+    sys.exit(main(sys.argv))
@@ -39,6 +39,8 @@ import urllib.parse
 
 import folder_paths
 
+import mobile_render_pool as _mobile_render_pool
+
 logger = logging.getLogger("mobile_frontend.model_metadata")
 
 CIVITAI_BY_HASH = "https://civitai.com/api/v1/model-versions/by-hash/{}"
@@ -467,15 +469,13 @@ def _select_preview(images):
 
 
 def _optimize_image_to_webp(raw, out_path):
-    from PIL import Image, ImageOps
-    image = Image.open(io.BytesIO(raw))
-    image = ImageOps.exif_transpose(image)
-    if image.mode not in ("RGB", "RGBA"):
-        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
-    if image.width > PREVIEW_WIDTH:
-        height = int(image.height * PREVIEW_WIDTH / image.width)
-        image = image.resize((PREVIEW_WIDTH, height), Image.LANCZOS)
-    image.save(out_path, format="WEBP", quality=PREVIEW_QUALITY)
+    # Decoded in a render worker when the pool is enabled: these are untrusted
+    # downloads, exactly what shouldn't be able to crash the server.
+    data = _mobile_render_pool.run(
+        "mobile_image_preview", "encode_width_capped", raw, PREVIEW_WIDTH, PREVIEW_QUALITY
+    )
+    with open(out_path, "wb") as handle:
+        handle.write(data)
 
 
 async def _download_preview(session, url, media_type, model_path, sidecar):
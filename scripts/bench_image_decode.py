@@ -0,0 +1,82 @@
+"""Benchmark thumbnail/preview rendering: orient-then-shrink vs shrink-then-orient.
+
+Renders synthetic 4K and 8K outputs as PNG, JPEG and WebP, then times the old
+decode order (``exif_transpose`` first, which forces a full-resolution decode)
+against ``mobile_video_thumbs.downscale_oriented`` (draft / reducing_gap first)
+for the 300 px grid thumbnail and the 2048 px viewer preview. Run with the
+ComfyUI python env:
+
+    python scripts/bench_image_decode.py [--repeat N]
+
+Not named test_* on purpose: it is slow and prints timings, not assertions.
+"""
+import argparse
+import io
+import os
+import sys
+import time
+
+EXT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, EXT_DIR)
+
+from PIL import Image, ImageOps  # noqa: E402
+
+import mobile_video_thumbs  # noqa: E402
+
+SIZES = {"4K": (3840, 2160), "8K": (7680, 4320)}
+FORMATS = {"PNG": {}, "JPEG": {"quality": 92}, "WEBP": {"quality": 90}}
+TARGETS = {"thumb": (300, Image.BICUBIC), "preview": (2048, Image.LANCZOS)}
+
+
+def _source(size, fmt, options):
+    # A smooth gradient with a little noise compresses like a real render
+    # (pure noise would make PNG/WebP decode unrealistically slow).
+    gradient = Image.linear_gradient("L").resize(size)
+    noise = Image.effect_noise(size, 24)
+    img = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.FLIP_LEFT_RIGHT)))
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt, **options)
+    return buffer.getvalue()
+
+
+def _old(data, edge, resample):
+    with Image.open(io.BytesIO(data)) as img:
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((edge, edge), resample)
+        return img.size
+
+
+def _new(data, edge, resample):
+    with Image.open(io.BytesIO(data)) as img:
+        return mobile_video_thumbs.downscale_oriented(img, (edge, edge), resample).size
+
+
+def _best(fn, data, edge, resample, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(data, edge, resample)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'source':<12}{'target':<9}{'old ms':>9}{'new ms':>9}{'speedup':>9}")
+    for size_name, size in SIZES.items():
+        for fmt, options in FORMATS.items():
+            data = _source(size, fmt, options)
+            for target, (edge, resample) in TARGETS.items():
+                old = _best(_old, data, edge, resample, args.repeat)
+                new = _best(_new, data, edge, resample, args.repeat)
+                print(
+                    f"{size_name + ' ' + fmt:<12}{target:<9}"
+                    f"{old * 1000:>9.0f}{new * 1000:>9.0f}{old / new:>8.1f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
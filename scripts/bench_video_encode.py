@@ -0,0 +1,111 @@
+"""Benchmark transcode speed per encoder profile (mobile_video_playback.ENCODER_PROFILES).
+
+Encodes synthetic sample clips (a 720p landscape, a 1080p portrait and a 4K
+clip, with a moving gradient so the encoder has real motion to work on) or the
+clips given with ``--clip``, once per profile, through the same
+``pyav_transcode`` the worker runs, and reports encode fps and output size.
+Run with the ComfyUI python env:
+
+    python scripts/bench_video_encode.py [--clip PATH ...] [--json results.json]
+
+Not named test_* on purpose: it is slow and prints timings, not assertions.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+EXT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, EXT_DIR)
+
+from PIL import Image  # noqa: E402
+
+import mobile_video_playback  # noqa: E402
+
+SAMPLES = {"720p": (1280, 720), "1080p-portrait": (1080, 1920), "4K": (3840, 2160)}
+SAMPLE_SECONDS = 4
+SAMPLE_FPS = 24
+
+
+def _sample(av, path, size):
+    # High quality, so the benchmark measures the profile's encode rather
+    # than artifacts inherited from the sample.
+    gradient = Image.linear_gradient("L").resize(size)
+    noise = Image.effect_noise(size, 16)
+    with av.open(path, "w") as target:
+        stream = target.add_stream("libx264" if _has(av, "libx264") else "mpeg4", rate=SAMPLE_FPS)
+        stream.width, stream.height = size
+        stream.pix_fmt = "yuv420p"
+        stream.codec_context.options = {"crf": "12"}
+        for index in range(SAMPLE_SECONDS * SAMPLE_FPS):
+            shift = index * 8 % size[0]
+            moving = gradient.transform(size, Image.AFFINE, (1, 0, shift, 0, 1, 0))
+            frame = Image.merge("RGB", (moving, noise, gradient))
+            for packet in stream.encode(av.VideoFrame.from_image(frame)):
+                target.mux(packet)
+        for packet in stream.encode():
+            target.mux(packet)
+
+
+def _has(av, name):
+    try:
+        av.codec.Codec(name, "w")
+        return True
+    except Exception:
+        return False
+
+
+def _frame_count(av, path):
+    with av.open(path) as source:
+        stream = next(s for s in source.streams if s.type == "video")
+        return sum(1 for _ in source.decode(stream))
+
+
+def _encode(av, encoder, path, output, profile):
+    start = time.perf_counter()
+    mobile_video_playback.pyav_transcode(av, encoder, path, output, profile=profile)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clip", action="append", default=[], help="benchmark this file instead of the samples")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    av = mobile_video_playback.pyav_module()
+    encoder = mobile_video_playback.pyav_h264_encoder(av) if av is not None else None
+    if encoder is None:
+        sys.exit("PyAV with an H.264 encoder is required")
+
+    results = []
+    with tempfile.TemporaryDirectory() as work:
+        clips = {os.path.basename(path): path for path in args.clip}
+        if not clips:
+            for name, size in SAMPLES.items():
+                clips[name] = os.path.join(work, name + ".mp4")
+                _sample(av, clips[name], size)
+
+        print(f"encoder: {encoder}")
+        print(f"{'clip':<18}{'profile':<12}{'fps':>8}{'seconds':>9}{'MB':>8}")
+        for name, path in clips.items():
+            frames = _frame_count(av, path)
+            for profile in mobile_video_playback.ENCODER_PROFILES:
+                output = os.path.join(work, f"out-{profile}.mp4")
+                seconds = _encode(av, encoder, path, output, profile)
+                size = os.path.getsize(output)
+                results.append({
+                    "clip": name, "profile": profile, "encoder": encoder, "frames": frames,
+                    "seconds": round(seconds, 3), "fps": round(frames / seconds, 1), "bytes": size,
+                })
+                print(f"{name:<18}{profile:<12}{frames / seconds:>8.1f}{seconds:>9.2f}{size / 1e6:>8.1f}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
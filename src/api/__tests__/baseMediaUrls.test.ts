@@ -1,9 +1,10 @@
-import { describe, expect, it } from 'vitest';
+import { afterEach, describe, expect, it, vi } from 'vitest';
 import {
   getQueueImagePreviewUrl,
   getMediaThumbnailUrl,
   getMediaThumbnailUrlFromAssetUrl,
   getPlayableVideoUrl,
+  requestLiveVideoUrl,
 } from '@/api/client/base';
 import { bustImageCache } from '@/utils/imageCacheBust';
 
@@ -56,3 +57,40 @@ describe('media thumbnail URLs', () => {
     expect(getPlayableVideoUrl(external)).toBe(external);
   });
 });
+
+describe('requestLiveVideoUrl', () => {
+  afterEach(() => {
+    vi.unstubAllGlobals();
+  });
+
+  it('asks for live output with the playable query and returns the playlist', async () => {
+    const fetchMock = vi.fn().mockResolvedValue({
+      ok: true,
+      json: async () => ({ live: true, jobId: 'abc', playlist: '/mobile/api/video/live/abc/index.m3u8' }),
+    });
+    vi.stubGlobal('fetch', fetchMock);
+
+    await expect(requestLiveVideoUrl(
+      '/view?filename=clip.webm&subfolder=video&type=output&cb=7',
+    )).resolves.toBe('/mobile/api/video/live/abc/index.m3u8');
+    expect(fetchMock).toHaveBeenCalledWith(
+      '/mobile/api/video/live?filename=clip.webm&subfolder=video&type=output&cb=7',
+      { method: 'POST' },
+    );
+  });
+
+  it('resolves null when nothing is live or the request fails', async () => {
+    const fetchMock = vi.fn()
+      .mockResolvedValueOnce({ ok: true, json: async () => ({ live: false }) })
+      .mockResolvedValueOnce({ ok: false, json: async () => ({}) })
+      .mockRejectedValueOnce(new TypeError('offline'));
+    vi.stubGlobal('fetch', fetchMock);
+    const asset = '/view?filename=clip.webm&subfolder=&type=output';
+
+    await expect(requestLiveVideoUrl(asset)).resolves.toBeNull();
+    await expect(requestLiveVideoUrl(asset)).resolves.toBeNull();
+    await expect(requestLiveVideoUrl(asset)).resolves.toBeNull();
+    await expect(requestLiveVideoUrl('blob:https://example.test/id')).resolves.toBeNull();
+    expect(fetchMock).toHaveBeenCalledTimes(3);
+  });
+});
@@ -77,25 +77,51 @@ export function getMediaThumbnailUrlFromAssetUrl(assetUrl: string): string | und
 // gives the native browser player a consistently seekable MP4. Unknown/blob/
 // third-party URLs remain untouched.
 export function getPlayableVideoUrl(assetUrl: string): string {
+  const query = getPlayableVideoQuery(assetUrl);
+  return query === undefined ? assetUrl : `/mobile/api/video/playable?${query}`;
+}
+
+// Query string identifying a local `/view` video to the playback gateway, or
+// undefined for URLs the gateway does not serve.
+function getPlayableVideoQuery(assetUrl: string): string | undefined {
   try {
     const base = typeof window === 'undefined' ? 'http://localhost' : window.location.origin;
     const parsed = new URL(assetUrl, base);
-    if (parsed.origin !== base || parsed.pathname !== '/view') return assetUrl;
+    if (parsed.origin !== base || parsed.pathname !== '/view') return undefined;
 
     const filename = parsed.searchParams.get('filename');
     const type = parsed.searchParams.get('type') ?? parsed.searchParams.get('source');
-    if (!filename || !type) return assetUrl;
+    if (!filename || !type) return undefined;
 
-    let url = `/mobile/api/video/playable?filename=${encodeURIComponent(filename)}`
+    let query = `filename=${encodeURIComponent(filename)}`
       + `&subfolder=${encodeURIComponent(parsed.searchParams.get('subfolder') ?? '')}`
       + `&type=${encodeURIComponent(type)}`;
     // Preserve the original URL's cache-bust identity when a deleted filename
     // is later reused, so the browser cannot pin the older prepared response.
     const cacheToken = parsed.searchParams.get('cb');
-    if (cacheToken) url += `&cb=${encodeURIComponent(cacheToken)}`;
-    return url;
+    if (cacheToken) query += `&cb=${encodeURIComponent(cacheToken)}`;
+    return query;
+  } catch {
+    return undefined;
+  }
+}
+
+// For a video that still needs transcoding, ask the gateway to also write it
+// as live HLS while it encodes, so an HLS-capable player starts after the
+// first few seconds are encoded instead of after the whole file. Resolves to
+// the playlist URL, or null when there is nothing live to play (the video is
+// ready, a quick remux, or already being prepared) and getPlayableVideoUrl is
+// the one to use. Never rejects.
+export async function requestLiveVideoUrl(assetUrl: string): Promise<string | null> {
+  const query = getPlayableVideoQuery(assetUrl);
+  if (query === undefined) return null;
+  try {
+    const response = await fetch(`/mobile/api/video/live?${query}`, { method: 'POST' });
+    if (!response.ok) return null;
+    const data = await response.json() as { playlist?: string };
+    return data.playlist ?? null;
   } catch {
-    return assetUrl;
+    return null;
   }
 }
 
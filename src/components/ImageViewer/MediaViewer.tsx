@@ -7,6 +7,7 @@ import { useImageViewerStore } from '@/hooks/useImageViewer';
 import { useI18n } from '@/i18n';
 import { usePinnedWidgetStore } from '@/hooks/usePinnedWidget';
 import { useIsDesktop } from '@/hooks/useIsDesktop';
+import { useLiveVideoSrc } from '@/hooks/useLiveVideoSrc';
 import type { ViewerImage } from '@/utils/viewerImages';
 import type { DownloadOutcome } from '@/utils/downloads';
 import { MediaViewerHeader } from './MediaViewer/Header';
@@ -24,7 +25,6 @@ import {
   getFileWorkflowAvailability,
   getImageMetadata,
   getMediaThumbnailUrlFromAssetUrl,
-  getPlayableVideoUrl,
 } from '@/api/client';
 import { resolveFilePath, resolveFileSource } from '@/utils/workflowOperations';
 import { reportVideoPlaybackIssue } from '@/utils/mediaDiagnostics';
@@ -286,6 +286,7 @@ export function MediaViewer({
     return () => window.clearTimeout(timer);
   }, [isCurrentImageLoading]);
   const renderIsVideo = Boolean(renderItem && isViewerVideo(renderItem));
+  const liveVideo = useLiveVideoSrc(renderIsVideo ? renderItem?.src : undefined);
   // A/B comparison mode: when the item carries a `comparison`, render both images
   // sharing one transform with a wipe divider. The item's `src` is image B (the
   // base that drives sizing/load), so the existing load machinery is untouched;
@@ -1451,7 +1452,7 @@ export function MediaViewer({
                   // element whose old (looping, autoplaying) stream keeps decoding.
                   key={renderItem.src}
                   ref={videoRef}
-                  src={getPlayableVideoUrl(renderItem.src)}
+                  src={liveVideo.src}
                   poster={getMediaThumbnailUrlFromAssetUrl(renderItem.src)}
                   controls
                   autoPlay
@@ -1462,6 +1463,8 @@ export function MediaViewer({
                   className="w-full h-full object-contain select-none"
                   onDragStart={(event) => event.preventDefault()}
                   onError={(event) => {
+                    // Live output that is gone or failed: play the prepared file.
+                    if (liveVideo.fallBack()) return;
                     reportVideoPlaybackIssue('media viewer', 'error', event.currentTarget);
                     setVideoError(true);
                   }}
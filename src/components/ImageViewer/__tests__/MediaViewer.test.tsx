@@ -6,6 +6,7 @@ import { MediaViewer } from '@/components/ImageViewer/MediaViewer';
 
 const getFileWorkflowAvailabilityMock = vi.fn();
 const getImageMetadataMock = vi.fn();
+const requestLiveVideoUrlMock = vi.fn();
 
 vi.mock('@/api/client', () => ({
   getFileWorkflowAvailability: (...args: unknown[]) =>
@@ -15,6 +16,7 @@ vi.mock('@/api/client', () => ({
     url.includes('/view?') ? '/mobile/api/thumbnail?filename=clip.mp4&subfolder=renders&source=output' : undefined,
   getPlayableVideoUrl: (url: string) =>
     url.includes('/view?') ? '/mobile/api/video/playable?filename=clip.mp4&subfolder=renders&type=output' : url,
+  requestLiveVideoUrl: (...args: unknown[]) => requestLiveVideoUrlMock(...args),
 }));
 
 vi.mock('@/hooks/useTextareaFocus', () => ({
@@ -77,6 +79,8 @@ describe('MediaViewer workflow availability', () => {
     getFileWorkflowAvailabilityMock.mockResolvedValue(false);
     getImageMetadataMock.mockReset();
     getImageMetadataMock.mockResolvedValue({});
+    requestLiveVideoUrlMock.mockReset();
+    requestLiveVideoUrlMock.mockResolvedValue(null);
   });
 
   afterEach(async () => {
@@ -86,6 +90,7 @@ describe('MediaViewer workflow availability', () => {
     container.remove();
     vi.useRealTimers();
     vi.unstubAllGlobals();
+    vi.restoreAllMocks();
   });
 
   it('shows load workflow button for video when availability endpoint reports true', async () => {
@@ -127,6 +132,44 @@ describe('MediaViewer workflow availability', () => {
     );
   });
 
+  it('plays a transcode live where HLS is native and falls back when that fails', async () => {
+    vi.spyOn(HTMLMediaElement.prototype, 'canPlayType').mockImplementation(
+      (type: string) => (type === 'application/vnd.apple.mpegurl' ? 'maybe' : ''),
+    );
+    requestLiveVideoUrlMock.mockResolvedValue('/mobile/api/video/live/abc/index.m3u8');
+
+    await act(async () => {
+      root.render(
+        <MediaViewer
+          open={true}
+          items={[makeVideoItem()]}
+          index={0}
+          onIndexChange={() => {}}
+          onClose={() => {}}
+          onDelete={() => {}}
+          onLoadWorkflow={() => {}}
+          onLoadInWorkflow={() => {}}
+        />,
+      );
+    });
+    await flushEffects();
+
+    expect(requestLiveVideoUrlMock).toHaveBeenCalledWith(
+      '/view?filename=clip.mp4&subfolder=renders&type=output',
+    );
+    const video = () => document.querySelector<HTMLVideoElement>('#media-viewer-overlay video');
+    expect(video()?.getAttribute('src')).toBe('/mobile/api/video/live/abc/index.m3u8');
+
+    await act(async () => {
+      video()?.dispatchEvent(new Event('error'));
+    });
+
+    expect(video()?.getAttribute('src')).toBe(
+      '/mobile/api/video/playable?filename=clip.mp4&subfolder=renders&type=output',
+    );
+    expect(document.body.textContent).not.toContain('Unable to play this video.');
+  });
+
   // Regression: the "hide Load Workflow on images with no workflow" fix
   // originally left the availability probe video-only, so a still fell back to
   // `item.workflow` alone. That is only populated from the loaded history
@@ -0,0 +1,59 @@
+import { useCallback, useEffect, useState } from 'react';
+import { getPlayableVideoUrl, requestLiveVideoUrl } from '@/api/client';
+
+const HLS_MIME_TYPE = 'application/vnd.apple.mpegurl';
+
+function canPlayHls(): boolean {
+  if (typeof document === 'undefined') return false;
+  return document.createElement('video').canPlayType(HLS_MIME_TYPE) !== '';
+}
+
+interface ResolvedVideoSrc {
+  assetUrl: string;
+  src: string;
+  live: boolean;
+}
+
+/**
+ * `<video>` src for a viewer video. Where the browser plays HLS natively, a
+ * video still waiting on a transcode plays from the transcode's live output
+ * as it encodes (see requestLiveVideoUrl); otherwise, and whenever there is
+ * nothing live, this is getPlayableVideoUrl. `src` is undefined while the
+ * server is being asked: loading the playable URL meanwhile would start the
+ * preparation without live output. `fallBack` moves a failed live src to the
+ * playable URL and returns whether it did, for the element's onError.
+ */
+export function useLiveVideoSrc(assetUrl: string | undefined): {
+  src: string | undefined;
+  fallBack: () => boolean;
+} {
+  const [hls] = useState(canPlayHls);
+  const [resolved, setResolved] = useState<ResolvedVideoSrc | null>(null);
+
+  useEffect(() => {
+    if (!assetUrl || !hls) return;
+    let cancelled = false;
+    void requestLiveVideoUrl(assetUrl).then((playlist) => {
+      if (cancelled) return;
+      setResolved({
+        assetUrl,
+        src: playlist ?? getPlayableVideoUrl(assetUrl),
+        live: playlist !== null,
+      });
+    });
+    return () => {
+      cancelled = true;
+    };
+  }, [assetUrl, hls]);
+
+  const current = resolved?.assetUrl === assetUrl ? resolved : null;
+  const fallBack = useCallback(() => {
+    if (!assetUrl || !current?.live) return false;
+    setResolved({ assetUrl, src: getPlayableVideoUrl(assetUrl), live: false });
+    return true;
+  }, [assetUrl, current]);
+
+  if (!assetUrl) return { src: undefined, fallBack };
+  if (!hls) return { src: getPlayableVideoUrl(assetUrl), fallBack };
+  return { src: current?.src, fallBack };
+}
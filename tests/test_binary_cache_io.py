@@ -1,6 +1,8 @@
 import os
 import threading
+import time
 
+import binary_cache_io
 from binary_cache_io import atomic_write_bytes, render_lock
 
 
@@ -59,3 +61,95 @@ def test_render_lock_collapses_concurrent_renders():
 
     assert renders == [b"rendered"]
     assert results == [b"rendered"] * 4
+
+
+def _entry(cache_dir, digest, data, age_seconds):
+    path = binary_cache_io.sharded_path(str(cache_dir), digest, ".jpg")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as handle:
+        handle.write(data)
+    past = time.time() - age_seconds
+    os.utime(path, (past, past))
+    return path
+
+
+def test_sharded_path_fans_out_by_digest_prefix(tmp_path):
+    path = binary_cache_io.sharded_path(str(tmp_path), "abcdef", ".webp")
+    assert path == os.path.join(str(tmp_path), "ab", "abcdef.webp")
+
+
+def test_prune_evicts_least_recently_served_first(tmp_path):
+    old_written = _entry(tmp_path, "aa01", b"x" * 10, 3600)
+    older_written = _entry(tmp_path, "bb01", b"x" * 10, 7200)
+    newest_written = _entry(tmp_path, "cc01", b"x" * 10, 1800)
+    # Served long ago, but more recently than the other two were written.
+    with binary_cache_io._served_lock:
+        binary_cache_io._served[older_written] = time.time() - 600
+
+    binary_cache_io.prune(str(tmp_path), max_bytes=1024, max_files=2)
+
+    assert not os.path.exists(old_written)
+    assert os.path.exists(older_written)
+    assert os.path.exists(newest_written)
+
+
+def test_prune_enforces_bytes_but_spares_the_grace_window(tmp_path):
+    stale = _entry(tmp_path, "aa02", b"x" * 100, 3600)
+    fresh = _entry(tmp_path, "bb02", b"x" * 100, 0)
+
+    binary_cache_io.prune(str(tmp_path), max_bytes=50, max_files=100)
+
+    assert not os.path.exists(stale)
+    # Still over budget, but just written: kept until the next prune.
+    assert os.path.exists(fresh)
+
+
+def test_prune_counts_flat_legacy_files_and_drops_stale_temps(tmp_path):
+    legacy = tmp_path / "0123.jpg"
+    legacy.write_bytes(b"x")
+    past = time.time() - 3600
+    os.utime(legacy, (past, past))
+    current = _entry(tmp_path, "cc03", b"x", 0)
+    stale_tmp = tmp_path / "cc" / "cc03.jpg.1.2.tmp"
+    stale_tmp.write_bytes(b"partial")
+    day_ago = time.time() - 2 * 24 * 60 * 60
+    os.utime(stale_tmp, (day_ago, day_ago))
+
+    binary_cache_io.prune(str(tmp_path), max_bytes=1024, max_files=1)
+
+    assert not legacy.exists()
+    assert not stale_tmp.exists()
+    assert os.path.exists(current)
+
+
+def test_store_cached_creates_shard_dir_and_prunes_on_first_store(tmp_path):
+    stale = _entry(tmp_path, "aa04", b"x", 3600)
+    path = binary_cache_io.sharded_path(str(tmp_path), "dd04", ".jpg")
+
+    binary_cache_io.store_cached(path, b"new", max_bytes=1024, max_files=1)
+
+    assert binary_cache_io.read_cached(path) == b"new"
+    assert not os.path.exists(stale)
+
+
+def test_etag_matches_lists_weak_tags_and_wildcard():
+    etag = binary_cache_io.etag_for("abc123")
+    assert etag == '"abc123"'
+    assert binary_cache_io.etag_matches('"abc123"', etag)
+    assert binary_cache_io.etag_matches('"zzz", W/"abc123"', etag)
+    assert binary_cache_io.etag_matches("*", etag)
+    assert not binary_cache_io.etag_matches('"abc"', etag)
+    assert not binary_cache_io.etag_matches(None, etag)
+
+
+def test_cached_file_returns_complete_entries_and_protects_them(tmp_path):
+    path = _entry(tmp_path, "ee05", b"x" * 10, 3600)
+    empty = _entry(tmp_path, "ff05", b"", 3600)
+
+    assert binary_cache_io.cached_file(str(tmp_path / "missing.jpg")) is None
+    assert binary_cache_io.cached_file(empty) is None
+    assert binary_cache_io.cached_file(path) == path
+
+    # Looked up for sendfile a moment ago: inside the grace window now.
+    binary_cache_io.prune(str(tmp_path), max_bytes=0, max_files=0)
+    assert os.path.exists(path)
@@ -64,3 +64,20 @@ def test_ignores_unknown_and_non_boolean_updates(prefs_file):
 
     assert result[key] == prefs._DEFAULTS[key]
     assert "not_a_real_pref" not in result
+
+
+def test_choice_prefs_accept_only_their_listed_values(prefs_file):
+    assert prefs.get_prefs()["videoEncoderProfile"] == "balanced"
+
+    assert prefs.set_prefs({"videoEncoderProfile": "quality"})["videoEncoderProfile"] == "quality"
+    result = prefs.set_prefs({"videoEncoderProfile": "ultra"})
+    result = prefs.set_prefs({"videoEncoderProfile": True})
+
+    assert result["videoEncoderProfile"] == "quality"
+    assert json.loads(prefs_file.read_text())["videoEncoderProfile"] == "quality"
+
+
+def test_encoder_profile_choices_match_the_encoder_profiles():
+    import mobile_video_playback
+
+    assert set(prefs._CHOICES["videoEncoderProfile"]) == set(mobile_video_playback.ENCODER_PROFILES)
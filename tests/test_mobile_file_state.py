@@ -29,13 +29,20 @@ def file_entry(path: str, entry_type: str = "file") -> dict:
     return {"name": path.split("/")[-1], "path": path, "type": entry_type}
 
 
-def read_cache(cache_path: Path) -> dict:
-    with open(cache_path, "r", encoding="utf-8") as handle:
+def state_file(cache_path: Path, source: str = "output") -> Path:
+    """Where a source's state currently lives: its shard once written, else the
+    unified document it still falls back to."""
+    shard = Path(mobile_file_state._shard_path(str(cache_path), source))
+    return shard if shard.exists() else cache_path
+
+
+def read_cache(cache_path: Path, source: str = "output") -> dict:
+    with open(state_file(cache_path, source), "r", encoding="utf-8") as handle:
         return json.load(handle)
 
 
 def raw_entry(cache_path: Path, source: str, state: str, path: str) -> dict | None:
-    data = read_cache(cache_path)
+    data = read_cache(cache_path, source)
     for entry in data.get("states", {}).get(source, {}).get(state, []):
         if entry.get("path") == path:
             return entry
@@ -216,7 +223,7 @@ def test_reject_on_directory_is_a_noop(tmp_path: Path):
     assert get_paths(str(cache), "output", "reject", str(output)) == []
     # No entry should have been created at all -- the cache file may not even
     # exist, or if it does, it must carry no reject state for this source.
-    if cache.exists():
+    if state_file(cache).exists():
         data = read_cache(cache)
         assert "reject" not in data.get("states", {}).get("output", {})
 
@@ -253,7 +260,7 @@ def test_set_state_does_not_commit_a_hash_for_a_replaced_file(tmp_path: Path, mo
     assert set_state(
         str(cache), "output", "favorite", str(output), "race.png", True
     ) is False
-    assert not cache.exists()
+    assert not state_file(cache).exists()
 
 
 # ---------------------------------------------------------------------------
@@ -339,15 +346,47 @@ def test_annotate_listing_rediscovers_moved_hidden(tmp_path: Path):
 def test_annotate_listing_second_call_is_a_stable_no_op(tmp_path: Path):
     cache, output = _rediscovery_scenario(tmp_path, "favorite")
 
-    before = cache.read_text(encoding="utf-8")
+    before = state_file(cache).read_text(encoding="utf-8")
     listing = [file_entry("external/image.png")]
     annotate_listing(str(cache), "output", str(output), listing, set())
-    after = cache.read_text(encoding="utf-8")
+    after = state_file(cache).read_text(encoding="utf-8")
 
     assert listing[0].get("favorite") is True
     assert before == after  # fast path hit: no write needed, no re-hash
 
 
+def test_annotate_listing_hashes_only_size_candidates_and_each_once(tmp_path: Path, monkeypatch):
+    cache = tmp_path / "file_state.json"
+    output = tmp_path / "output"
+    output.mkdir()
+    original = output / "image.png"
+    original.write_bytes(b"tracked-in-two-states")
+    set_state(str(cache), "output", "favorite", str(output), "image.png", True)
+    set_state(str(cache), "output", "hidden", str(output), "image.png", True)
+    original.rename(output / "moved.png")
+    for index in range(20):
+        (output / f"other-{index}.png").write_bytes(b"x" * (100 + index))
+
+    hashed = []
+    real_content_id = mobile_file_state.content_id
+    monkeypatch.setattr(
+        mobile_file_state,
+        "content_id",
+        lambda path: (hashed.append(Path(path).name), real_content_id(path))[1],
+    )
+    listing = [file_entry("moved.png")] + [
+        file_entry(f"other-{index}.png") for index in range(20)
+    ]
+    annotate_listing(str(cache), "output", str(output), listing, set())
+
+    # Untracked sizes are settled without opening the file, and the one true
+    # candidate is read once even though two states rediscover it.
+    assert hashed == ["moved.png"]
+    assert listing[0].get("favorite") is True
+    assert listing[0].get("hiddenSelf") is True
+    assert not any(item.get("favorite") for item in listing[1:])
+
+
 # ---------------------------------------------------------------------------
 # name reuse must not inherit stale state
 # ---------------------------------------------------------------------------
@@ -656,6 +695,121 @@ def test_identity_aware_delete_does_not_clobber_concurrent_cache_rename(tmp_path
     assert raw_entry(cache, "output", "favorite", "concurrent-winner.png") is not None
 
 
+def test_bulk_delete_plans_from_one_snapshot_and_saves_once(tmp_path: Path, monkeypatch):
+    cache = tmp_path / "file_state.json"
+    output = tmp_path / "output"
+    (output / "folder").mkdir(parents=True)
+    names = [f"reject_{i}.png" for i in range(5)]
+    for i, name in enumerate(names):
+        (output / name).write_bytes(f"reject-{i}".encode())
+        set_state(str(cache), "output", "reject", str(output), name, True)
+    (output / "folder" / "inner.png").write_bytes(b"inner")
+    set_state(str(cache), "output", "favorite", str(output), "folder/inner.png", True)
+    (output / "kept.png").write_bytes(b"kept")
+    set_state(str(cache), "output", "reject", str(output), "kept.png", True)
+
+    loads = []
+    saves = []
+    real_load = mobile_file_state._load_source
+    real_save = mobile_file_state._save_source
+    monkeypatch.setattr(mobile_file_state, "_load_source", lambda *a: loads.append(a) or real_load(*a))
+    monkeypatch.setattr(mobile_file_state, "_save_source", lambda *a: saves.append(a) or real_save(*a))
+
+    paths = names + ["folder", "folder/inner.png"]
+    plans = mobile_file_state.plan_remove_paths(str(cache), "output", str(output), paths)
+    assert len(loads) == 1
+    assert set(plans) == set(paths)
+    for name in names:
+        (output / name).unlink()
+    (output / "folder" / "inner.png").unlink()
+    (output / "folder").rmdir()
+    mobile_file_state.remove_paths(str(cache), "output", paths, plans)
+
+    assert len(loads) == 2
+    assert len(saves) == 1
+    assert get_all(str(cache), "output", str(output), max_age_ms=0) == {
+        "favorite": [],
+        "reject": ["kept.png"],
+        "hidden": [],
+    }
+
+
+@pytest.fixture
+def delete_route(tmp_path: Path, monkeypatch):
+    """The bulk DELETE handler, rooted at tmp output, answering (status, body)."""
+    import asyncio
+    import importlib
+    from types import SimpleNamespace
+
+    mobile_init = importlib.import_module("__init__")
+    output = tmp_path / "output"
+    output.mkdir()
+    cache = tmp_path / "file_state.json"
+    monkeypatch.setattr(mobile_init, "_source_base_dir", lambda _source: str(output))
+    monkeypatch.setattr(mobile_init, "FILE_STATE_CACHE_PATH", str(cache))
+    monkeypatch.setattr(
+        mobile_init,
+        "web",
+        SimpleNamespace(json_response=lambda body, status=200: (status, body)),
+    )
+
+    def delete(paths, source="output"):
+        return asyncio.run(mobile_init._delete_files(paths, source))
+
+    return SimpleNamespace(delete=delete, output=output, cache=cache, module=mobile_init)
+
+
+def test_bulk_delete_route_rejects_bad_requests_before_deleting(delete_route):
+    (delete_route.output / "image.png").write_bytes(b"image")
+
+    assert delete_route.delete([])[0] == 400
+    assert delete_route.delete(["image.png", 5])[0] == 400
+    assert delete_route.delete(["image.png", ""])[0] == 400
+    assert delete_route.delete(["image.png"], source="models")[0] == 400
+    assert delete_route.delete(["image.png", "../escape.png"]) == (
+        403, {"error": "Access denied", "path": "../escape.png"},
+    )
+    # "." is the source root itself.
+    assert delete_route.delete(["image.png", "."])[0] == 403
+    assert (delete_route.output / "image.png").exists()
+
+
+def test_bulk_delete_route_skips_nested_paths_and_reports_missing(delete_route, monkeypatch):
+    output, cache = delete_route.output, str(delete_route.cache)
+    (output / "folder" / "deep").mkdir(parents=True)
+    (output / "folder" / "inner.png").write_bytes(b"inner")
+    (output / "folder" / "deep" / "leaf.png").write_bytes(b"leaf")
+    (output / "loose.png").write_bytes(b"loose")
+    (output / "kept.png").write_bytes(b"kept")
+    for name in ("folder/inner.png", "loose.png", "kept.png"):
+        set_state(cache, "output", "favorite", str(output), name, True)
+
+    mobile_init = delete_route.module
+    removed = []
+    real_rmtree = mobile_init.shutil.rmtree
+    real_remove = mobile_init.os.remove
+    monkeypatch.setattr(mobile_init.shutil, "rmtree", lambda p: removed.append(p) or real_rmtree(p))
+    monkeypatch.setattr(mobile_init.os, "remove", lambda p: removed.append(p) or real_remove(p))
+    saves = []
+    real_save = mobile_file_state._save_source
+    monkeypatch.setattr(mobile_file_state, "_save_source", lambda *a: saves.append(a) or real_save(*a))
+
+    status, body = delete_route.delete(
+        ["folder", "folder/inner.png", "folder/deep/leaf.png", "loose.png", "gone.png", "loose.png"]
+    )
+
+    assert status == 200
+    assert body["success"] is True
+    assert body["deleted"] == ["folder", "folder/inner.png", "folder/deep/leaf.png", "loose.png"]
+    assert body["missing"] == ["gone.png"]
+    assert body["failed"] == []
+    # The nested paths went with the folder's rmtree, not a second delete.
+    assert sorted(removed) == sorted([str(output / "folder"), str(output / "loose.png")])
+    assert not (output / "folder").exists()
+    assert len(saves) == 1
+    assert get_paths(cache, "output", "favorite", str(output)) == ["kept.png"]
+
+
 # ---------------------------------------------------------------------------
 # hidden folder inheritance
 # ---------------------------------------------------------------------------
@@ -887,10 +1041,10 @@ def test_migrate_legacy_favorite_absent_survives_and_is_rediscovered_by_full_sha
 
     # A second listing pass must be a stable no-op (fast path only from here
     # on -- the full-sha fallback paid its cost exactly once).
-    before = cache.read_text(encoding="utf-8")
+    before = state_file(cache).read_text(encoding="utf-8")
     listing2 = [file_entry("found/gone.png")]
     annotate_listing(str(cache), "output", str(output), listing2, set())
-    after = cache.read_text(encoding="utf-8")
+    after = state_file(cache).read_text(encoding="utf-8")
     assert listing2[0].get("favorite") is True
     assert before == after
 
@@ -1016,6 +1170,55 @@ def test_rejecting_legacy_favorite_before_hydration_clears_same_content(tmp_path
     }
 
 
+def test_get_all_trusts_a_recent_verification_without_touching_disk(tmp_path: Path, monkeypatch):
+    cache = tmp_path / "file_state.json"
+    output = tmp_path / "output"
+    output.mkdir()
+    (output / "a.png").write_bytes(b"a-bytes")
+    set_state(str(cache), "output", "favorite", str(output), "a.png", True)
+
+    first = get_all(str(cache), "output", str(output), include_verified_at=True)
+    assert first["favorite"] == ["a.png"]
+    stamp = first["verifiedAt"]["favorite"]["a.png"]
+
+    def no_disk(*_args, **_kwargs):
+        raise AssertionError("a fresh verification must not be repeated")
+
+    monkeypatch.setattr(mobile_file_state, "_verify_entry", no_disk)
+    second = get_all(str(cache), "output", str(output), include_verified_at=True)
+
+    assert second["favorite"] == ["a.png"]
+    assert second["verifiedAt"]["favorite"]["a.png"] == stamp
+
+
+def test_get_all_reverifies_an_entry_whose_stored_signature_changed(tmp_path: Path):
+    cache = tmp_path / "file_state.json"
+    output = tmp_path / "output"
+    output.mkdir()
+    (output / "a.png").write_bytes(b"a-bytes")
+    set_state(str(cache), "output", "favorite", str(output), "a.png", True)
+    assert get_all(str(cache), "output", str(output))["favorite"] == ["a.png"]
+
+    # An in-app rename rewrites the entry, so the old record no longer applies.
+    (output / "a.png").rename(output / "b.png")
+    rename_path(str(cache), "output", "a.png", "b.png", str(output))
+
+    assert get_all(str(cache), "output", str(output))["favorite"] == ["b.png"]
+
+
+def test_get_all_with_zero_window_always_verifies(tmp_path: Path):
+    cache = tmp_path / "file_state.json"
+    output = tmp_path / "output"
+    output.mkdir()
+    (output / "a.png").write_bytes(b"a-bytes")
+    set_state(str(cache), "output", "favorite", str(output), "a.png", True)
+    assert get_all(str(cache), "output", str(output))["favorite"] == ["a.png"]
+
+    (output / "a.png").unlink()
+
+    assert get_all(str(cache), "output", str(output), max_age_ms=0)["favorite"] == []
+
+
 def test_get_all_does_not_hold_lock_while_hashing(tmp_path: Path, monkeypatch):
     cache = tmp_path / "file_state.json"
     output = tmp_path / "output"
@@ -1349,3 +1552,141 @@ def test_hidden_listing_view_sees_an_unknown_kind_folder_that_returned(tmp_path:
 
     assert verified == ["gone_for_now"]
     assert dirs == {"gone_for_now"}, "the returned folder must carry inheritance immediately"
+
+
+# --- Per-source shards -----------------------------------------------------
+
+def test_each_source_is_written_to_its_own_shard(tmp_path: Path):
+    cache = tmp_path / "file_state.json"
+    output = tmp_path / "output"
+    inputs = tmp_path / "input"
+    output.mkdir()
+    inputs.mkdir()
+    (output / "a.png").write_bytes(b"output-a")
+    (inputs / "b.png").write_bytes(b"input-b")
+
+    set_state(str(cache), "output", "favorite", str(output), "a.png", True)
+    set_state(str(cache), "input", "favorite", str(inputs), "b.png", True)
+
+    assert not cache.exists()
+    output_doc = json.loads((tmp_path / "file_state.output.json").read_text(encoding="utf-8"))
+    input_doc = json.loads((tmp_path / "file_state.input.json").read_text(encoding="utf-8"))
+    assert list(output_doc["states"]) == ["output"]
+    assert list(input_doc["states"]) == ["input"]
+
+
+def test_a_held_source_lock_does_not_block_another_source(tmp_path: Path):
+    cache = tmp_path / "file_state.json"
+    inputs = tmp_path / "input"
+    inputs.mkdir()
+    (inputs / "b.png").write_bytes(b"input-b")
+
+    with mobile_file_state._source_lock(str(cache), "output"):
+        writer = threading.Thread(
+            target=set_state,
+            args=(str(cache), "input", "favorite", str(inputs), "b.png", True),
+            daemon=True,
+        )
+        writer.start()
+        writer.join(timeout=2)
+        assert not writer.is_alive()
+
+    assert get_paths(str(cache), "input", "favorite", str(inputs)) == ["b.png"]
+
+
+def test_migrate_to_shards_splits_the_unified_document_once(tmp_path: Path):
+    cache = tmp_path / "file_state.json"
+    output = tmp_path / "output"
+    inputs = tmp_path / "input"
+    output.mkdir()
+    inputs.mkdir()
+    (output / "folder").mkdir()
+    (inputs / "folder").mkdir()
+    cache.write_text(json.dumps({
+        "version": 3,
+        "updatedAt": 1,
+        "states": {
+            "output": {"favorite": [{"path": "folder", "kind": "dir"}]},
+            "input": {"hidden": [{"path": "folder", "kind": "dir"}]},
+        },
+        "activity": {},
+    }), encoding="utf-8")
+
+    assert mobile_file_state.migrate_to_shards(str(cache)) is True
+    assert (tmp_path / "file_state.output.json").exists()
+    assert (tmp_path / "file_state.input.json").exists()
+    assert cache.exists()  # kept for rollback
+    assert get_paths(str(cache), "output", "favorite", str(output)) == ["folder"]
+    assert get_paths(str(cache), "input", "hidden", str(inputs)) == ["folder"]
+
+    # Changes made after the split must survive a restart's second attempt.
+    set_state(str(cache), "output", "favorite", str(output), "folder", False)
+    assert mobile_file_state.migrate_to_shards(str(cache)) is False
+    assert get_paths(str(cache), "output", "favorite", str(output)) == []
+
+
+# ---------------------------------------------------------------------------
+# background legacy upgrade
+# ---------------------------------------------------------------------------
+
+def _migrate_legacy_favorites(tmp_path: Path, cache: Path, output: Path, entries: list[dict]) -> None:
+    favorites_path = tmp_path / "file_favorites.json"
+    write_legacy_favorites(favorites_path, {"output": entries})
+    hidden_path = tmp_path / "hidden_items.json"
+    write_legacy_hidden(hidden_path, {})
+    assert migrate_legacy(
+        str(cache),
+        favorites_path=str(favorites_path),
+        hidden_path=str(hidden_path),
+        base_dirs={"output": str(output)},
+    )
+
+
+def test_legacy_upgrade_rekeys_in_place_and_follows_moved_files(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(mobile_file_state, "_LEGACY_UPGRADE_PAUSE_S", 0)
+    cache = tmp_path / "file_state.json"
+    output = tmp_path / "output"
+    output.mkdir()
+    stays = b"bytes-that-stay-put"
+    moved = b"bytes-that-moved-away"
+    _migrate_legacy_favorites(tmp_path, cache, output, [
+        {"path": "stays.png", "kind": "file",
+         "sha256": hashlib.sha256(stays).hexdigest(), "size": len(stays), "mtimeNs": 0},
+        {"path": "old/moved.png", "kind": "file",
+         "sha256": hashlib.sha256(moved).hexdigest(), "size": len(moved), "mtimeNs": 0},
+    ])
+    # Both files were absent at migration time, so both entries are still
+    # keyed by their full sha256.
+    assert raw_entry(cache, "output", "favorite", "stays.png").get("legacySha256")
+    (output / "stays.png").write_bytes(stays)
+    (output / "new").mkdir()
+    (output / "new" / "moved.png").write_bytes(moved)
+
+    status = mobile_file_state.upgrade_legacy_entries(str(cache), "output", str(output))
+
+    assert status == {"running": False, "total": 2, "processed": 2, "upgraded": 2}
+    for path in ("stays.png", "new/moved.png"):
+        entry = raw_entry(cache, "output", "favorite", path)
+        assert entry is not None
+        assert entry["contentId"].startswith("p1:")
+        assert "legacySha256" not in entry
+    assert raw_entry(cache, "output", "favorite", "old/moved.png") is None
+
+
+def test_legacy_upgrade_leaves_missing_files_for_a_later_pass(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(mobile_file_state, "_LEGACY_UPGRADE_PAUSE_S", 0)
+    cache = tmp_path / "file_state.json"
+    output = tmp_path / "output"
+    output.mkdir()
+    legacy_sha = hashlib.sha256(b"not-here-yet").hexdigest()
+    _migrate_legacy_favorites(tmp_path, cache, output, [
+        {"path": "gone.png", "kind": "file", "sha256": legacy_sha, "size": 12, "mtimeNs": 0},
+    ])
+    (output / "same_size.png").write_bytes(b"other-bytes!")
+
+    status = mobile_file_state.upgrade_legacy_entries(str(cache), "output", str(output))
+
+    assert status["upgraded"] == 0 and status["processed"] == 1
+    assert raw_entry(cache, "output", "favorite", "gone.png")["legacySha256"] == legacy_sha
+    # Nothing legacy left means no thread is started at all.
+    assert mobile_file_state.start_legacy_upgrade(str(cache), "input", str(output)) is False
@@ -0,0 +1,268 @@
+import io
+import os
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+import mobile_image_thumbs
+
+
+@pytest.fixture
+def cache_dir(tmp_path: Path, monkeypatch):
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    monkeypatch.setattr(mobile_image_thumbs, "_cache_dir", lambda: str(cache))
+    return cache
+
+
+def test_get_or_render_caches_on_disk_and_renders_once(tmp_path: Path, cache_dir, monkeypatch):
+    source = tmp_path / "image.png"
+    Image.new("RGB", (1200, 800), (10, 20, 30)).save(source)
+    renders = []
+    real_render = mobile_image_thumbs.render
+    monkeypatch.setattr(
+        mobile_image_thumbs,
+        "render",
+        lambda *args: renders.append(args) or real_render(*args),
+    )
+
+    first = mobile_image_thumbs.get_or_render(str(source))
+    second = mobile_image_thumbs.get_or_render(str(source))
+
+    assert first == second
+    assert first[1] == "image/jpeg"
+    assert len(renders) == 1
+    with Image.open(mobile_image_thumbs._cache_path(str(source), 300)) as thumb:
+        assert max(thumb.size) == 300
+
+
+def test_one_decode_fills_every_size_class(tmp_path: Path, cache_dir, monkeypatch):
+    source = tmp_path / "image.png"
+    Image.new("RGB", (1600, 900), (10, 20, 30)).save(source)
+    opens = []
+    real_open = Image.open
+    monkeypatch.setattr(Image, "open", lambda *a, **k: opens.append(a) or real_open(*a, **k))
+
+    mobile_image_thumbs.get_or_render(str(source), 300)
+    for edge in mobile_image_thumbs.THUMBNAIL_EDGES:
+        body, _ = mobile_image_thumbs.get_or_render(str(source), edge)
+        with real_open(io.BytesIO(body)) as thumb:
+            assert max(thumb.size) == edge
+
+    assert len(opens) == 1
+
+
+def test_size_class_covers_requested_width():
+    assert mobile_image_thumbs.size_class(88) == 150
+    assert mobile_image_thumbs.size_class(300) == 300
+    assert mobile_image_thumbs.size_class(301) == 512
+    assert mobile_image_thumbs.size_class(4000) == 512
+
+
+def test_preview_render_also_fills_thumbnail_classes(tmp_path: Path, cache_dir, monkeypatch):
+    import mobile_image_preview
+
+    previews = tmp_path / "previews"
+    previews.mkdir()
+    monkeypatch.setattr(mobile_image_preview, "_cache_dir", lambda: str(previews))
+    source = tmp_path / "image.png"
+    Image.new("RGB", (3000, 2000), (10, 20, 30)).save(source)
+
+    mobile_image_preview.get_or_render_all(str(source), [2048, 1024])
+
+    assert mobile_image_preview.get_cached(str(source), 2048) is not None
+    assert mobile_image_preview.get_cached(str(source), 1024) is not None
+    for edge in mobile_image_thumbs.THUMBNAIL_EDGES:
+        assert mobile_image_thumbs.get_cached(str(source), edge) is not None
+
+
+def test_preview_miss_also_renders_recent_edges(tmp_path: Path, cache_dir, monkeypatch):
+    import mobile_image_preview
+
+    previews = tmp_path / "previews"
+    previews.mkdir()
+    monkeypatch.setattr(mobile_image_preview, "_cache_dir", lambda: str(previews))
+    monkeypatch.setattr(mobile_image_preview, "_recent_edges", [1536, 1024])
+    source = tmp_path / "image.png"
+    Image.new("RGB", (3000, 2000), (10, 20, 30)).save(source)
+    opens = []
+    real_open = Image.open
+    monkeypatch.setattr(Image, "open", lambda *a, **k: opens.append(a) or real_open(*a, **k))
+
+    mobile_image_preview.get_or_render(str(source), 1024)
+    mobile_image_preview.get_or_render(str(source), 1536)
+
+    assert mobile_image_preview.get_cached(str(source), 1536) is not None
+    assert len(opens) == 1
+
+
+def test_alpha_thumbnails_keep_png_content_type(tmp_path: Path, cache_dir):
+    source = tmp_path / "alpha.png"
+    Image.new("RGBA", (400, 400), (0, 0, 0, 0)).save(source)
+
+    mobile_image_thumbs.get_or_render(str(source))
+    body, content_type = mobile_image_thumbs.get_or_render(str(source))
+
+    assert content_type == "image/png"
+    assert body.startswith(b"\x89PNG")
+
+
+def test_cache_key_tracks_mtime_size_and_edge(tmp_path: Path, cache_dir):
+    source = tmp_path / "image.png"
+    source.write_bytes(b"aaaa")
+    os.utime(source, ns=(1_000_000_000, 1_000_000_001))
+    first = mobile_image_thumbs._cache_path(str(source), 300)
+
+    assert mobile_image_thumbs._cache_path(str(source), 150) != first
+    os.utime(source, ns=(1_000_000_000, 1_000_000_002))
+    assert mobile_image_thumbs._cache_path(str(source), 300) != first
+
+
+def test_preview_render_orients_rotated_jpeg(tmp_path: Path):
+    import mobile_image_preview
+
+    exif = Image.Exif()
+    exif[0x0112] = 8
+    source = tmp_path / "rotated.jpg"
+    Image.new("RGB", (3000, 1000), (0, 90, 0)).save(source, format="JPEG", exif=exif.tobytes())
+
+    data = mobile_image_preview.render(str(source), 1024)
+
+    with Image.open(io.BytesIO(data)) as preview:
+        assert preview.size == (341, 1024)
+
+
+def test_batch_frames_are_length_prefixed_and_self_describing():
+    import json
+    import struct
+
+    stream = (
+        mobile_image_thumbs.batch_frame(3, 200, "image/jpeg", b"\xff\xd8jpeg")
+        + mobile_image_thumbs.batch_frame(0, 404)
+    )
+
+    frames = []
+    offset = 0
+    while offset < len(stream):
+        (header_len,) = struct.unpack_from(">I", stream, offset)
+        offset += 4
+        header = json.loads(stream[offset:offset + header_len])
+        offset += header_len
+        (body_len,) = struct.unpack_from(">I", stream, offset)
+        offset += 4
+        frames.append((header, stream[offset:offset + body_len]))
+        offset += body_len
+
+    assert frames == [
+        ({"index": 3, "status": 200, "contentType": "image/jpeg"}, b"\xff\xd8jpeg"),
+        ({"index": 0, "status": 404, "contentType": None}, b""),
+    ]
+
+
+def test_batch_items_with_non_string_fields_are_rejected():
+    import importlib
+
+    mobile_init = importlib.import_module("__init__")
+    parse = mobile_init._thumbnail_batch_item
+
+    assert parse({"filename": "a.png"}) == ("output", "", "a.png")
+    assert parse({"filename": "a.png", "subfolder": "x", "source": "input"}) == ("input", "x", "a.png")
+    # Each would otherwise raise TypeError in the path join and abort the stream.
+    assert parse({"filename": 5}) is None
+    assert parse({"filename": "a.png", "subfolder": ["x"]}) is None
+    assert parse({"filename": "a.png", "source": {}}) is None
+    assert parse("a.png") is None
+
+
+def test_etag_follows_the_cache_key(tmp_path: Path, cache_dir):
+    source = tmp_path / "image.png"
+    source.write_bytes(b"aaaa")
+    os.utime(source, ns=(1_000_000_000, 1_000_000_001))
+    first = mobile_image_thumbs.etag(str(source))
+
+    assert first == mobile_image_thumbs.etag(str(source), 300)
+    assert first.startswith('"') and first.endswith('"')
+    assert mobile_image_thumbs.etag(str(source), 150) != first
+    os.utime(source, ns=(1_000_000_000, 1_000_000_002))
+    assert mobile_image_thumbs.etag(str(source)) != first
+
+
+def test_cache_hits_are_served_under_the_miss_etag(tmp_path: Path, cache_dir, monkeypatch):
+    import importlib
+
+    import mobile_image_preview
+
+    mobile_init = importlib.import_module("__init__")
+    previews = tmp_path / "previews"
+    previews.mkdir()
+    monkeypatch.setattr(mobile_image_preview, "_cache_dir", lambda: str(previews))
+    monkeypatch.setattr(mobile_init, "_KeyedFileResponse", lambda path, headers: headers)
+    source = tmp_path / "image.png"
+    Image.new("RGB", (1200, 800), (10, 20, 30)).save(source)
+
+    # The miss answers with the ETag computed before rendering...
+    thumb_etag = mobile_init._thumbnail_etag(str(source), False)
+    preview_etag = mobile_image_preview.etag(str(source), 1024)
+    mobile_image_thumbs.get_or_render(str(source))
+    mobile_image_preview.get_or_render(str(source), 1024)
+
+    # ...and the sendfile hit afterwards must carry the same one.
+    cached_path, content_type = mobile_init._cached_thumbnail_file(str(source), False)
+    hit = mobile_init._cached_file_response(cached_path, content_type, {
+        "Cache-Control": "public, max-age=86400",
+        "ETag": mobile_init._thumbnail_etag(str(source), False),
+        "Vary": "Accept",
+    })
+    assert hit["ETag"] == thumb_etag
+    assert hit["Content-Type"] == content_type and hit["Vary"] == "Accept"
+
+    cached_path = mobile_image_preview.cached_file(str(source), 1024)
+    hit = mobile_init._cached_file_response(
+        cached_path, "image/webp", {"ETag": mobile_image_preview.etag(str(source), 1024)}
+    )
+    assert hit["ETag"] == preview_etag
+
+
+def test_cached_file_reports_path_and_content_type_for_sendfile(tmp_path: Path, cache_dir):
+    opaque = tmp_path / "opaque.png"
+    Image.new("RGB", (400, 400)).save(opaque)
+    alpha = tmp_path / "alpha.png"
+    Image.new("RGBA", (400, 400)).save(alpha)
+
+    assert mobile_image_thumbs.cached_file(str(opaque)) is None
+    mobile_image_thumbs.get_or_render(str(opaque))
+    mobile_image_thumbs.get_or_render(str(alpha))
+
+    path, content_type = mobile_image_thumbs.cached_file(str(opaque))
+    assert path == mobile_image_thumbs._cache_path(str(opaque), 300)
+    assert content_type == "image/jpeg"
+    assert mobile_image_thumbs.cached_file(str(alpha), 150)[1] == "image/png"
+
+
+def test_negotiate_format_prefers_avif_then_webp(monkeypatch):
+    monkeypatch.setattr(mobile_image_thumbs, "_supported_formats", lambda: ("avif", "webp"))
+
+    assert mobile_image_thumbs.negotiate_format(None) is None
+    assert mobile_image_thumbs.negotiate_format("image/jpeg,*/*;q=0.8") is None
+    assert mobile_image_thumbs.negotiate_format("image/webp,*/*") == "webp"
+    assert mobile_image_thumbs.negotiate_format("image/avif,image/webp;q=0.9") == "avif"
+    monkeypatch.setattr(mobile_image_thumbs, "_supported_formats", lambda: ("webp",))
+    assert mobile_image_thumbs.negotiate_format("image/avif,image/webp") == "webp"
+
+
+def test_each_format_is_a_separate_cache_variant(tmp_path: Path, cache_dir):
+    source = tmp_path / "alpha.png"
+    gradient = Image.linear_gradient("L").resize((600, 600))
+    Image.merge("RGBA", (gradient, gradient, gradient, gradient)).save(source)
+
+    png, png_type = mobile_image_thumbs.get_or_render(str(source))
+    webp, webp_type = mobile_image_thumbs.get_or_render(str(source), 300, "webp")
+
+    assert (png_type, webp_type) == ("image/png", "image/webp")
+    assert len(webp) < len(png)
+    assert mobile_image_thumbs.get_or_render(str(source))[0] == png
+    assert mobile_image_thumbs.cached_file(str(source), 300, "webp")[1] == "image/webp"
+    assert mobile_image_thumbs.etag(str(source), 300, "webp") != mobile_image_thumbs.etag(str(source))
+    with Image.open(io.BytesIO(webp)) as thumb:
+        assert thumb.mode == "RGBA" and max(thumb.size) == 300
@@ -0,0 +1,125 @@
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+import mobile_image_preview
+import mobile_image_thumbs
+import mobile_pregenerate
+
+
+@pytest.fixture
+def caches(tmp_path: Path, monkeypatch):
+    thumbs = tmp_path / "thumbs"
+    previews = tmp_path / "previews"
+    thumbs.mkdir()
+    previews.mkdir()
+    monkeypatch.setattr(mobile_image_thumbs, "_cache_dir", lambda: str(thumbs))
+    monkeypatch.setattr(mobile_image_preview, "_cache_dir", lambda: str(previews))
+    monkeypatch.setattr(mobile_image_preview, "_recent_edges", [])
+    return thumbs, previews
+
+
+def test_output_files_lists_panel_outputs_only():
+    entry = {
+        "outputs": {
+            "9": {"images": [
+                {"filename": "a.png", "subfolder": "sub", "type": "output"},
+                {"filename": "preview.png", "subfolder": "", "type": "temp"},
+            ]},
+            "12": {"gifs": [{"filename": "clip.mp4", "subfolder": "", "type": "output"}]},
+            "13": {"text": ["not media"]},
+        }
+    }
+
+    assert mobile_pregenerate.output_files(entry) == [
+        {"filename": "a.png", "subfolder": "sub", "source": "output"},
+        {"filename": "clip.mp4", "subfolder": "", "source": "output"},
+    ]
+
+
+def test_schedule_entry_is_a_no_op_when_disabled(monkeypatch):
+    monkeypatch.setattr(mobile_pregenerate, "is_enabled", lambda: False)
+    entry = {"outputs": {"9": {"images": [{"filename": "a.png", "type": "output"}]}}}
+
+    assert mobile_pregenerate.schedule_entry(entry) == 0
+    assert mobile_pregenerate._queue.empty()
+
+
+def test_render_file_fills_thumbnail_and_recent_preview_caches(tmp_path: Path, caches):
+    source = tmp_path / "out.png"
+    Image.new("RGB", (3000, 2000), (1, 2, 3)).save(source)
+    mobile_image_preview.note_requested_edge(1170)
+    mobile_image_preview.note_requested_edge(2048)
+    mobile_image_preview.note_requested_edge(1170)
+
+    mobile_pregenerate.render_file(str(source))
+
+    assert mobile_image_thumbs.get_cached(str(source)) is not None
+    assert mobile_image_preview.recent_max_edges() == [1170, 2048]
+    for edge in (1170, 2048):
+        assert mobile_image_preview.get_cached(str(source), edge) is not None
+
+
+def test_recent_max_edges_defaults_before_any_request(caches):
+    assert mobile_image_preview.recent_max_edges() == [mobile_image_preview.DEFAULT_MAX_EDGE]
+
+
+def test_render_file_covers_recently_negotiated_formats(tmp_path: Path, caches, monkeypatch):
+    monkeypatch.setattr(mobile_image_thumbs, "_recent_formats", [])
+    source = tmp_path / "out.png"
+    Image.new("RGB", (800, 600), (1, 2, 3)).save(source)
+    mobile_image_thumbs.note_requested_format("webp")
+    mobile_image_thumbs.note_requested_format(None)
+
+    mobile_pregenerate.render_file(str(source))
+
+    assert mobile_image_thumbs.get_cached(str(source)) is not None
+    assert mobile_image_thumbs.get_cached(str(source), 300, "webp") is not None
+
+
+def test_prepare_video_waits_for_the_playback_job(tmp_path: Path, monkeypatch):
+    import concurrent.futures
+
+    import mobile_video_playback
+
+    future = concurrent.futures.Future()
+    future.set_result(mobile_video_playback.PlayableVideo("/cache/x.mp4", "transcode"))
+    job = type("Job", (), {"future": future})()
+    requests = []
+    monkeypatch.setattr(
+        mobile_video_playback,
+        "request_playable",
+        lambda path, profile=None: requests.append(profile) or (None, job),
+    )
+
+    assert mobile_pregenerate.prepare_video(str(tmp_path / "clip.webm")) == "transcode"
+    # A pre-transcode must not take every core from a prompt queued meanwhile.
+    assert requests == ["background"]
+
+
+def test_video_preparation_holds_off_while_comfy_is_busy(tmp_path: Path, monkeypatch):
+    source = tmp_path / "clip.webm"
+    source.write_bytes(b"webm")
+    busy = iter([True, True, False])
+    checks = []
+    prepared = []
+
+    def comfy_is_busy():
+        checks.append(1)
+        return next(busy)
+
+    monkeypatch.setattr(mobile_pregenerate, "comfy_is_busy", comfy_is_busy)
+    monkeypatch.setattr(mobile_pregenerate, "_IDLE_POLL_SECONDS", 0)
+    monkeypatch.setattr(mobile_pregenerate, "prepare_video", prepared.append)
+    monkeypatch.setattr(mobile_pregenerate, "is_enabled", lambda: False)
+    monkeypatch.setattr(mobile_pregenerate, "videos_enabled", lambda: True)
+    monkeypatch.setattr(mobile_pregenerate, "_resolve", lambda item: str(source))
+    entry = {"outputs": {"9": {"gifs": [{"filename": "clip.webm", "type": "output"}]}}}
+
+    assert mobile_pregenerate.schedule_entry(entry) == 1
+    mobile_pregenerate._video_queue.join()
+
+    assert prepared == [str(source)]
+    assert len(checks) == 3
+    assert mobile_pregenerate._queue.empty()
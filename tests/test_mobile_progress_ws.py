@@ -45,13 +45,17 @@ _install_comfy_stub()
 
 import mobile_progress_ws as m  # noqa: E402
 
+_real_video_jobs = m._video_jobs
+
 
 @pytest.fixture(autouse=True)
-def _isolate():
+def _isolate(monkeypatch):
     global _registry
     _registry = _Registry()
     sys.modules["comfy_execution.progress"].get_progress_state = lambda: _registry
     m._clients.clear()
+    # Other modules' tests leave video jobs behind in mobile_video_playback.
+    monkeypatch.setattr(m, "_video_jobs", dict)
     yield
     m._clients.clear()
 
@@ -262,6 +266,41 @@ def test_watch_loop_survives_a_snapshot_failure(monkeypatch):
     assert client.payloads == [{"prompt_id": "p1", "value": 2, "max": 10}]
 
 
+def test_watch_loop_pushes_video_job_changes(monkeypatch):
+    """A client holding a 202 from /api/video/playable learns when its
+    preparation is done from here instead of polling the job endpoint."""
+    monkeypatch.setattr(m, "_TICK_SECONDS", 0.01)
+    client = FakeWS()
+    m._clients.add(client)
+    jobs = {}
+    monkeypatch.setattr(m, "_video_jobs", lambda: dict(jobs))
+
+    async def main():
+        task = asyncio.ensure_future(m._watch_loop())
+        for state, progress in (("running", 0.5), ("running", 0.5), ("done", 1.0)):
+            jobs["j1"] = {"jobId": "j1", "state": state, "progress": progress}
+            await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(main())
+    video = [p for p in client.payloads if p.get("type") == "video_job"]
+    assert [(p["state"], p["progress"]) for p in video] == [("running", 0.5), ("done", 1.0)]
+
+
+def test_video_jobs_reports_the_playback_job_registry(monkeypatch):
+    import mobile_video_playback
+
+    monkeypatch.setattr(
+        mobile_video_playback, "job_statuses", lambda: [{"jobId": "j1", "state": "queued"}]
+    )
+    monkeypatch.setattr(m, "_video_jobs", _real_video_jobs)
+    assert m._video_jobs() == {"j1": {"jobId": "j1", "state": "queued"}}
+
+
 # --- connection lifecycle -------------------------------------------------
 
 def test_connecting_mid_run_gets_the_current_state_immediately(monkeypatch):
@@ -0,0 +1,87 @@
+import io
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+import mobile_image_preview
+import mobile_image_thumbs
+import mobile_render_pool
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(mobile_render_pool, "is_enabled", lambda: True)
+    yield mobile_render_pool
+    mobile_render_pool.shutdown()
+
+
+def test_run_calls_in_process_when_disabled(monkeypatch):
+    monkeypatch.setattr(mobile_render_pool, "is_enabled", lambda: False)
+    monkeypatch.setattr(mobile_render_pool, "_Worker", None)
+
+    assert mobile_render_pool.run("os.path", "join", "a", "b") == "a/b"
+
+
+def test_worker_renders_thumbnails_and_is_reused(tmp_path: Path, pool):
+    source = tmp_path / "image.png"
+    Image.new("RGB", (1200, 800), (10, 20, 30)).save(source)
+
+    levels = pool.run("mobile_image_thumbs", "render_levels", str(source), [150, 300], None)
+    worker = pool._idle[-1]
+    pool.run("mobile_image_thumbs", "render_levels", str(source), [150], "webp")
+
+    assert sorted(levels) == [150, 300]
+    with Image.open(io.BytesIO(levels[300][0])) as thumb:
+        assert thumb.size == (300, 200)
+    assert pool._idle == [worker]
+
+
+def test_worker_reports_errors_and_keeps_serving(tmp_path: Path, pool):
+    with pytest.raises(pool.RenderError, match="FileNotFoundError"):
+        pool.run("mobile_image_thumbs", "render_levels", str(tmp_path / "missing.png"), [150], None)
+    with pytest.raises(pool.RenderError, match="not a render function"):
+        pool.run("os", "remove", str(tmp_path / "anything"))
+
+    assert len(pool._idle) == 1 and pool._idle[0].alive()
+
+
+def test_dead_worker_is_replaced(tmp_path: Path, pool):
+    source = tmp_path / "image.png"
+    Image.new("RGB", (400, 400)).save(source)
+    pool.run("mobile_image_thumbs", "render_levels", str(source), [150], None)
+    crashed = pool._idle[-1]
+    crashed.process.kill()
+    crashed.process.wait()
+
+    pool.run("mobile_image_thumbs", "render_levels", str(source), [150], None)
+
+    assert pool._idle[-1] is not crashed and pool._idle[-1].alive()
+
+
+def test_crash_mid_job_raises_without_rendering_in_process(pool, monkeypatch):
+    worker = pool._Worker()
+    monkeypatch.setattr(pool, "_checkout", lambda: worker)
+    # Stands in for a decoder segfault: the child exits before replying.
+    worker.process.stdin.close()
+
+    with pytest.raises(pool.RenderWorkerCrashed):
+        pool.run("mobile_image_thumbs", "render_levels", "/nonexistent.png", [150], None)
+    assert not worker.alive()
+
+
+def test_preview_pyramid_through_workers_fills_both_caches(tmp_path: Path, pool, monkeypatch):
+    thumbs = tmp_path / "thumbs"
+    previews = tmp_path / "previews"
+    thumbs.mkdir()
+    previews.mkdir()
+    monkeypatch.setattr(mobile_image_thumbs, "_cache_dir", lambda: str(thumbs))
+    monkeypatch.setattr(mobile_image_preview, "_cache_dir", lambda: str(previews))
+    source = tmp_path / "image.png"
+    Image.new("RGB", (3000, 2000), (1, 2, 3)).save(source)
+
+    mobile_image_preview.get_or_render_all(str(source), [1024])
+
+    assert mobile_image_preview.get_cached(str(source), 1024) is not None
+    for edge in mobile_image_thumbs.THUMBNAIL_EDGES:
+        assert mobile_image_thumbs.get_cached(str(source), edge) is not None
@@ -1,6 +1,8 @@
 import concurrent.futures
+import json
 import os
 import struct
+import threading
 import time
 
 import pytest
@@ -29,6 +31,19 @@ def _write_mp4(path, *, faststart):
     path.write_bytes(ftyp + (moov + mdat if faststart else mdat + moov))
 
 
+@pytest.fixture(autouse=True)
+def isolated_verdicts(tmp_path, monkeypatch):
+    path = tmp_path / 'video_verdicts.json'
+    monkeypatch.setattr(playback, '_verdicts_path', lambda: str(path))
+    monkeypatch.setattr(playback, '_verdicts_loaded', False)
+    yield path
+    playback.shutdown_workers()
+    with playback._originals_lock:
+        if playback._verdicts_save_timer is not None:
+            playback._verdicts_save_timer.cancel()
+            playback._verdicts_save_timer = None
+
+
 @pytest.fixture
 def isolated_cache(tmp_path, monkeypatch):
     cache = tmp_path / 'cache'
@@ -40,6 +55,10 @@ def isolated_cache(tmp_path, monkeypatch):
     # get_or_prepare short-circuits to serving the file unprepared. The real
     # worker has its own end-to-end tests below, on genuinely encoded files.
     monkeypatch.setattr(playback, 'pyav_module', lambda: object())
+    monkeypatch.setattr(playback, '_short_edges', {})
+    monkeypatch.setattr(playback, '_index', None)
+    monkeypatch.setattr(playback, '_index_heap', [])
+    monkeypatch.setattr(playback, '_index_bytes', 0)
     playback._known_originals.clear()
     return cache
 
@@ -52,7 +71,10 @@ def _install_fake_worker(monkeypatch, calls, *, delay=0):
     caching, locking, mode files — against synthetic MP4 boxes no real decoder
     would accept, so the child itself is stubbed here.
     """
-    def fake_run(mode, file_path, output_path):
+    def fake_run(
+        mode, file_path, output_path, on_progress=None, max_short_edge=None, profile=None,
+        live_dir=None,
+    ):
         calls.append((mode, file_path, output_path))
         if delay:
             time.sleep(delay)
@@ -144,7 +166,10 @@ def test_falls_back_to_transcode_when_stream_copy_fails(
     monkeypatch.setattr(playback, '_probe_media', lambda _path: COMPATIBLE_STREAMS)
     commands = []
 
-    def fake_run(mode, file_path, output_path):
+    def fake_run(
+        mode, file_path, output_path, on_progress=None, max_short_edge=None, profile=None,
+        live_dir=None,
+    ):
         commands.append((mode, file_path, output_path))
         if len(commands) == 1:
             raise playback.PlaybackPreparationError('copy rejected')
@@ -158,6 +183,90 @@ def test_falls_back_to_transcode_when_stream_copy_fails(
     assert [call[0] for call in commands] == ['remux', 'transcode']
 
 
+def test_scaled_size_caps_the_short_edge_and_keeps_dimensions_even():
+    assert playback._scaled_size(3840, 2160, 720) == (1280, 720)
+    assert playback._scaled_size(832, 1216, 720) == (720, 1052)
+    assert playback._scaled_size(641, 361, None) == (640, 360)
+    assert playback._scaled_size(640, 360, 720) == (640, 360)
+
+
+def test_normalize_rendition():
+    assert playback.normalize_rendition(' 720P ') == '720p'
+    assert playback.normalize_rendition('source') is None
+    assert playback.normalize_rendition('4k') is None
+    assert playback.normalize_rendition(None) is None
+
+
+def test_rendition_is_a_separate_downscaled_transcode(
+    tmp_path, isolated_cache, monkeypatch
+):
+    source = tmp_path / 'late.mp4'
+    _write_mp4(source, faststart=False)
+    streams = [{**COMPATIBLE_STREAMS[0], 'width': 3840, 'height': 2160}, COMPATIBLE_STREAMS[1]]
+    monkeypatch.setattr(playback, '_probe_media', lambda _path: streams)
+    commands = []
+
+    def fake_run(
+        mode, file_path, output_path, on_progress=None, max_short_edge=None, profile=None,
+        live_dir=None,
+    ):
+        commands.append((mode, max_short_edge))
+        _write_mp4(os_path(output_path), faststart=True)
+
+    monkeypatch.setattr(playback, '_run_worker', fake_run)
+
+    full = playback.get_or_prepare(str(source))
+    small = playback.get_or_prepare(str(source), rendition='480p')
+    again = playback.get_or_prepare(str(source), rendition='480p')
+
+    assert commands == [('remux', None), ('transcode', 480)]
+    assert full.path != small.path
+    assert (small.mode, small.rendition) == ('transcode', '480p')
+    assert again == small
+
+
+def test_background_job_transcodes_with_the_requested_profile(
+    tmp_path, isolated_cache, monkeypatch
+):
+    source = tmp_path / 'clip.webm'
+    source.write_bytes(b'webm source')
+    monkeypatch.setattr(playback, '_probe_media', lambda _path: INCOMPATIBLE_STREAMS)
+    profiles = []
+
+    def fake_run(
+        mode, file_path, output_path, on_progress=None, max_short_edge=None, profile=None,
+        live_dir=None,
+    ):
+        profiles.append(profile)
+        _write_mp4(os_path(output_path), faststart=True)
+
+    monkeypatch.setattr(playback, '_run_worker', fake_run)
+
+    _ready, job = playback.request_playable(str(source), profile='background')
+
+    assert job.future.result(timeout=5).mode == 'transcode'
+    assert profiles == ['background']
+
+
+def test_rendition_larger_than_the_source_serves_the_source(
+    tmp_path, isolated_cache, monkeypatch
+):
+    source = tmp_path / 'ready.mp4'
+    _write_mp4(source, faststart=True)
+    streams = [{**COMPATIBLE_STREAMS[0], 'width': 832, 'height': 480}, COMPATIBLE_STREAMS[1]]
+    monkeypatch.setattr(playback, '_probe_media', lambda _path: streams)
+    monkeypatch.setattr(
+        playback,
+        '_run_worker',
+        lambda *_args: pytest.fail('a source no larger than the rendition is not re-encoded'),
+    )
+
+    playable, job = playback.request_playable(str(source), rendition='720p')
+
+    assert job is None
+    assert playable == playback.PlayableVideo(str(source), 'original')
+
+
 def test_concurrent_cache_misses_start_only_one_worker_process(
     tmp_path, isolated_cache, monkeypatch
 ):
@@ -178,6 +287,333 @@ def test_concurrent_cache_misses_start_only_one_worker_process(
     assert {result.mode for result in results} == {'remux'}
 
 
+def test_background_job_is_shared_and_reports_progress(
+    tmp_path, isolated_cache, monkeypatch
+):
+    source = tmp_path / 'late.mp4'
+    _write_mp4(source, faststart=False)
+    monkeypatch.setattr(playback, '_probe_media', lambda _path: COMPATIBLE_STREAMS)
+    release = threading.Event()
+    seen = []
+
+    def fake_run(
+        mode, file_path, output_path, on_progress=None, max_short_edge=None, profile=None,
+        live_dir=None,
+    ):
+        on_progress(0.5)
+        release.wait(5)
+        _write_mp4(os_path(output_path), faststart=True)
+
+    monkeypatch.setattr(playback, '_run_worker', fake_run)
+
+    ready, job = playback.request_playable(str(source))
+    again, same_job = playback.request_playable(str(source))
+    while job.progress < 0.5:
+        time.sleep(0.01)
+    seen.append(job.status())
+    release.set()
+    result = job.future.result(timeout=5)
+
+    assert ready is None and again is None
+    assert same_job is job
+    assert seen == [{
+        'jobId': job.id, 'state': 'running', 'progress': 0.5, 'mode': None,
+        'rendition': None, 'live': False,
+    }]
+    assert job.status() == {
+        'jobId': job.id, 'state': 'done', 'progress': 1.0, 'mode': 'remux',
+        'rendition': None, 'live': False,
+    }
+    assert playback.get_job(job.id) is job
+    assert playback.request_playable(str(source)) == (result, None)
+    assert result.mode == 'remux'
+
+
+@pytest.fixture
+def live_root(tmp_path, monkeypatch):
+    root = tmp_path / 'live'
+    monkeypatch.setattr(playback, '_live_dir', lambda job_id: str(root / job_id))
+    return root
+
+
+def _blocking_worker(monkeypatch, release, calls):
+    def fake_run(
+        mode, file_path, output_path, on_progress=None, max_short_edge=None, profile=None,
+        live_dir=None,
+    ):
+        calls.append((mode, live_dir))
+        release.wait(5)
+        _write_mp4(os_path(output_path), faststart=True)
+
+    monkeypatch.setattr(playback, '_run_worker', fake_run)
+
+
+def test_live_output_only_for_a_transcode_a_viewer_asked_for(
+    tmp_path, isolated_cache, live_root, monkeypatch
+):
+    webm = tmp_path / 'clip.webm'
+    webm.write_bytes(b'webm source')
+    late = tmp_path / 'late.mp4'
+    _write_mp4(late, faststart=False)
+    streams = {str(webm): INCOMPATIBLE_STREAMS, str(late): COMPATIBLE_STREAMS}
+    monkeypatch.setattr(playback, '_probe_media', lambda path: streams[path])
+    release = threading.Event()
+    calls = []
+    _blocking_worker(monkeypatch, release, calls)
+
+    _ready, job = playback.request_playable(str(webm), live=True)
+    _ready, remux_job = playback.request_playable(str(late), live=True)
+    release.set()
+    job.future.result(timeout=5)
+    remux_job.future.result(timeout=5)
+
+    assert job.live_dir == str(live_root / job.id)
+    assert job.status()['live'] is True
+    # A remux is quick enough to wait for.
+    assert remux_job.live_dir is None
+    assert sorted(calls) == [('remux', None), ('transcode', job.live_dir)]
+
+
+def test_a_running_plain_job_does_not_switch_to_live(
+    tmp_path, isolated_cache, live_root, monkeypatch
+):
+    source = tmp_path / 'clip.webm'
+    source.write_bytes(b'webm source')
+    monkeypatch.setattr(playback, '_probe_media', lambda _path: INCOMPATIBLE_STREAMS)
+    release = threading.Event()
+    calls = []
+    _blocking_worker(monkeypatch, release, calls)
+
+    _ready, job = playback.request_playable(str(source))
+    while not calls:
+        time.sleep(0.01)
+    _ready, same_job = playback.request_playable(str(source), live=True)
+    release.set()
+    job.future.result(timeout=5)
+
+    assert same_job is job
+    assert job.live_dir is None
+    assert calls == [('transcode', None)]
+
+
+def test_a_queued_job_switches_to_live(tmp_path, isolated_cache, live_root, monkeypatch):
+    source = tmp_path / 'clip.webm'
+    source.write_bytes(b'webm source')
+    monkeypatch.setattr(playback, '_probe_media', lambda _path: INCOMPATIBLE_STREAMS)
+    release = threading.Event()
+    calls = []
+    _blocking_worker(monkeypatch, release, calls)
+    # One pool slot, held by a blocker, keeps the job queued.
+    executor = concurrent.futures.ThreadPoolExecutor(1)
+    monkeypatch.setattr(playback, '_job_executor', executor)
+    executor.submit(release.wait, 5)
+
+    _ready, job = playback.request_playable(str(source))
+    _ready, same_job = playback.request_playable(str(source), live=True)
+    queued = job.state
+    release.set()
+    job.future.result(timeout=5)
+    executor.shutdown()
+
+    assert same_job is job and queued == 'queued'
+    assert job.live_dir == str(live_root / job.id)
+    assert calls == [('transcode', job.live_dir)]
+
+
+def test_live_playlist_starts_at_the_beginning_and_names_files_locally(tmp_path):
+    job = playback.PreparationJob('clip.webm', 'identity', 'cache.mp4', None)
+    assert playback.live_playlist(job) is None
+    job.live_dir = str(tmp_path)
+    assert playback.live_playlist(job) is None  # not written yet
+    (tmp_path / 'index.m3u8').write_text(
+        '#EXTM3U\n'
+        '#EXT-X-VERSION:7\n'
+        '#EXT-X-PLAYLIST-TYPE:EVENT\n'
+        '#EXT-X-MAP:URI="{0}/init.mp4"\n'
+        '#EXTINF:2.000000,\n'
+        '{0}/seg00000.m4s\n'.format(tmp_path)
+    )
+    (tmp_path / 'init.mp4').write_bytes(b'init')
+    (tmp_path / 'seg00000.m4s').write_bytes(b'segment')
+
+    assert playback.live_playlist(job) == (
+        '#EXTM3U\n'
+        '#EXT-X-START:TIME-OFFSET=0\n'
+        '#EXT-X-VERSION:7\n'
+        '#EXT-X-PLAYLIST-TYPE:EVENT\n'
+        '#EXT-X-MAP:URI="init.mp4"\n'
+        '#EXTINF:2.000000,\n'
+        'seg00000.m4s\n'
+    )
+    assert playback.live_file(job, 'seg00000.m4s') == str(tmp_path / 'seg00000.m4s')
+    assert playback.live_file(job, 'init.mp4') == str(tmp_path / 'init.mp4')
+    assert playback.live_file(job, 'seg00001.m4s') is None
+    assert playback.live_file(job, 'index.m3u8') is None
+    assert playback.live_file(job, '../init.mp4') is None
+
+    # Finished without a transcode: the partial output is not worth playing.
+    job.finished_at, job.mode = time.time(), 'unprepared'
+    assert playback.live_playlist(job) is None
+
+
+def test_live_segments_join_in_playlist_order(tmp_path):
+    (tmp_path / 'index.m3u8').write_text(
+        '#EXTM3U\n#EXT-X-MAP:URI="init.mp4"\n'
+        '#EXTINF:2,\nseg00000.m4s\n#EXTINF:2,\nseg00001.m4s\n#EXT-X-ENDLIST\n'
+    )
+    (tmp_path / 'init.mp4').write_bytes(b'[init]')
+    (tmp_path / 'seg00000.m4s').write_bytes(b'[0]')
+    (tmp_path / 'seg00001.m4s').write_bytes(b'[1]')
+    joined = tmp_path / 'joined.mp4'
+
+    playback._join_live_segments(str(tmp_path), str(joined))
+
+    assert joined.read_bytes() == b'[init][0][1]'
+
+
+def test_forgotten_jobs_take_their_live_output_with_them(tmp_path, monkeypatch):
+    live_dir = tmp_path / 'live' / 'job'
+    live_dir.mkdir(parents=True)
+    (live_dir / 'seg00000.m4s').write_bytes(b'segment')
+    job = playback.PreparationJob('clip.webm', 'identity', 'cache.mp4', None)
+    job.live_dir = str(live_dir)
+    job.finished_at = time.time() - playback._JOB_RETENTION_SECONDS - 1
+    monkeypatch.setattr(playback, '_jobs', {job.id: job})
+
+    with playback._jobs_lock:
+        playback._forget_finished_jobs_locked()
+
+    assert playback._jobs == {}
+    assert not live_dir.exists()
+
+
+def test_ready_originals_are_served_without_a_job(tmp_path, isolated_cache, monkeypatch):
+    source = tmp_path / 'ready.mp4'
+    _write_mp4(source, faststart=True)
+    monkeypatch.setattr(playback, '_probe_media', lambda _path: COMPATIBLE_STREAMS)
+    monkeypatch.setattr(
+        playback, '_run_worker', lambda *_args: pytest.fail('nothing should be prepared'),
+    )
+
+    playable, job = playback.request_playable(str(source))
+
+    assert job is None
+    assert playable == playback.PlayableVideo(str(source), 'original')
+
+
+def test_verdicts_survive_a_restart_without_reprobing(
+    tmp_path, isolated_cache, isolated_verdicts, monkeypatch
+):
+    ready = tmp_path / 'ready.mp4'
+    _write_mp4(ready, faststart=True)
+    broken = tmp_path / 'broken.webm'
+    broken.write_bytes(b'webm source')
+    monkeypatch.setattr(
+        playback, '_probe_media',
+        lambda path: COMPATIBLE_STREAMS if path.endswith('.mp4') else INCOMPATIBLE_STREAMS,
+    )
+
+    def unavailable(
+        mode, file_path, output_path, on_progress=None, max_short_edge=None, profile=None,
+        live_dir=None,
+    ):
+        raise playback.PreparationUnavailable('no H.264 encoder')
+
+    monkeypatch.setattr(playback, '_run_worker', unavailable)
+    assert playback.get_or_prepare(str(ready)).mode == 'original'
+    assert playback.get_or_prepare(str(broken)).mode == 'unprepared'
+    playback._save_verdicts()
+
+    # A restart: empty memory, nothing loaded yet, and any probe or worker
+    # would be a regression.
+    playback._known_originals.clear()
+    monkeypatch.setattr(playback, '_verdicts_loaded', False)
+    monkeypatch.setattr(playback, '_probe_media', lambda _path: pytest.fail('re-probed'))
+    monkeypatch.setattr(playback, '_run_worker', lambda *_args: pytest.fail('re-prepared'))
+
+    assert playback.get_or_prepare(str(ready)) == playback.PlayableVideo(str(ready), 'original')
+    assert playback.get_or_prepare(str(broken)).mode == 'unprepared'
+    verdict = playback.known_verdict(playback._source_identity(str(broken)))
+    assert verdict['reason'] == 'no H.264 encoder'
+    assert verdict['streams'] == INCOMPATIBLE_STREAMS
+
+
+@pytest.mark.parametrize('failure', [
+    playback.PreparationTimeout('preparing the video timed out'),
+    playback.PlaybackPreparationError('video worker was killed by signal 9'),
+])
+def test_transient_failures_are_retried_after_a_restart(
+    tmp_path, isolated_cache, isolated_verdicts, monkeypatch, failure
+):
+    source = tmp_path / 'clip.webm'
+    source.write_bytes(b'webm source')
+    monkeypatch.setattr(playback, '_probe_media', lambda _path: INCOMPATIBLE_STREAMS)
+    attempts = []
+
+    def failing_worker(
+        mode, file_path, output_path, on_progress=None, max_short_edge=None, profile=None,
+        live_dir=None,
+    ):
+        attempts.append(mode)
+        raise failure
+
+    monkeypatch.setattr(playback, '_run_worker', failing_worker)
+    assert playback.get_or_prepare(str(source)).mode == 'unprepared'
+    # Within this process the verdict still spares every byte range a retry.
+    assert playback.get_or_prepare(str(source)).mode == 'unprepared'
+    assert attempts == ['transcode']
+    playback._save_verdicts()
+
+    playback._known_originals.clear()
+    monkeypatch.setattr(playback, '_verdicts_loaded', False)
+    commands = []
+    _install_fake_worker(monkeypatch, commands)
+
+    assert playback.get_or_prepare(str(source)).mode == 'transcode'
+    assert len(commands) == 1
+
+
+def test_unprepared_verdicts_are_retried_after_a_pyav_change(
+    tmp_path, isolated_cache, isolated_verdicts, monkeypatch
+):
+    ready = tmp_path / 'ready.mp4'
+    _write_mp4(ready, faststart=True)
+    broken = tmp_path / 'broken.webm'
+    broken.write_bytes(b'webm source')
+    ready_id = playback._source_identity(str(ready))
+    broken_id = playback._source_identity(str(broken))
+    isolated_verdicts.write_text(json.dumps({
+        'version': playback._VERDICTS_VERSION,
+        'pyav': '11.0.0',
+        'entries': {
+            ready_id: {'mode': 'original', 'streams': None, 'reason': None, 'at': 1},
+            broken_id: {'mode': 'unprepared', 'streams': None, 'reason': 'no H.264 encoder', 'at': 1},
+            'garbage': {'mode': 'cached'},
+        },
+    }))
+
+    assert playback._known_original_mode(ready_id) == 'original'
+    assert playback._known_original_mode(broken_id) is None
+    assert playback.known_verdict('garbage') is None
+
+
+def test_unprepared_verdicts_from_version_1_files_are_retried(
+    tmp_path, isolated_cache, isolated_verdicts, monkeypatch
+):
+    # Version 1 saved every failure, transient ones included.
+    isolated_verdicts.write_text(json.dumps({
+        'version': 1,
+        'pyav': playback._pyav_version(),
+        'entries': {
+            'ready': {'mode': 'original', 'streams': None, 'reason': None, 'at': 1},
+            'broken': {'mode': 'unprepared', 'streams': None, 'reason': 'timed out', 'at': 1},
+        },
+    }))
+
+    assert playback._known_original_mode('ready') == 'original'
+    assert playback._known_original_mode('broken') is None
+
+
 def test_cache_key_changes_when_source_changes(tmp_path, isolated_cache, monkeypatch):
     source = tmp_path / 'late.mp4'
     _write_mp4(source, faststart=False)
@@ -332,6 +768,175 @@ def test_worker_crash_does_not_take_down_the_caller(tmp_path, monkeypatch):
         playback._run_worker('remux', 'in.mp4', 'out.mp4')
 
 
+# Speaks the warm worker's protocol: a JSON job per stdin line, answered by
+# progress lines and a result line.
+_PROTOCOL_WORKER = """import json, os, sys
+for line in sys.stdin:
+    job = json.loads(line)
+    if job['source'] == 'bad.webm':
+        print('result 1 ValueError: invalid data', flush=True)
+        continue
+    print('progress 0.250', flush=True)
+    print('unrelated output', flush=True)
+    print('progress 1.000', flush=True)
+    print('result 0 {}'.format(os.getpid()), flush=True)
+"""
+
+
+def test_worker_progress_lines_reach_the_callback(tmp_path, monkeypatch):
+    monkeypatch.setattr(playback, '_WORKER_PATH', _worker_script(tmp_path, _PROTOCOL_WORKER))
+    reported = []
+
+    playback._run_worker('remux', 'in.mp4', 'out.mp4', reported.append)
+
+    assert reported == [0.25, 1.0]
+
+
+def test_warm_worker_serves_consecutive_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(playback, '_WORKER_PATH', _worker_script(tmp_path, _PROTOCOL_WORKER))
+
+    playback._run_worker('remux', 'a.mp4', 'a-out.mp4')
+    first = playback._idle_workers[-1]
+    with pytest.raises(playback.PlaybackPreparationError, match='invalid data'):
+        playback._run_worker('transcode', 'bad.webm', 'b-out.mp4')
+    playback._run_worker('remux', 'c.mp4', 'c-out.mp4')
+
+    # One process for all three: a failed job is an answer, not a crash.
+    assert playback._idle_workers == [first]
+    assert first.jobs == 3 and first.alive()
+
+
+def test_real_worker_answers_over_the_pipe_and_stays_warm(tmp_path):
+    # Without PyAV the answer is "unavailable", with it a decode failure;
+    # either way it is an answer from a worker that is still alive.
+    with pytest.raises((playback.PlaybackPreparationError, playback.PreparationUnavailable)):
+        playback._run_worker('remux', str(tmp_path / 'missing.mp4'), str(tmp_path / 'out.mp4'))
+
+    assert len(playback._idle_workers) == 1
+    assert playback._idle_workers[0].alive()
+
+
+def test_warm_worker_is_recycled_after_max_jobs(tmp_path, monkeypatch):
+    monkeypatch.setattr(playback, '_WORKER_PATH', _worker_script(tmp_path, _PROTOCOL_WORKER))
+    monkeypatch.setattr(playback, '_WORKER_MAX_JOBS', 2)
+
+    playback._run_worker('remux', 'a.mp4', 'a-out.mp4')
+    first = playback._idle_workers[-1]
+    playback._run_worker('remux', 'b.mp4', 'b-out.mp4')
+
+    assert playback._idle_workers == []
+    assert not first.alive()
+
+
+def test_background_jobs_get_their_own_lower_priority_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr(playback, '_WORKER_PATH', _worker_script(tmp_path, _PROTOCOL_WORKER))
+
+    playback._run_worker('transcode', 'a.webm', 'a-out.mp4', profile='background')
+    niced = playback._idle_workers[-1]
+    playback._run_worker('transcode', 'b.webm', 'b-out.mp4', profile='balanced')
+
+    # The niced worker can't raise its priority back, so a normal job must not
+    # inherit it; it stays warm for the next background job instead.
+    assert niced.nice == 10
+    assert len(playback._idle_workers) == 2 and playback._idle_workers[0] is niced
+    assert playback._idle_workers[1].nice == 0
+
+
+def test_worker_lowers_its_priority_but_never_raises_it(monkeypatch):
+    import mobile_video_worker
+
+    calls = []
+    state = {'nice': 0}
+
+    def fake_nice(increment):
+        calls.append(increment)
+        state['nice'] += increment
+        return state['nice']
+
+    monkeypatch.setattr(mobile_video_worker.os, 'nice', fake_nice, raising=False)
+
+    mobile_video_worker._lower_priority(10)
+    mobile_video_worker._lower_priority(0)
+    mobile_video_worker._lower_priority(5)
+
+    assert state['nice'] == 10
+    assert [increment for increment in calls if increment] == [10]
+
+
+def test_worker_jobs_carry_the_selected_encoder_profile(tmp_path, monkeypatch):
+    monkeypatch.setattr(playback, '_WORKER_PATH', _worker_script(tmp_path, (
+        "import json, sys\n"
+        "for line in sys.stdin:\n"
+        "    job = json.loads(line)\n"
+        "    print('result 0 {} {}'.format(job['profile'], job['maxShortEdge']), flush=True)\n"
+    )))
+    worker = playback._VideoWorker()
+    try:
+        result, timed_out = worker.run('transcode', 'in.mp4', 'out.mp4', None, 720, 'quality')
+    finally:
+        worker.stop()
+
+    assert (result, timed_out) == ((0, 'quality 720'), False)
+
+
+def test_worker_jobs_carry_the_live_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(playback, '_WORKER_PATH', _worker_script(tmp_path, (
+        "import json, sys\n"
+        "for line in sys.stdin:\n"
+        "    print('result 0 {}'.format(json.loads(line)['liveDir']), flush=True)\n"
+    )))
+    worker = playback._VideoWorker()
+    try:
+        result, _timed_out = worker.run(
+            'transcode', 'in.mp4', 'out.mp4', None, None, 'fast', str(tmp_path / 'live'),
+        )
+    finally:
+        worker.stop()
+
+    assert result == (0, str(tmp_path / 'live'))
+
+
+def test_encoder_profile_falls_back_to_the_default(monkeypatch):
+    class Prefs:
+        value = 'quality'
+
+        def get_prefs(self):
+            return {'videoEncoderProfile': self.value}
+
+    prefs = Prefs()
+    monkeypatch.setattr(playback, '_mobile_app_prefs', prefs)
+    assert playback.encoder_profile() == 'quality'
+
+    prefs.value = 'ultra'
+    assert playback.encoder_profile() == playback.DEFAULT_ENCODER_PROFILE
+    # Users who never pick a profile keep libx264's defaults, as before profiles.
+    assert playback.ENCODER_PROFILES[playback.DEFAULT_ENCODER_PROFILE] == {
+        'preset': 'medium', 'crf': 23, 'threads': 0, 'max_bitrate': None, 'nice': 0,
+    }
+
+
+def test_encoder_profile_options_by_encoder():
+    class Context:
+        bit_rate = 0
+
+    class Stream:
+        def __init__(self):
+            self.codec_context = Context()
+
+    x264 = Stream()
+    playback._apply_encoder_profile(x264, 'libx264', playback.ENCODER_PROFILES['fast'])
+    openh264 = Stream()
+    playback._apply_encoder_profile(openh264, 'libopenh264', playback.ENCODER_PROFILES['background'])
+
+    assert x264.codec_context.options == {
+        'preset': 'veryfast', 'crf': '26', 'maxrate': '8000000', 'bufsize': '16000000',
+    }
+    assert x264.codec_context.thread_count == 0 and x264.codec_context.bit_rate == 0
+    assert 'preset' not in openh264.codec_context.options
+    assert openh264.codec_context.thread_count == 2
+    assert openh264.codec_context.bit_rate == 8_000_000
+
+
 def test_worker_reports_unavailable_distinctly(tmp_path, monkeypatch):
     monkeypatch.setattr(
         playback, '_WORKER_PATH',
@@ -444,6 +1049,26 @@ def test_pyav_transcodes_an_incompatible_pixel_format(tmp_path, pyav_cache):
     assert playback._is_faststart_mp4(result.path)
 
 
+@requires_pyav
+def test_pyav_live_transcode_writes_hls_then_a_faststart_copy(tmp_path):
+    source = tmp_path / 'odd.mp4'
+    _encode(source, faststart=True, pix_fmt='yuv444p', frames=60)
+    live_dir = tmp_path / 'live'
+    live_dir.mkdir()
+    output = tmp_path / 'out.part.mp4'
+    encoder = playback.pyav_h264_encoder(av)
+
+    playback.pyav_transcode(av, encoder, str(source), str(output), live_dir=str(live_dir))
+
+    playlist = (live_dir / 'index.m3u8').read_text()
+    assert '#EXT-X-ENDLIST' in playlist
+    assert (live_dir / 'init.mp4').exists()
+    assert len(playback._live_segment_names(playlist)) >= 2
+    assert playback._is_faststart_mp4(str(output))
+    assert playback._probe_media(str(output))[0]['pix_fmt'] == 'yuv420p'
+    assert not (tmp_path / 'out.part.joined.mp4').exists()
+
+
 @requires_pyav
 def test_preparation_needs_only_pyav(monkeypatch):
     # No external binary is consulted at all — PyAV alone decides.
@@ -467,11 +1092,12 @@ def test_cache_hit_marks_the_file_recently_used_without_touching_mtime(
     mtime_before = os.stat(prepared.path).st_mtime_ns
 
     playback._known_originals.clear()
-    playback._recently_used.clear()
+    entry = playback._index[prepared.path]
+    entry.last_used = 0
     playback.get_or_prepare(str(source))
 
     assert os.stat(prepared.path).st_mtime_ns == mtime_before
-    assert prepared.path in playback._recently_used
+    assert entry.last_used > 0
 
 
 def test_prune_does_not_evict_a_file_being_served(tmp_path, isolated_cache, monkeypatch):
@@ -482,8 +1108,10 @@ def test_prune_does_not_evict_a_file_being_served(tmp_path, isolated_cache, monk
     _write_mp4(in_flight, faststart=True)
     other = isolated_cache / 'other.mp4'
     _write_mp4(other, faststart=True)
-    playback._recently_used[str(in_flight)] = time.time()
-    playback._recently_used[str(other)] = time.time() - 10 ** 4
+    cold = time.time() - 10 ** 4
+    os.utime(in_flight, (cold, cold))
+    os.utime(other, (cold, cold))
+    assert playback._read_cached(str(in_flight)) is not None
 
     # Bounds of zero: everything is over budget and eligible for eviction.
     playback.prune_cache(current_path=None, max_bytes=0, max_files=0)
@@ -492,6 +1120,63 @@ def test_prune_does_not_evict_a_file_being_served(tmp_path, isolated_cache, monk
     assert not other.exists(), 'a cold file is still evicted'
 
 
+def test_prepared_files_are_sharded_and_indexed(tmp_path, isolated_cache, monkeypatch):
+    source = tmp_path / 'late.mp4'
+    _write_mp4(source, faststart=False)
+    monkeypatch.setattr(playback, '_probe_media', lambda _path: COMPATIBLE_STREAMS)
+    _install_fake_worker(monkeypatch, [])
+
+    prepared = playback.get_or_prepare(str(source))
+
+    digest = os.path.basename(prepared.path)[:-len('.mp4')]
+    assert os.path.dirname(prepared.path) == str(isolated_cache / digest[:2])
+    entry = playback._index[prepared.path]
+    assert (entry.size, entry.mode) == (os.path.getsize(prepared.path), 'remux')
+    assert playback._index_bytes == entry.size
+
+
+def test_prune_evicts_least_recently_served_without_rescanning(
+    isolated_cache, monkeypatch
+):
+    cold = time.time() - 3600
+    paths = []
+    for index in range(4):
+        path = isolated_cache / 'ab' / '{}.mp4'.format(index)
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b'x' * 10)
+        os.utime(path, (cold + index, cold + index))
+        paths.append(path)
+    # Served long ago, but after the others were written.
+    with playback._index_lock:
+        playback._cache_index_locked()
+        playback._index_touch_locked(str(paths[0]), playback._index[str(paths[0])], cold + 10)
+    monkeypatch.setattr(os, 'walk', lambda _path: pytest.fail('prune must not rescan'))
+
+    playback.prune_cache(max_bytes=100, max_files=2)
+
+    assert [path.exists() for path in paths] == [True, False, False, True]
+    assert set(playback._index) == {str(paths[0]), str(paths[3])}
+    assert playback._index_bytes == 20
+
+
+def test_janitor_sweeps_only_stale_partials(isolated_cache):
+    shard = isolated_cache / 'ab'
+    shard.mkdir()
+    stale = shard / 'abc.1.2.part.mp4'
+    fresh = shard / 'abd.3.4.part.mp4'
+    kept = shard / 'abe.mp4'
+    for path in (stale, fresh, kept):
+        path.write_bytes(b'x')
+    old = time.time() - playback._PARTIAL_MAX_AGE_SECONDS - 60
+    os.utime(stale, (old, old))
+    os.utime(kept, (old, old))
+
+    playback.sweep_partials()
+
+    assert not stale.exists()
+    assert fresh.exists() and kept.exists()
+
+
 def test_a_failing_preparation_is_attempted_once_not_per_byte_range(
     tmp_path, isolated_cache, monkeypatch
 ):
@@ -503,7 +1188,10 @@ def test_a_failing_preparation_is_attempted_once_not_per_byte_range(
     _write_mp4(source, faststart=False)
     attempts = []
 
-    def failing_worker(mode, file_path, output_path):
+    def failing_worker(
+        mode, file_path, output_path, on_progress=None, max_short_edge=None, profile=None,
+        live_dir=None,
+    ):
         attempts.append(mode)
         raise playback.PlaybackPreparationError('decode failed')
 
@@ -528,7 +1216,10 @@ def test_an_unprepared_original_keeps_its_own_mode_on_replay(
     source = tmp_path / 'clip.webm'
     _write_mp4(source, faststart=False)
 
-    def unavailable(mode, file_path, output_path):
+    def unavailable(
+        mode, file_path, output_path, on_progress=None, max_short_edge=None, profile=None,
+        live_dir=None,
+    ):
         raise playback.PreparationUnavailable('no h264 encoder')
 
     monkeypatch.setattr(playback, '_run_worker', unavailable)
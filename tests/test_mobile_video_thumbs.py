@@ -1,3 +1,4 @@
+import io
 import os
 from pathlib import Path
 
@@ -18,3 +19,201 @@ def test_cache_key_uses_nanosecond_mtime(tmp_path: Path, monkeypatch):
     second = mobile_video_thumbs._cache_path(str(video))
 
     assert first != second
+
+
+def _oriented_jpeg(path: Path, size, orientation):
+    from PIL import Image
+
+    exif = Image.Exif()
+    exif[0x0112] = orientation
+    Image.new("RGB", size, (200, 30, 30)).save(path, format="JPEG", exif=exif.tobytes())
+
+
+def test_downscale_oriented_matches_orient_then_shrink(tmp_path: Path):
+    from PIL import Image, ImageOps
+
+    source = tmp_path / "rotated.jpg"
+    _oriented_jpeg(source, (1600, 800), 6)
+
+    with Image.open(source) as img:
+        fast = mobile_video_thumbs.downscale_oriented(img, (300, 300))
+    with Image.open(source) as img:
+        reference = ImageOps.exif_transpose(img)
+        reference.thumbnail((300, 300))
+
+    assert fast.size == reference.size == (150, 300)
+    assert fast.getexif().get(0x0112) is None
+
+
+def test_downscale_oriented_decodes_jpeg_at_reduced_scale(tmp_path: Path, monkeypatch):
+    from PIL import Image, JpegImagePlugin
+
+    source = tmp_path / "large.jpg"
+    _oriented_jpeg(source, (4000, 3000), 1)
+    drafts = []
+    real_draft = JpegImagePlugin.JpegImageFile.draft
+    monkeypatch.setattr(
+        JpegImagePlugin.JpegImageFile,
+        "draft",
+        lambda self, mode, size: drafts.append(real_draft(self, mode, size)),
+    )
+
+    with Image.open(source) as img:
+        mobile_video_thumbs.downscale_oriented(img, (300, 300))
+
+    # draft() only reports a change when it actually picked a smaller scale.
+    assert drafts and drafts[0] is not None
+
+
+def test_poster_score_prefers_an_exposed_detailed_frame():
+    from PIL import Image
+
+    black = Image.new("RGB", (320, 180))
+    flat_grey = Image.new("RGB", (320, 180), (128, 128, 128))
+    detailed = Image.effect_noise((320, 180), 40).convert("RGB")
+
+    assert mobile_video_thumbs._best_frame([black, flat_grey, detailed]) is detailed
+    assert mobile_video_thumbs._poster_score(black) < mobile_video_thumbs._poster_score(detailed)
+
+
+def test_best_frame_keeps_the_earliest_on_a_tie():
+    from PIL import Image
+
+    first = Image.new("RGB", (8, 8), (90, 90, 90))
+    second = first.copy()
+
+    assert mobile_video_thumbs._best_frame([first, second]) is first
+    assert mobile_video_thumbs._best_frame([]) is None
+
+
+def test_extract_frame_falls_back_to_first_frame_backends(monkeypatch):
+    from PIL import Image
+
+    first_frame = Image.new("RGB", (8, 8))
+
+    def no_pyav(_path):
+        raise ImportError("No module named 'av'")
+
+    monkeypatch.setattr(mobile_video_thumbs, "_poster_av", no_pyav)
+    monkeypatch.setattr(mobile_video_thumbs, "_frame_cv2", lambda _path: first_frame)
+
+    assert mobile_video_thumbs._extract_frame("clip.mp4") is first_frame
+
+
+class _FakeFrame:
+    def __init__(self, pts):
+        self.pts = pts
+        self.converted = 0
+
+    def to_image(self):
+        from PIL import Image
+
+        self.converted += 1
+        return Image.new("RGB", (320, 180), (self.pts % 256, 0, 0))
+
+
+class _FakeContainer:
+    """Frames every 1 pts; keyframes where listed. Decoding honours skip_frame."""
+
+    duration = None
+
+    def __init__(self, frame_count, keyframes):
+        self.frames = [_FakeFrame(pts) for pts in range(frame_count)]
+        self.keyframes = keyframes
+        self.position = 0
+        self.decoded = 0
+        self.stream = type("Stream", (), {})()
+        self.stream.duration = frame_count
+        self.stream.time_base = 1
+        self.stream.start_time = 0
+        self.stream.codec_context = type("Context", (), {"skip_frame": "DEFAULT"})()
+
+    def seek(self, target, stream):
+        self.position = max(pts for pts in self.keyframes if pts <= target)
+
+    def decode(self, stream):
+        for frame in self.frames[self.position:]:
+            if stream.codec_context.skip_frame == "NONKEY" and frame.pts not in self.keyframes:
+                continue
+            self.decoded += 1
+            yield frame
+
+
+def test_frames_at_decodes_only_the_keyframes_it_lands_on():
+    container = _FakeContainer(100, keyframes=[0, 25, 50, 75])
+    av = type("av", (), {"time_base": 1_000_000})
+
+    picked = mobile_video_thumbs._av_frames_at(av, container, container.stream, [0.1, 0.3, 0.55], 50)
+
+    assert [pts for pts, _image in picked] == [0, 25, 50]
+    assert container.decoded == 3
+
+
+def test_frames_at_decodes_forward_when_the_clip_has_one_keyframe():
+    container = _FakeContainer(100, keyframes=[0])
+    av = type("av", (), {"time_base": 1_000_000})
+
+    picked = mobile_video_thumbs._av_frames_at(av, container, container.stream, [0.1, 0.3, 0.9], 50)
+
+    # The 0.9 target lies past the decode budget, so it repeats the last frame.
+    assert [pts for pts, _image in picked] == [10, 30, 49]
+
+
+def test_frames_at_decodes_forward_from_a_shared_keyframe():
+    container = _FakeContainer(100, keyframes=[0, 50])
+    av = type("av", (), {"time_base": 1_000_000})
+
+    picked = mobile_video_thumbs._av_frames_at(av, container, container.stream, [0.1, 0.3, 0.55, 0.8], 100)
+
+    # 0.1 and 0.3 share keyframe 0 and 0.55 and 0.8 share keyframe 50, so
+    # each target gets its own frame rather than the keyframe before it.
+    assert [pts for pts, _image in picked] == [10, 30, 55, 80]
+
+
+def test_render_sprite_lays_tiles_out_in_one_row(monkeypatch):
+    import sys
+    from contextlib import nullcontext
+
+    from PIL import Image
+
+    container = _FakeContainer(40, keyframes=[0, 10, 20, 30])
+    fake_av = type("av", (), {"time_base": 1_000_000, "open": staticmethod(lambda _path: nullcontext(container))})
+    monkeypatch.setitem(sys.modules, "av", fake_av)
+    monkeypatch.setattr(mobile_video_thumbs, "_av_video_stream", lambda c: c.stream)
+
+    data = mobile_video_thumbs.render_sprite("clip.mp4", frames=4)
+
+    with Image.open(io.BytesIO(data)) as sheet:
+        assert sheet.format == "JPEG"
+        assert sheet.size == (4 * 160, 90)
+
+
+def test_sprite_cache_is_keyed_by_tile_count(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(mobile_video_thumbs, "_cache_dir", lambda: str(tmp_path))
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"aaaa")
+
+    assert mobile_video_thumbs.sprite_etag(str(video), 10) != mobile_video_thumbs.sprite_etag(str(video), 12)
+    assert mobile_video_thumbs._sprite_cache_path(str(video), 10) != mobile_video_thumbs._cache_path(str(video))
+
+
+def test_sprite_hit_is_served_under_the_miss_etag(tmp_path: Path, monkeypatch):
+    import importlib
+
+    mobile_init = importlib.import_module("__init__")
+    monkeypatch.setattr(mobile_video_thumbs, "_cache_dir", lambda: str(tmp_path))
+    monkeypatch.setattr(mobile_video_thumbs, "render_sprite", lambda _path, _frames: b"\xff\xd8sheet")
+    monkeypatch.setattr(mobile_init, "_KeyedFileResponse", lambda path, headers: headers)
+    video = tmp_path / "clip.mp4"
+    video.write_bytes(b"aaaa")
+
+    miss_etag = mobile_video_thumbs.sprite_etag(str(video), 10)
+    mobile_video_thumbs.get_or_render_sprite(str(video), 10)
+    hit = mobile_init._cached_file_response(
+        mobile_video_thumbs.cached_sprite_file(str(video), 10),
+        "image/jpeg",
+        {"ETag": mobile_video_thumbs.sprite_etag(str(video), 10), "X-Mobile-Sprite-Frames": "10"},
+    )
+
+    assert hit["ETag"] == miss_etag
+    assert hit["X-Mobile-Sprite-Frames"] == "10"